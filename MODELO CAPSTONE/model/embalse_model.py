@@ -3,6 +3,8 @@ import gurobipy as gp
 from gurobipy import GRB
 import numpy as np
 
+from .sensibilidad import valor_marginal
+
 class EmbalseModel:
     def __init__(self, params):
         self.params = params
@@ -123,8 +125,42 @@ class EmbalseModel:
         self.model.setObjective(total_deficit, GRB.MINIMIZE)
         
         print("✅ Función objetivo configurada")
+
+    def get_sensitivities(self, demandas_A, demandas_B):
+        """
+        Valores marginales del déficit (m³ por m³) a partir de Pi y RC del LP óptimo:
+        C_R, C_A, C_B (cota superior de V_*), consumo_humano_anual (RHS de
+        'consumo_humano') y escala de demanda A/B (RHS de 'deficit_*').
+        """
+        n_meses = len(self.V_R)
+        FE_A = FE_B = 0.85  # mismos factores que setup_constraints
+        temporada = [m for m in self.params['temporada_riego'] if m < n_meses]
+
+        sens = {}
+        for cuenta, cap in (('R', 'C_R'), ('A', 'C_A'), ('B', 'C_B')):
+            sens[cap] = valor_marginal(
+                self.model,
+                cotas_sup=[(f"V_{cuenta}[{m}]", 1.0) for m in range(n_meses)],
+                valor_base=self.params[cap]
+            )
+        sens['consumo_humano_anual'] = valor_marginal(
+            self.model,
+            restricciones=[("consumo_humano", 1.0)],
+            valor_base=self.params['consumo_humano_anual']
+        )
+        sens['escala_demanda_A'] = valor_marginal(
+            self.model,
+            restricciones=[(f"deficit_A_{m}", FE_A * demandas_A[m]) for m in temporada],
+            valor_base=1.0
+        )
+        sens['escala_demanda_B'] = valor_marginal(
+            self.model,
+            restricciones=[(f"deficit_B_{m}", FE_B * demandas_B[m]) for m in temporada],
+            valor_base=1.0
+        )
+        return sens
     
-    def solve(self, Q_afluente, Q_PD, demandas_A, demandas_B):
+    def solve(self, Q_afluente, Q_PD, demandas_A, demandas_B, sensibilidad=False):
         """Resolver el modelo"""
         n_meses = len(Q_afluente)
         
@@ -143,7 +179,10 @@ class EmbalseModel:
             
             if self.model.status == GRB.OPTIMAL:
                 print("✅ SOLUCIÓN ÓPTIMA ENCONTRADA")
-                return self.get_solution()
+                solution = self.get_solution()
+                if sensibilidad:
+                    solution['sensibilidades'] = self.get_sensitivities(demandas_A, demandas_B)
+                return solution
             else:
                 print(f"❌ No se encontró solución óptima. Status: {self.model.status}")
                 return None
@@ -0,0 +1,195 @@
+# model/embalse_model_cvar.py
+import gurobipy as gp
+from gurobipy import GRB
+import numpy as np
+
+
+class EmbalseModelCVaR:
+    """
+    Forma extensiva por bloques de escenario con objetivo aversión al riesgo:
+
+        min (1 − λ)·E[D] + λ·CVaR_α(D)
+
+    donde D es el déficit anual (Σ d_A + d_B del año) de cada escenario-año.
+    CVaR usa la reformulación lineal de Rockafellar–Uryasev:
+
+        CVaR_α = η + 1/(1 − α) · Σ p_k·u_k,   u_k ≥ D_k − η,  u_k ≥ 0
+
+    Cada escenario repite las restricciones de EmbalseModelAdvanced en su propio
+    bloque (variables indexadas [s, m]); sólo η y FE_A/FE_B (si fe_comun) acoplan
+    los bloques, así la matriz queda bloque-diagonal con pocas columnas de enlace.
+    Con λ = 0 se recupera el mínimo déficit esperado.
+    """
+
+    def __init__(self, params, alpha=0.9, lam=0.5, fe_comun=True):
+        self.params = params
+        self.alpha = alpha
+        self.lam = lam
+        self.fe_comun = fe_comun
+        self.model = gp.Model("Embalse_Nueva_Punilla_CVaR")
+
+    def setup_variables(self, n_esc, n_meses):
+        """Variables por bloque de escenario"""
+        print(f" Creando variables para {n_esc} escenarios x {n_meses} meses...")
+        idx = [(s, m) for s in range(n_esc) for m in range(n_meses)]
+        n_anos = n_meses // 12
+
+        self.V_R = self.model.addVars(idx, lb=0, ub=self.params['C_R'], name="V_R")
+        self.V_A = self.model.addVars(idx, lb=0, ub=self.params['C_A'], name="V_A")
+        self.V_B = self.model.addVars(idx, lb=0, ub=self.params['C_B'], name="V_B")
+
+        self.R_H = self.model.addVars(idx, lb=0, name="R_H")
+        self.R_A = self.model.addVars(idx, lb=0, name="R_A")
+        self.R_B = self.model.addVars(idx, lb=0, name="R_B")
+
+        self.d_A = self.model.addVars(idx, lb=0, name="d_A")
+        self.d_B = self.model.addVars(idx, lb=0, name="d_B")
+
+        self.Q_turb = self.model.addVars(idx, lb=0, name="Q_turb")
+
+        # Factores de entrega: una decisión común (no anticipativa) o uno por escenario
+        n_fe = 1 if self.fe_comun else n_esc
+        self.FE_A = self.model.addVars(n_fe, lb=0.75, ub=1.0, name="FE_A")
+        self.FE_B = self.model.addVars(n_fe, lb=0.5, ub=1.0, name="FE_B")
+
+        # Déficit anual por escenario-año y variables de CVaR
+        self.D = self.model.addVars(n_esc, n_anos, lb=0, name="D")
+        self.eta = self.model.addVar(lb=-GRB.INFINITY, name="eta")
+        self.u = self.model.addVars(n_esc, n_anos, lb=0, name="u")
+
+        print("Variables creadas correctamente")
+
+    def setup_constraints(self, escenarios):
+        """Restricciones de EmbalseModelAdvanced repetidas por escenario + enlace CVaR"""
+        n_esc = len(escenarios)
+        n_meses = len(escenarios[0]['Q_afluente'])
+        n_anos = n_meses // 12
+        seg = np.array([self.params['segundos_mes'][m % 12] for m in range(n_meses)])
+        perd = np.array([self.params['perdidas_mensuales'][m % 12] for m in range(n_meses)])
+        temporada = set(self.params['temporada_riego'])
+        print(f" Configurando restricciones para {n_esc} escenarios")
+
+        for s, esc in enumerate(escenarios):
+            Q = np.asarray(esc['Q_afluente'], dtype=float)
+            QPD = np.asarray(esc['Q_PD'], dtype=float)
+            dem_A = esc['demandas_A']
+            dem_B = esc['demandas_B']
+            volumen = np.maximum(0.0, Q - QPD) * seg
+            fe = 0 if self.fe_comun else s
+
+            for m in range(n_meses):
+                if m > 0:
+                    prev = (self.V_R[s, m-1], self.V_A[s, m-1], self.V_B[s, m-1])
+                else:
+                    prev = (self.params['V_R_inicial'], self.params['V_A_inicial'],
+                            self.params['V_B_inicial'])
+
+                self.model.addConstr(
+                    self.V_R[s, m] == prev[0] + 0.4 * volumen[m] - self.R_H[s, m] - 0.4 * perd[m],
+                    f"balance_R_{s}_{m}")
+                self.model.addConstr(
+                    self.V_A[s, m] == prev[1] + 0.42 * volumen[m] - self.R_A[s, m] - 0.4 * perd[m],
+                    f"balance_A_{s}_{m}")
+                self.model.addConstr(
+                    self.V_B[s, m] == prev[2] + 0.18 * volumen[m] - self.R_B[s, m] - 0.2 * perd[m],
+                    f"balance_B_{s}_{m}")
+
+                if m % 12 in temporada:
+                    self.model.addConstr(
+                        self.R_A[s, m] + self.d_A[s, m] >= self.FE_A[fe] * dem_A[m % 12],
+                        f"deficit_A_{s}_{m}")
+                    self.model.addConstr(
+                        self.R_B[s, m] + self.d_B[s, m] >= self.FE_B[fe] * dem_B[m % 12],
+                        f"deficit_B_{s}_{m}")
+
+                self.model.addConstr(
+                    self.Q_turb[s, m] * seg[m] == self.R_H[s, m] + self.R_A[s, m] + self.R_B[s, m],
+                    f"turbinado_{s}_{m}")
+
+            for y in range(n_anos):
+                meses = range(12 * y, 12 * (y + 1))
+                self.model.addConstr(
+                    gp.quicksum(self.R_H[s, m] for m in meses) >= self.params['consumo_humano_anual'],
+                    f"consumo_humano_{s}_{y}")
+                self.model.addConstr(
+                    self.D[s, y] == gp.quicksum(self.d_A[s, m] + self.d_B[s, m] for m in meses),
+                    f"deficit_anual_{s}_{y}")
+                # u ≥ D − η  (exceso sobre el VaR)
+                self.model.addConstr(self.u[s, y] >= self.D[s, y] - self.eta, f"cvar_{s}_{y}")
+
+        print("✅ Restricciones configuradas")
+
+    def set_objective(self, prob_k):
+        """FUNCIÓN OBJETIVO: min (1 − λ)·E[D] + λ·(η + Σ p·u / (1 − α))"""
+        self.prob_k = prob_k
+        esperado = gp.quicksum(p * self.D[k] for k, p in prob_k.items())
+        cvar = self.eta + gp.quicksum(p * self.u[k] for k, p in prob_k.items()) / (1.0 - self.alpha)
+        self.esperado_expr = esperado
+        self.cvar_expr = cvar
+        self.model.setObjective((1.0 - self.lam) * esperado + self.lam * cvar, GRB.MINIMIZE)
+
+    def solve(self, escenarios):
+        """
+        escenarios: dicts con 'Q_afluente', 'Q_PD' (m³/s, largo 12·años),
+        'demandas_A', 'demandas_B' (m³/mes, 12) y opcionalmente 'probabilidad'.
+        """
+        n_esc = len(escenarios)
+        n_meses = len(escenarios[0]['Q_afluente'])
+        if n_meses % 12 != 0:
+            print("❌ El horizonte debe ser un múltiplo de 12 meses")
+            return None
+        n_anos = n_meses // 12
+
+        prob = np.array([e.get('probabilidad', 1.0) for e in escenarios], dtype=float)
+        prob = prob / prob.sum()
+        # cada escenario-año es un resultado con probabilidad p_s / años
+        prob_k = {(s, y): prob[s] / n_anos for s in range(n_esc) for y in range(n_anos)}
+
+        try:
+            print(f"\n=== RESOLVIENDO CVaR_{self.alpha:.2f} (λ={self.lam}) ===")
+            self.setup_variables(n_esc, n_meses)
+            self.setup_constraints(escenarios)
+            self.set_objective(prob_k)
+
+            self.model.setParam('OutputFlag', 1)
+            self.model.setParam('TimeLimit', self.params.get('TimeLimit', 300))
+            self.model.optimize()
+
+            if self.model.status == GRB.OPTIMAL:
+                print("✅ SOLUCIÓN ÓPTIMA ENCONTRADA")
+                return self.get_solution(n_esc, n_anos)
+            print(f"❌ Status: {self.model.status}")
+            return None
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return None
+
+    @staticmethod
+    def var_cvar(valores, prob, alpha):
+        """VaR_α y CVaR_α exactos de una distribución discreta (mismo η que minimiza R–U)."""
+        valores = np.asarray(valores, dtype=float).ravel()
+        prob = np.asarray(prob, dtype=float).ravel()
+        orden = np.argsort(valores)
+        acum = np.cumsum(prob[orden])
+        var = valores[orden][min(np.searchsorted(acum, alpha - 1e-12), len(valores) - 1)]
+        cvar = var + np.dot(prob, np.maximum(valores - var, 0.0)) / (1.0 - alpha)
+        return float(var), float(cvar)
+
+    def get_solution(self, n_esc, n_anos):
+        """Déficits anuales por escenario y medidas de riesgo"""
+        D = np.array([[self.D[s, y].X for y in range(n_anos)] for s in range(n_esc)])
+        # con λ = 0 η queda libre: VaR/CVaR se recalculan desde los déficits
+        var, cvar = self.var_cvar(D, [self.prob_k[s, y] for s in range(n_esc) for y in range(n_anos)],
+                                  self.alpha)
+        return {
+            'objetivo': self.model.objVal,
+            'deficit_esperado': self.esperado_expr.getValue(),
+            'VaR': var,
+            'CVaR': cvar,
+            'alpha': self.alpha,
+            'lambda': self.lam,
+            'deficits_anuales': D,
+            'FE_A': [v.X for v in self.FE_A.values()],
+            'FE_B': [v.X for v in self.FE_B.values()],
+            'status': self.model.status,
+        }
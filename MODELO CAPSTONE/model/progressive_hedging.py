@@ -0,0 +1,194 @@
+# model/progressive_hedging.py
+import contextlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import gurobipy as gp
+from gurobipy import GRB
+
+from .embalse_model_advanced import EmbalseModelAdvanced
+
+
+def _resolver_subproblema(tarea):
+    """
+    Resuelve un escenario con EmbalseModelAdvanced (se ejecuta en el proceso worker).
+
+    tarea = (params, escenario, primera_etapa, W, xbar, rho, fijo)
+      W, xbar, rho: arreglos por variable de primera etapa (o None en la iteración 0).
+      fijo: valores a los que se fijan las variables de primera etapa (evaluación).
+    """
+    params, escenario, primera_etapa, W, xbar, rho, fijo = tarea
+
+    # Los builders imprimen su avance; en los workers se silencia
+    with contextlib.redirect_stdout(io.StringIO()):
+        modelo = EmbalseModelAdvanced(params)
+        m = modelo.model
+        m.setParam('OutputFlag', 0)
+        m.setParam('Threads', 1)
+        n_meses = len(escenario['Q_afluente'])
+        modelo.setup_variables(n_meses)
+        modelo.setup_constraints_advanced(escenario['Q_afluente'], escenario['Q_PD'],
+                                          escenario['demandas_A'], escenario['demandas_B'])
+        modelo.set_objective()
+        m.update()
+
+    x = [m.getVarByName(nombre) for nombre in primera_etapa]
+    deficit = m.getObjective()
+
+    if fijo is not None:
+        for v, valor in zip(x, fijo):
+            v.LB = valor
+            v.UB = valor
+    elif W is not None:
+        # Lagrangiano aumentado de PH: f_s(x) + W·x + ρ/2·||x − x̄||²
+        obj = gp.QuadExpr(deficit)
+        for i, v in enumerate(x):
+            obj += W[i] * v
+            if rho is not None and xbar is not None:
+                obj += 0.5 * rho[i] * (v - xbar[i]) * (v - xbar[i])
+        m.setObjective(obj, GRB.MINIMIZE)
+
+    m.optimize()
+    if m.status != GRB.OPTIMAL:
+        return {'status': m.status, 'x': None, 'deficit': None, 'objetivo': None}
+
+    return {
+        'status': m.status,
+        'x': [v.X for v in x],
+        'deficit': deficit.getValue(),
+        'objetivo': m.objVal,
+    }
+
+
+class ProgressiveHedging:
+    """
+    Programa estocástico de dos etapas sobre un conjunto de escenarios de caudal,
+    resuelto por Progressive Hedging (Rockafellar–Wets).
+
+    Las variables de primera etapa (por defecto los factores de entrega FE_A/FE_B
+    que se fijan en septiembre) deben ser iguales en todos los escenarios; el resto
+    de la operación se adapta a cada escenario. Cada subproblema es el
+    EmbalseModelAdvanced del escenario con el término W·x + ρ/2·||x − x̄||², y se
+    resuelve en un pool de procesos, así nunca se arma la forma extensiva completa.
+
+    Escenarios: dicts con 'Q_afluente', 'Q_PD', 'demandas_A', 'demandas_B' y
+    opcionalmente 'probabilidad' (por defecto equiprobables), igual que los que
+    genera MonteCarloSimulator.generate_scenarios.
+    """
+
+    def __init__(self, params, escenarios, primera_etapa=('FE_A', 'FE_B'),
+                 rho=None, n_workers=None):
+        self.params = params
+        self.escenarios = list(escenarios)
+        self.primera_etapa = list(primera_etapa)
+        self.n_workers = n_workers or os.cpu_count() or 1
+
+        prob = np.array([e.get('probabilidad', 1.0) for e in self.escenarios], dtype=float)
+        self.prob = prob / prob.sum()
+
+        # ρ por variable (escalar, lista o None → heurística tras la iteración 0)
+        if rho is None:
+            self.rho = None
+        else:
+            self.rho = np.broadcast_to(np.asarray(rho, dtype=float),
+                                       (len(self.primera_etapa),)).copy()
+
+        self.historial = []
+
+    def _resolver_todos(self, executor, W=None, xbar=None, fijo=None, estricto=True):
+        """Resuelve todos los escenarios en paralelo y devuelve la lista de resultados."""
+        n = len(self.escenarios)
+        tareas = (
+            (self.params, esc, self.primera_etapa,
+             None if W is None else W[s], xbar, self.rho, fijo)
+            for s, esc in enumerate(self.escenarios)
+        )
+        chunksize = max(1, n // (4 * self.n_workers))
+        resultados = list(executor.map(_resolver_subproblema, tareas, chunksize=chunksize))
+
+        fallidos = [s for s, r in enumerate(resultados) if r['x'] is None]
+        if fallidos and estricto:
+            raise RuntimeError(f"Subproblemas sin óptimo en escenarios {fallidos[:10]}")
+        return resultados
+
+    def _rho_heuristico(self, X):
+        """
+        ρ_i ≈ demanda anual esperada / escala_i²: el déficit cambia a lo más en la
+        demanda total cuando x_i recorre su escala, así el término proximal queda
+        en las mismas unidades (m³) que el objetivo.
+        """
+        demanda = float(np.dot(self.prob, [np.sum(e['demandas_A']) + np.sum(e['demandas_B'])
+                                           for e in self.escenarios]))
+        escala = np.maximum(np.abs(self.prob @ X), 1.0)
+        return max(demanda, 1.0) / escala ** 2
+
+    def solve(self, max_iter=50, tol=1e-4, verbose=True):
+        """
+        Itera PH hasta que la dispersión Σ p_s·||x_s − x̄||∞ sea menor que tol.
+
+        Devuelve la política de primera etapa x̄, el déficit esperado al aplicarla
+        en todos los escenarios y una cota inferior lagrangiana (Σ p_s·W_s = 0).
+        """
+        S = len(self.escenarios)
+        print(f"\n=== PROGRESSIVE HEDGING: {S} escenarios, {self.n_workers} procesos ===")
+
+        with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+            # Iteración 0: cada escenario con información perfecta
+            resultados = self._resolver_todos(executor)
+            X = np.array([r['x'] for r in resultados])
+            xbar = self.prob @ X
+            if self.rho is None:
+                self.rho = self._rho_heuristico(X)
+            W = self.rho * (X - xbar)
+
+            convergio = False
+            for it in range(1, max_iter + 1):
+                resultados = self._resolver_todos(executor, W=W, xbar=xbar)
+                X = np.array([r['x'] for r in resultados])
+                xbar = self.prob @ X
+                W = W + self.rho * (X - xbar)
+
+                dispersion = float(self.prob @ np.max(np.abs(X - xbar), axis=1))
+                deficit_esp = float(np.dot(self.prob, [r['deficit'] for r in resultados]))
+                self.historial.append({'iteracion': it, 'dispersion': dispersion,
+                                       'deficit_esperado': deficit_esp,
+                                       'xbar': xbar.tolist()})
+                if verbose:
+                    print(f"  it {it:3d}: dispersión={dispersion:.2e}  "
+                          f"déficit esperado={deficit_esp/1e6:,.2f} Hm³  x̄={np.round(xbar, 4)}")
+                if dispersion < tol:
+                    convergio = True
+                    break
+
+            # Cota inferior: min f_s(x) + W_s·x por escenario (sin término proximal)
+            W_cota = W - self.prob @ W
+            cota = self._resolver_todos(executor, W=W_cota)
+            cota_inferior = float(np.dot(self.prob, [r['objetivo'] for r in cota]))
+
+            # Política implementable: x̄ fijo en todos los escenarios
+            evaluacion = self._resolver_todos(executor, fijo=xbar.tolist(), estricto=False)
+
+        deficits = np.array([np.nan if r['deficit'] is None else r['deficit'] for r in evaluacion])
+        inviables = [s for s, r in enumerate(evaluacion) if r['deficit'] is None]
+        if inviables:
+            print(f"⚠️ x̄ inviable en {len(inviables)} escenarios (déficit esperado sobre los factibles)")
+        factibles = ~np.isnan(deficits)
+        solucion = {
+            'primera_etapa': dict(zip(self.primera_etapa, xbar.tolist())),
+            'deficit_esperado': (float(self.prob[factibles] @ deficits[factibles]
+                                       / self.prob[factibles].sum())
+                                 if factibles.any() else float('nan')),
+            'escenarios_inviables': inviables,
+            'cota_inferior': cota_inferior,
+            'deficits_escenario': deficits.tolist(),
+            'iteraciones': len(self.historial),
+            'convergio': convergio,
+            'rho': np.asarray(self.rho).tolist(),
+            'historial': self.historial,
+        }
+        print(f"✅ PH {'convergido' if convergio else 'detenido'} en {solucion['iteraciones']} iteraciones; "
+              f"déficit esperado {solucion['deficit_esperado']/1e6:,.2f} Hm³ "
+              f"(cota inferior {cota_inferior/1e6:,.2f} Hm³)")
+        return solucion
@@ -0,0 +1,67 @@
+# model/sensibilidad.py
+# valor_marginal es copia de MODELO FLUJO/model/sensibilidad.py (los dos paquetes no
+# comparten ruta de importación): cualquier cambio debe hacerse en ambos.
+import math
+import gurobipy as gp
+from gurobipy import GRB
+
+
+def valor_marginal(modelo: gp.Model, restricciones=(), cotas_sup=(), valor_base=None):
+    """
+    Derivada del objetivo respecto de un parámetro θ y su rango de validez.
+
+    restricciones: [(nombre_restriccion, w)] con RHS = w·θ + constante.
+    cotas_sup:     [(nombre_variable,   w)] con UB  = w·θ.
+    El modelo debe ser un LP resuelto a optimalidad. Un nombre inexistente es un
+    KeyError (antes daba un marginal 0 silencioso).
+
+    marginal = Σ w·Pi + Σ w·RC (RC solo cuenta si la variable está en su cota
+    superior, VBasis == NONBASIC_UPPER),
+    en unidades del objetivo por unidad de θ.
+    El rango [delta_inf, delta_sup] para θ usa la regla del 100% sobre los
+    rangos individuales SARHSLow/Up y SAUBLow/Up, así que es conservador:
+    dentro de él la base no cambia y el marginal es exacto.
+    """
+    marginal = 0.0
+    holguras = []  # (w, holgura_bajar, holgura_subir) por elemento
+
+    for nombre, w in restricciones:
+        c = modelo.getConstrByName(nombre)
+        if c is None:
+            raise KeyError(f"Restricción {nombre!r} no existe en el modelo")
+        marginal += w * c.Pi
+        holguras.append((w, c.RHS - c.SARHSLow, c.SARHSUp - c.RHS))
+
+    for nombre, w in cotas_sup:
+        v = modelo.getVarByName(nombre)
+        if v is None:
+            raise KeyError(f"Variable {nombre!r} no existe en el modelo")
+        if v.VBasis == GRB.NONBASIC_UPPER:
+            marginal += w * v.RC
+            holguras.append((w, v.UB - v.SAUBLow, v.SAUBUp - v.UB))
+        else:
+            # cota inactiva (variable básica o en su cota inferior): no aporta al
+            # marginal y sólo limita el rango cuando la UB baja hasta el valor actual
+            holguras.append((w, v.UB - v.X, math.inf))
+
+    def paso_maximo(sube):
+        carga = 0.0
+        for w, h_baja, h_sube in holguras:
+            if w == 0:
+                continue
+            h = h_sube if (w > 0) == sube else h_baja
+            if h <= 0:
+                return 0.0
+            if not math.isinf(h):
+                carga += abs(w) / h
+        return math.inf if carga == 0 else 1.0 / carga
+
+    res = {
+        'marginal': marginal,
+        'delta_inf': -paso_maximo(False),
+        'delta_sup': paso_maximo(True),
+    }
+    if valor_base is not None:
+        res['valor_base'] = valor_base
+        res['rango'] = (valor_base + res['delta_inf'], valor_base + res['delta_sup'])
+    return res
@@ -2,6 +2,8 @@
 import pandas as pd
 import numpy as np
 
+CLAVES_CUENCA = ('Q_nuble', 'Q_hoya1', 'Q_hoya2', 'Q_hoya3')
+
 class DataLoader:
     def __init__(self, file_path):
         self.file_path = file_path
@@ -9,6 +11,11 @@ class DataLoader:
         self.df_hoya1 = None
         self.df_hoya2 = None
         self.df_hoya3 = None
+
+        # Caché de escenarios: se carga el Excel una vez y lo demás se deriva del tensor
+        self._escenarios = None
+        self._tensor = None       # (4 cuencas, años, 12 meses) en el orden de CLAVES_CUENCA
+        self._derivados = {}
         
     def load_caudales_data(self):
         """Cargar datos del archivo Excel de caudales de manera robusta"""
@@ -67,7 +74,29 @@ class DataLoader:
             print(f"Error obteniendo matriz de caudales: {e}")
             return np.zeros((len(df), 12))
     
+    def invalidar_cache(self):
+        """Descarta los escenarios cargados; la próxima consulta vuelve a leer el Excel."""
+        self._escenarios = None
+        self._tensor = None
+        self._derivados = {}
+
     def get_historical_scenarios(self):
+        """Escenarios históricos (se cargan una sola vez por instancia)"""
+        if self._escenarios is None:
+            scenarios = self._cargar_escenarios()
+            if not scenarios:
+                return []
+            self._escenarios = scenarios
+            self._tensor = np.stack([np.stack([np.asarray(s[k], dtype=float) for s in scenarios])
+                                     for k in CLAVES_CUENCA])
+        return self._escenarios
+
+    def get_scenarios_tensor(self):
+        """Tensor (4, años, 12) de los escenarios históricos, cuencas en orden CLAVES_CUENCA"""
+        self.get_historical_scenarios()
+        return self._tensor
+
+    def _cargar_escenarios(self):
         """Obtener todos los escenarios históricos de manera robusta"""
         df_nuble, df_hoya1, df_hoya2, df_hoya3 = self.load_caudales_data()
         
@@ -79,16 +108,14 @@ class DataLoader:
         n_filas = min(len(df_nuble), len(df_hoya1), len(df_hoya2), len(df_hoya3))
         print(f"📊 Procesando {n_filas} años históricos")
         
+        # Matrices (años, 12) una sola vez por cuenca
+        matrices = [self.get_caudales_matrix(df) for df in (df_nuble, df_hoya1, df_hoya2, df_hoya3)]
+        
         scenarios = []
         for i in range(n_filas):
             try:
-                scenario = {
-                    'año': df_nuble.iloc[i]['AÑO'],
-                    'Q_nuble': self.get_caudales_matrix(df_nuble)[i],
-                    'Q_hoya1': self.get_caudales_matrix(df_hoya1)[i],
-                    'Q_hoya2': self.get_caudales_matrix(df_hoya2)[i], 
-                    'Q_hoya3': self.get_caudales_matrix(df_hoya3)[i]
-                }
+                scenario = {'año': df_nuble.iloc[i]['AÑO']}
+                scenario.update({k: M[i] for k, M in zip(CLAVES_CUENCA, matrices)})
                 scenarios.append(scenario)
             except Exception as e:
                 print(f"❌ Error procesando año {i}: {e}")
@@ -97,11 +124,16 @@ class DataLoader:
         print(f"✅ {len(scenarios)} escenarios históricos cargados exitosamente")
         return scenarios
     
+    def _caudal_medio_anual(self, cuenca='Q_nuble'):
+        """Caudal medio de cada año (años,) para ordenar secos/húmedos"""
+        return self._tensor[CLAVES_CUENCA.index(cuenca)].mean(axis=1)
+
+    def _escenario_por_indice(self, idx):
+        return self._escenarios[int(idx)]
+
     def get_average_scenario(self):
         """Obtener escenario promedio de manera robusta"""
-        scenarios = self.get_historical_scenarios()
-        
-        if not scenarios:
+        if not self.get_historical_scenarios():
             print("❌ No hay escenarios para calcular promedio")
             return {
                 'Q_nuble': np.full(12, 50.0),  # Valores por defecto
@@ -109,35 +141,40 @@ class DataLoader:
                 'Q_hoya2': np.full(12, 8.0),
                 'Q_hoya3': np.full(12, 8.0)
             }
-        
-        # Calcular promedios
-        avg_scenario = {
-            'Q_nuble': np.mean([s['Q_nuble'] for s in scenarios], axis=0),
-            'Q_hoya1': np.mean([s['Q_hoya1'] for s in scenarios], axis=0),
-            'Q_hoya2': np.mean([s['Q_hoya2'] for s in scenarios], axis=0),
-            'Q_hoya3': np.mean([s['Q_hoya3'] for s in scenarios], axis=0)
-        }
-        
-        return avg_scenario
+
+        if 'promedio' not in self._derivados:
+            promedio = self._tensor.mean(axis=1)
+            self._derivados['promedio'] = dict(zip(CLAVES_CUENCA, promedio))
+        return self._derivados['promedio']
     
     def get_dry_year_scenario(self):
-        """Obtener escenario de año seco"""
-        scenarios = self.get_historical_scenarios()
-        
-        if not scenarios:
+        """Obtener escenario de año seco (menor caudal anual promedio del Ñuble)"""
+        if not self.get_historical_scenarios():
             return self.get_average_scenario()
-        
-        # Encontrar el año con menor caudal anual promedio
-        min_flow_idx = np.argmin([np.mean(s['Q_nuble']) for s in scenarios])
-        return scenarios[min_flow_idx]
+        if 'seco' not in self._derivados:
+            self._derivados['seco'] = int(np.argmin(self._caudal_medio_anual()))
+        return self._escenario_por_indice(self._derivados['seco'])
     
     def get_wet_year_scenario(self):
-        """Obtener escenario de año húmedo"""
-        scenarios = self.get_historical_scenarios()
-        
-        if not scenarios:
+        """Obtener escenario de año húmedo (mayor caudal anual promedio del Ñuble)"""
+        if not self.get_historical_scenarios():
             return self.get_average_scenario()
-        
-        # Encontrar el año con mayor caudal anual promedio
-        max_flow_idx = np.argmax([np.mean(s['Q_nuble']) for s in scenarios])
-        return scenarios[max_flow_idx]
\ No newline at end of file
+        if 'humedo' not in self._derivados:
+            self._derivados['humedo'] = int(np.argmax(self._caudal_medio_anual()))
+        return self._escenario_por_indice(self._derivados['humedo'])
+
+    def get_quantile_year_scenario(self, q, cuenca='Q_nuble'):
+        """
+        Año histórico en el cuantil q (0 = más seco, 1 = más húmedo) según el caudal
+        anual promedio de la cuenca. q puede ser una lista: devuelve una lista de escenarios.
+        """
+        if not self.get_historical_scenarios():
+            return self.get_average_scenario()
+        clave = ('orden', cuenca)
+        if clave not in self._derivados:
+            self._derivados[clave] = np.argsort(self._caudal_medio_anual(cuenca), kind='stable')
+        orden = self._derivados[clave]
+        qs = np.clip(np.atleast_1d(np.asarray(q, dtype=float)), 0.0, 1.0)
+        idx = orden[np.rint(qs * (len(orden) - 1)).astype(int)]
+        escenarios = [self._escenario_por_indice(i) for i in idx]
+        return escenarios if np.ndim(q) else escenarios[0]
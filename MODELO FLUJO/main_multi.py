@@ -8,6 +8,7 @@ sys.path.insert(0, str(ROOT))
 
 from utils.data_loader import DataLoader
 from model.modelo_flujo_multi import EmbalseModelMulti
+from utils.forzantes import qpd_efectivo
 
 try:
     import yaml
@@ -115,17 +116,6 @@ def main():
     QPD_nominal_12 = [95.7]*12
 
     # === NUEVO: QPD efectivo por mes del horizonte: min(QPD_nominal_mes, Qin_mes)
-        # ===============================
-    # QPD nominal "base" por tablas (m3/s) en orden ABR→MAR
-    # ===============================
-    # Tabla Derechos No Consuntivos - Fila "Total" (MAY..ABR) ⇒ convertir a ABR..MAR
-    derechos_MAY_ABR = [52.00, 52.00, 52.00, 52.00, 57.70, 76.22, 69.22, 52.00, 52.00, 52.00, 52.00, 52.00]
-    derechos_ABR_MAR = [derechos_MAY_ABR[11]] + derechos_MAY_ABR[:11]  # [ABR, MAY..MAR]
-
-    # Caudal ecológico (MAY..ABR) ⇒ convertir a ABR..MAR
-    qeco_MAY_ABR = [10.00, 10.35, 14.48, 15.23, 15.23, 15.23, 15.23, 15.23, 12.80, 15.20, 16.40, 17.60]
-    qeco_ABR_MAR = [qeco_MAY_ABR[11]] + qeco_MAY_ABR[:11]  # [ABR, MAY..MAR]
-
     # ===============================
     # Armar series conectadas ABR→MAR para: Qin (Ñuble) y Hoya1+Hoya2+Hoya3
     # ===============================
@@ -147,21 +137,11 @@ def main():
     out.append(f"→ Horizonte conectado: {Y} años = {N} meses\n\n")
 
     # ===============================
-    # QPD nominal AJUSTADO por mes (max de: derechos, Qeco, 95.7 - hoyas)
-    # y QPD efectivo = min(QPD_nom_ajust, Qin)
+    # QPD efectivo por mes (utils.forzantes.qpd_efectivo, la misma fórmula de los
+    # demás modelos): min(max(derechos, Qeco, 95.7 − hoyas), Qin) en orden ABR→MAR
     # ===============================
-    QPD_eff_all_m3s = []
-    for k in range(N):
-        mes = k % 12  # 0=ABR,1=MAY,...,11=MAR
-
-        # 95.7 menos Hoyas de ese mes y año (no negativo)
-        base95_menos_hoyas = max(0.0, 95.7 - H_all[k])
-
-        # Máximo regulatorio/ambiental del mes (según tablas)
-        qpd_nom_ajust = max(derechos_ABR_MAR[mes], qeco_ABR_MAR[mes], base95_menos_hoyas)
-
-        # QPD efectivo: limitado por el afluente del mes
-        QPD_eff_all_m3s.append(min(qpd_nom_ajust, Q_all[k]))
+    QPD_eff_all_m3s = qpd_efectivo(np.reshape(Q_all, (Y, 12)), np.reshape(H_all, (Y, 12)),
+                                   calendario='abr_mar').ravel().tolist()
 
     # Traza rápida
     out.append("Perfiles de demanda (m3/mes):\n")
@@ -170,7 +150,7 @@ def main():
 
     # Resolver (pasa QPD efectivo por k)
     model = EmbalseModelMulti(params)
-    sol = model.solve(Q_all, QPD_eff_all_m3s, demandas_A, demandas_B, n_years=Y)
+    sol = model.solve(Q_all, QPD_eff_all_m3s, demandas_A, demandas_B, n_years=Y, sensibilidad=True)
     if not sol:
         print("❌ Multi-año sin solución")
         return
@@ -192,6 +172,19 @@ def main():
         out.append(f"Déficit total (Σ d_A + d_B): {hm3(deficit_total):.1f} Hm³\n")
     out.append(f"Energía total (horizonte completo): {energia_total:,.0f} MWh\n\n")
 
+    # ==========
+    # Sensibilidades (LP de rama activa; V_A/V_B iniciales 0 → primer mes con A/B vacías)
+    # ==========
+    sens = sol.get('sensibilidades') or {}
+    if sens:
+        out.append(header("SENSIBILIDADES (Δ déficit por unidad del parámetro)", "-"))
+        out.append(f"  Meses con A vacía: {sum(round(x) for x in sol['A_empty'])}, "
+                   f"con B vacía: {sum(round(x) for x in sol['B_empty'])}\n")
+        for nombre, r in sens.items():
+            lo, hi = r.get('rango', (r['delta_inf'], r['delta_sup']))
+            out.append(f"  {pad(nombre, 22)} marginal {r['marginal']:>14,.4f}   rango [{lo:,.4g}, {hi:,.4g}]\n")
+        out.append("\n")
+
     # ==========
     # Chequeos globales
     # ==========
@@ -0,0 +1,143 @@
+# model/calibracion.py
+import time
+
+import numpy as np
+
+from model.simulador import SimuladorEmbalse, leer_series_historicas, DEM_A, DEM_B
+from model.dimensionamiento import escenarios_montecarlo
+
+NOMBRES_REGLA = ('share_A', 'rsv_floor', 'frac_apoyo')
+
+
+class CalibracionReglas:
+    """
+    Calibración de las reglas de operación de monte_carlo.py / modelito2mc.py:
+    share_A (reparto 71/29), rsv_floor (piso VRFI, Hm³) y frac_apoyo (0.5·dem).
+
+    Cada candidato se evalúa sobre el ensamble Monte Carlo con SimuladorEmbalse.simular;
+    los candidatos de una iteración se apilan en un eje extra (n_candidatos, 1) de los
+    parámetros, así toda la población se simula en una sola pasada.
+
+    Confiabilidad de A/B: fracción de meses con demanda en que el servicio alcanza
+    umbral_servicio·dem (0.5 por defecto: las reglas sirven a lo más frac_apoyo·dem,
+    0.5 en las actuales). Confiabilidad SSR: fracción de meses sin backlog.
+    Objetivo: déficit anual esperado + penalización por incumplir las metas
+    (meta no indicada = no empeorar la confiabilidad de las reglas actuales).
+    """
+
+    def __init__(self, metas=None, umbral_servicio=0.5,
+                 cotas=((0.5, 0.9), (0.0, 20.0), (0.3, 1.0)),
+                 n_escenarios=100, duracion_anos=30, penalizacion=1e4, semilla=None,
+                 params=None, data_file="data/caudales.xlsx"):
+        self.metas = dict(metas or {})
+        self.umbral_servicio = umbral_servicio
+        self.cotas = np.array(cotas, dtype=float)
+        self.penalizacion = penalizacion
+        self.params = dict(params or {})
+        self.rng = np.random.default_rng(semilla)
+
+        Rem_hist = leer_series_historicas(data_file)['Rem']
+        self.Rem = escenarios_montecarlo(Rem_hist, n_escenarios, duracion_anos, semilla)
+        self.historial = []
+
+    def evaluar(self, theta):
+        """
+        theta: (n, 3) con columnas share_A, rsv_floor, frac_apoyo.
+        Devuelve arreglos (n,): deficit_anual, conf_A, conf_B, conf_SSR.
+        """
+        theta = np.atleast_2d(np.asarray(theta, dtype=float))
+        p = dict(self.params)
+        for i, nombre in enumerate(NOMBRES_REGLA):
+            p[nombre] = theta[:, i:i + 1]           # eje de candidatos × ensamble
+        # (n, 1) × ensamble (n_esc,) → series (n, n_esc, T)
+        res = SimuladorEmbalse(p).simular(self.Rem, guardar=('d_A', 'd_B', 'backlog'))
+
+        T = self.Rem.shape[-1]
+        meses = np.arange(T) % 12
+        demA, demB = DEM_A[meses], DEM_B[meses]
+        u = self.umbral_servicio
+        falla_A = (res['d_A'] > (1 - u) * demA + 1e-9)[..., demA > 0]
+        falla_B = (res['d_B'] > (1 - u) * demB + 1e-9)[..., demB > 0]
+        falla_SSR = res['backlog'] > 1e-9
+
+        anos = T / 12.0
+        return {
+            'deficit_anual': res['deficit_total'].mean(axis=1) / anos,
+            'conf_A': 1.0 - falla_A.mean(axis=(1, 2)),
+            'conf_B': 1.0 - falla_B.mean(axis=(1, 2)),
+            'conf_SSR': 1.0 - falla_SSR.mean(axis=(1, 2)),
+        }
+
+    def objetivo(self, theta):
+        ev = self.evaluar(theta)
+        incumple = sum(np.maximum(self.metas[c] - ev[f'conf_{c}'], 0.0) for c in ('A', 'B', 'SSR'))
+        ev['objetivo'] = ev['deficit_anual'] + self.penalizacion * incumple
+        ev['cumple'] = incumple <= 0
+        return ev
+
+    def calibrar(self, n_candidatos=64, max_iter=25, frac_elite=0.2, tol=1e-3, verbose=True):
+        """
+        Método de entropía cruzada: muestrea n_candidatos reglas de una normal truncada
+        a las cotas, las evalúa en una pasada, reajusta media/desv. a la élite e itera.
+        """
+        lo, hi = self.cotas[:, 0], self.cotas[:, 1]
+        mu = np.array([0.71, 1.5, 0.5])
+        sd = (hi - lo) / 4.0
+        n_elite = max(2, int(frac_elite * n_candidatos))
+        mejor = None
+
+        print(f"\n=== CALIBRACIÓN DE REGLAS: {n_candidatos} candidatos x ensamble "
+              f"{self.Rem.shape[0]}x{self.Rem.shape[1]} meses ===")
+        # metas no indicadas: la confiabilidad de las reglas actuales
+        actual = self.evaluar(mu)
+        for c in ('A', 'B', 'SSR'):
+            self.metas.setdefault(c, float(actual[f'conf_{c}'][0]))
+        base = self.objetivo(mu)
+        print(f"  reglas actuales {dict(zip(NOMBRES_REGLA, mu.tolist()))}: déficit {base['deficit_anual'][0]:,.2f} "
+              f"Hm³/año, conf A/B/SSR = {base['conf_A'][0]:.3f}/{base['conf_B'][0]:.3f}/"
+              f"{base['conf_SSR'][0]:.3f}")
+
+        t0 = time.time()
+        for it in range(1, max_iter + 1):
+            theta = np.clip(mu + sd * self.rng.standard_normal((n_candidatos, 3)), lo, hi)
+            theta[0] = mu                       # la media actual siempre compite
+            ev = self.objetivo(theta)
+            orden = np.argsort(ev['objetivo'])
+            if mejor is None or ev['objetivo'][orden[0]] < mejor['objetivo']:
+                mejor = {k: v[orden[0]] for k, v in ev.items()}
+                mejor['theta'] = theta[orden[0]].copy()
+
+            elite = theta[orden[:n_elite]]
+            mu = elite.mean(axis=0)
+            sd = np.maximum(elite.std(axis=0), 1e-6 * (hi - lo))
+            self.historial.append({'iteracion': it, 'mejor': float(mejor['objetivo']),
+                                   'mu': mu.tolist(), 'sd': sd.tolist()})
+            if verbose:
+                print(f"  it {it:3d}: mejor={mejor['objetivo']:,.3f}  θ={np.round(mejor['theta'], 3)}  "
+                      f"cumple={bool(mejor['cumple'])}")
+            if np.all(sd < tol * (hi - lo)):
+                break
+
+        print(f"✅ Calibración en {time.time() - t0:.1f} s: "
+              f"{dict(zip(NOMBRES_REGLA, np.round(mejor['theta'], 4).tolist()))}")
+        return {
+            'reglas': dict(zip(NOMBRES_REGLA, mejor['theta'].tolist())),
+            'deficit_anual': float(mejor['deficit_anual']),
+            'conf_A': float(mejor['conf_A']),
+            'conf_B': float(mejor['conf_B']),
+            'conf_SSR': float(mejor['conf_SSR']),
+            'cumple_metas': bool(mejor['cumple']),
+            'metas': self.metas,
+            'base': {k: float(v[0]) for k, v in base.items()},
+            'historial': self.historial,
+        }
+
+
+def main():
+    cal = CalibracionReglas(semilla=42)
+    res = cal.calibrar()
+    print(res['reglas'], f"déficit {res['deficit_anual']:,.2f} Hm³/año")
+
+
+if __name__ == "__main__":
+    main()
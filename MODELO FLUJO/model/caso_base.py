@@ -1,7 +1,9 @@
 # model/modelo_caso_base.py
 import gurobipy as gp
 from gurobipy import GRB
-import pandas as pd
+
+from utils.hydro_dataset import HydroDataset
+from utils.forzantes import Forzantes
 
 class EmbalseCasoBase:
     """
@@ -46,11 +48,7 @@ class EmbalseCasoBase:
         }
 
         # ============ DATOS (m³/s) ============
-        self.inflow  = {}
-        self.Q_nuble = {}
-        self.Q_hoya1 = {}
-        self.Q_hoya2 = {}
-        self.Q_hoya3 = {}
+        self.hidro = None   # HydroDataset (cuenca × año × mes), ver load_flow_data
 
         # ============ DEMANDA TOTAL (parámetros) ============
         # Los parámetros mensuales por acción se mantienen tal cual (valores constantes)
@@ -104,50 +102,19 @@ class EmbalseCasoBase:
 
     # ===================== Datos =====================
     def load_flow_data(self, file_path):
-        xls = pd.ExcelFile(file_path)
-        nuble = pd.read_excel(xls, sheet_name='Hoja1', skiprows=4,  nrows=31)
-        hoya1 = pd.read_excel(xls, sheet_name='Hoja1', skiprows=39, nrows=31)
-        hoya2 = pd.read_excel(xls, sheet_name='Hoja1', skiprows=75, nrows=31)
-        hoya3 = pd.read_excel(xls, sheet_name='Hoja1', skiprows=110,nrows=31)
-
-        excel_col_names = ['MAY','JUN','JUL','AGO','SEP','OCT','NOV','DIC','ENE','FEB','MAR','ABR']
-        model_month_order = [1,2,3,4,5,6,7,8,9,10,11,12]
-
-        Q_nuble, Q_hoya1, Q_hoya2, Q_hoya3, Q_afl = {},{},{},{},{}
-
-        for idx, row in nuble.iterrows():
-            year_str = str(row.get('AÑO',''))
-            if (pd.notna(row.get('AÑO')) and '/' in year_str
-                and not any(w in year_str.upper() for w in ['PROMEDIO','TOTAL','MAX','MIN'])):
-                try:
-                    year = int(year_str.split('/')[0])
-                    for col, mm in zip(excel_col_names, model_month_order):
-                        n1 = nuble.loc[idx, col]; h1 = hoya1.loc[idx, col]
-                        h2 = hoya2.loc[idx, col]; h3 = hoya3.loc[idx, col]
-                        if pd.notna(n1): Q_nuble[year, mm] = float(n1); Q_afl[year, mm] = float(n1)
-                        if pd.notna(h1): Q_hoya1[year, mm] = float(h1)
-                        if pd.notna(h2): Q_hoya2[year, mm] = float(h2)
-                        if pd.notna(h3): Q_hoya3[year, mm] = float(h3)
-                except Exception:
-                    pass
-        return Q_afl, Q_nuble, Q_hoya1, Q_hoya2, Q_hoya3
+        # arreglo (cuenca × año × mes) desde la caché binaria de caudales.xlsx
+        return HydroDataset.desde_excel(file_path)
 
     # ===================== Restricciones =====================
     def setup_constraints(self):
         m = self.model
         data_file = "data/caudales.xlsx"
-        self.inflow, self.Q_nuble, self.Q_hoya1, self.Q_hoya2, self.Q_hoya3 = self.load_flow_data(data_file)
+        self.hidro = self.load_flow_data(data_file)
 
-        # QPD efectivo (m³/s) en MAY..ABR
-        derechos_MAY_ABR = [52.00,52.00,52.00,52.00,57.70,76.22,69.22,52.00,52.00,52.00,52.00,52.00]
-        qeco_MAY_ABR = [10.00,10.35,14.48,15.23,15.23,15.23,15.23,15.23,12.80,15.20,16.40,17.60]
-        self.QPD_eff = {}
-        for año in self.anos:
-            y = int(año.split('/')[0])
-            for mes in self.months:
-                H = self.Q_hoya1.get((y,mes),0.0) + self.Q_hoya2.get((y,mes),0.0) + self.Q_hoya3.get((y,mes),0.0)
-                qpd_nom = max(derechos_MAY_ABR[mes-1], qeco_MAY_ABR[mes-1], max(0.0, 95.7 - H))
-                self.QPD_eff[año, mes] = min(qpd_nom, self.Q_nuble.get((y,mes),0.0))
+        # Forzantes precalculados (QPD efectivo, Qin, UPREF, demandas) en el orden del horizonte
+        self.drv = Forzantes(self.hidro, self.num_A, self.num_B, V_C_H=self.V_C_H)
+        F = self.drv.por_orden(self.anos)
+        self.QPD_eff = self.drv.qpd_dict(self.anos)
 
         # Iniciales (MAY del primer año)
         primer = self.anos[0]
@@ -160,13 +127,11 @@ class EmbalseCasoBase:
         self.human_dem_monthly = self.V_C_H / 12.0
         # -------------------------------------------------------------------
 
-        for año in self.anos:
+        for k, año in enumerate(self.anos):
             y = int(año.split('/')[0])
             for i, mes in enumerate(self.months):
-                seg = self.segundos_por_mes[mes]
-                Qin_s = self.inflow.get((y,mes), 0.0)
-                Qin = Qin_s * seg / 1_000_000.0
-                UPREF = self.QPD_eff[año, mes] * seg / 1_000_000.0
+                Qin   = F['Qin'][k, i]
+                UPREF = F['UPREF'][k, i]
 
                 # Demanda TOTAL ahora: la DEMANDA HUMANA FIJA (V_C_H) repartida mes a mes
                 demTOTAL = self.human_dem_monthly
@@ -234,15 +199,17 @@ class EmbalseCasoBase:
 
     # ===================== Exportar resultados a Excel =====================
     def export_to_excel(self, filename="resultados_caso_base.xlsx"):
+        import pandas as pd
+
         data = []
         # usar self.human_dem_monthly (demanda fija mensual) en los reportes para coherencia
         dem_month = self.human_dem_monthly if self.human_dem_monthly is not None else 0.0
 
         for año in self.anos:
-            y = int(año.split('/')[0])
+            iy = self.hidro.indice[año]
             for mes in self.months:
                 seg = self.segundos_por_mes[mes]
-                Qin_m3s = self.inflow.get((y,mes), 0.0)
+                Qin_m3s = self.hidro.nuble[iy, mes-1]
                 Qin = Qin_m3s * seg / 1_000_000.0
                 QPD_eff_Hm3 = self.QPD_eff[año,mes] * seg / 1_000_000.0
 
@@ -310,6 +277,7 @@ class EmbalseCasoBase:
 
         for año in self.anos:
             y = int(año.split('/')[0])
+            iy = self.hidro.indice[año]
 
             lines.append("="*50)
             lines.append(f"REPORTE CASO BASE: {año}")
@@ -321,7 +289,7 @@ class EmbalseCasoBase:
 
             for i, mes in enumerate(self.months):
                 seg = self.segundos_por_mes[mes]
-                Qin_m3s = self.inflow.get((y,mes), 0.0)
+                Qin_m3s = self.hidro.nuble[iy, mes-1]
                 Qin_Hm3 = Qin_m3s * seg / 1_000_000.0
                 QPD_Hm3 = self.QPD_eff[año,mes] * seg / 1_000_000.0
 
@@ -376,7 +344,7 @@ class EmbalseCasoBase:
     def solve(self):
         try:
             data_file = "data/caudales.xlsx"
-            self.inflow, self.Q_nuble, self.Q_hoya1, self.Q_hoya2, self.Q_hoya3 = self.load_flow_data(data_file)
+            self.hidro = self.load_flow_data(data_file)
             self.setup_variables()
             self.setup_constraints()
             self.set_objective()
@@ -0,0 +1,234 @@
+# model/dimensionamiento.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from model.simulador import SimuladorEmbalse, leer_series_historicas
+from utils.escenarios import GeneradorEscenarios
+from utils.memoria_compartida import MemoriaCompartida, adjuntar, compartido
+
+NOMBRES_CAP = ('C_VRFI', 'C_A', 'C_B')
+
+
+def escenarios_montecarlo(Rem_hist, n_escenarios, duracion_anos=30, semilla=None):
+    """
+    Ensamble de MonteCarloEmbalse.generar_escenarios: años históricos sin reemplazo
+    en orden aleatorio (GeneradorEscenarios.indices), encadenados; con la misma
+    semilla, el escenario i es el de la simulación i del Monte Carlo.
+    Devuelve Rem (n_escenarios, 12·duracion_anos).
+    """
+    n_hist = Rem_hist.shape[0]
+    dur = min(duracion_anos, n_hist)
+    orden = GeneradorEscenarios(semilla).indices(n_escenarios, dur, n_hist)
+    return Rem_hist[orden].reshape(n_escenarios, 12 * dur)
+
+
+def _evaluar_lote(args):
+    """
+    Déficit anual medio del ensamble para un lote de diseños C (n, 3) — una sola simulación.
+    Rem=None: el ensamble publicado en memoria compartida por optimizar().
+    """
+    C, Rem, params = args
+    if Rem is None:
+        Rem = compartido('Rem')
+    p = dict(params)
+    for i, nombre in enumerate(NOMBRES_CAP):
+        p[nombre] = C[:, i:i + 1]                   # (n, 1) × ensamble (n_esc,) → (n, n_esc)
+    res = SimuladorEmbalse(p).simular(Rem, guardar=())
+    anos = Rem.shape[-1] / 12.0
+    return res['deficit_total'].mean(axis=-1) / anos
+
+
+class DimensionamientoEmbalse:
+    """
+    Búsqueda de capacidades (C_VRFI, C_A, C_B) que minimizan
+
+        déficit anual esperado (Hm³/año) + costo_capacidad · (C_VRFI + C_A + C_B)
+
+    evaluando cada diseño sobre el ensamble Monte Carlo completo con el simulador
+    vectorizado (todos los candidatos de una generación en una sola pasada, repartidos
+    en un pool de procesos). El optimizador es un CMA-ES sin derivadas.
+
+    Con capacidad_total fija sólo se busca el reparto (x ∈ simplex vía softmax).
+    """
+
+    def __init__(self, params=None, costo_capacidad=0.0, capacidad_total=None,
+                 cotas=((20.0, 400.0), (20.0, 500.0), (10.0, 300.0)),
+                 n_escenarios=200, duracion_anos=30, n_workers=None, semilla=None,
+                 data_file="data/caudales.xlsx"):
+        self.params = dict(params or {})
+        self.costo_capacidad = costo_capacidad
+        self.capacidad_total = capacidad_total
+        self.cotas = np.array(cotas, dtype=float)
+        if capacidad_total is not None and not (self.cotas[:, 0].sum() <= capacidad_total
+                                                <= self.cotas[:, 1].sum()):
+            raise ValueError(f"capacidad_total={capacidad_total} fuera de la suma de las cotas "
+                             f"[{self.cotas[:, 0].sum()}, {self.cotas[:, 1].sum()}]")
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.rng = np.random.default_rng(semilla)
+
+        Rem_hist = leer_series_historicas(data_file)['Rem']
+        self.Rem = escenarios_montecarlo(Rem_hist, n_escenarios, duracion_anos, semilla)
+        self.n_evaluaciones = 0
+        self.historial = []
+
+    # -------------------------
+    # Espacio de búsqueda
+    # -------------------------
+    def decodificar(self, X):
+        """Vector de búsqueda (n, d) → capacidades (n, 3) dentro de las cotas."""
+        X = np.atleast_2d(X)
+        if self.capacidad_total is not None:
+            z = np.exp(X - X.max(axis=1, keepdims=True))
+            return self._repartir(z / z.sum(axis=1, keepdims=True))
+        return np.clip(X, self.cotas[:, 0], self.cotas[:, 1])
+
+    def _repartir(self, S, iteraciones=60):
+        """
+        Participaciones S (n, 3) → capacidades que suman capacidad_total dentro de las
+        cotas: C = clip(λ·total·S) con λ por bisección (la suma es monótona en λ), o sea
+        se renormaliza después de recortar sin cambiar las proporciones de las libres.
+        """
+        lo, hi = self.cotas[:, 0], self.cotas[:, 1]
+        base = self.capacidad_total * S
+        lam_lo = np.zeros((len(S), 1))
+        lam_hi = np.full((len(S), 1), max(hi.max() / max(base.min(), 1e-300), 1.0))
+        for _ in range(iteraciones):
+            lam = 0.5 * (lam_lo + lam_hi)
+            exceso = np.clip(lam * base, lo, hi).sum(axis=1, keepdims=True) > self.capacidad_total
+            lam_hi = np.where(exceso, lam, lam_hi)
+            lam_lo = np.where(exceso, lam_lo, lam)
+        C = np.clip(lam_lo * base, lo, hi)
+        # residuo de la bisección a las capacidades libres (estrictamente dentro de las cotas)
+        libres = (C > lo) & (C < hi)
+        resto = self.capacidad_total - C.sum(axis=1, keepdims=True)
+        peso = np.where(libres, C, 0.0)
+        suma = peso.sum(axis=1, keepdims=True)
+        return C + np.divide(resto * peso, suma, out=np.zeros_like(C), where=suma > 0)
+
+    def _x0(self):
+        base = np.array([175.0, 260.0, 105.0])
+        if self.capacidad_total is not None:
+            return np.log(base / base.sum())
+        return base
+
+    # -------------------------
+    # Evaluación (lotes en paralelo)
+    # -------------------------
+    def deficit_esperado(self, C, executor=None):
+        C = np.atleast_2d(np.asarray(C, dtype=float))
+        if executor is None or len(C) < 2 * self.n_workers:
+            deficit = _evaluar_lote((C, self.Rem, self.params))
+        else:
+            lotes = np.array_split(C, self.n_workers)
+            deficit = np.concatenate(list(executor.map(
+                _evaluar_lote, [(lote, None, self.params) for lote in lotes])))
+        self.n_evaluaciones += len(C)
+        return deficit
+
+    def objetivo(self, X, executor=None):
+        C = self.decodificar(X)
+        deficit = self.deficit_esperado(C, executor)
+        # penalización por salir de las cotas (el clip deja el simulador en rango)
+        X2 = np.atleast_2d(X)
+        fuera = 0.0 if self.capacidad_total is not None else \
+            np.sum(np.maximum(self.cotas[:, 0] - X2, 0) + np.maximum(X2 - self.cotas[:, 1], 0), axis=1)
+        return deficit + self.costo_capacidad * C.sum(axis=1) + fuera, C, deficit
+
+    # -------------------------
+    # CMA-ES
+    # -------------------------
+    def optimizar(self, max_evaluaciones=3000, poblacion=None, sigma0=None, tol=1e-3, verbose=True):
+        """(μ/μ_w, λ)-CMA-ES estándar (Hansen) con generaciones evaluadas en lote."""
+        x = self._x0().astype(float)
+        n = x.size
+        lam = poblacion or 4 + int(3 * np.log(n)) + 8
+        mu = lam // 2
+        w = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+        w /= w.sum()
+        mueff = 1.0 / np.sum(w ** 2)
+
+        cc = (4 + mueff / n) / (n + 4 + 2 * mueff / n)
+        cs = (mueff + 2) / (n + mueff + 5)
+        c1 = 2 / ((n + 1.3) ** 2 + mueff)
+        cmu = min(1 - c1, 2 * (mueff - 2 + 1 / mueff) / ((n + 2) ** 2 + mueff))
+        damps = 1 + 2 * max(0, np.sqrt((mueff - 1) / (n + 1)) - 1) + cs
+        chiN = np.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+        if sigma0 is None:
+            sigma0 = 0.3 if self.capacidad_total is not None else 0.2 * np.mean(np.diff(self.cotas, axis=1))
+        sigma = float(sigma0)
+        pc = np.zeros(n)
+        ps = np.zeros(n)
+        Cov = np.eye(n)
+        mejor = (np.inf, None, None)
+
+        print(f"\n=== DIMENSIONAMIENTO: CMA-ES λ={lam}, ensamble {self.Rem.shape[0]}x{self.Rem.shape[1]} meses ===")
+        t0 = time.time()
+        # el ensamble se publica una vez; cada lote sólo lleva sus diseños
+        with MemoriaCompartida({'Rem': self.Rem}) as mem, \
+                ProcessPoolExecutor(max_workers=self.n_workers, initializer=adjuntar,
+                                    initargs=(mem.descriptor,)) as executor:
+            gen = 0
+            while self.n_evaluaciones + lam <= max_evaluaciones:
+                gen += 1
+                vals, vecs = np.linalg.eigh(Cov)
+                D = np.sqrt(np.maximum(vals, 1e-20))
+                Z = self.rng.standard_normal((lam, n))
+                Y = Z @ np.diag(D) @ vecs.T
+                X = x + sigma * Y
+
+                f, C, deficit = self.objetivo(X, executor)
+                orden = np.argsort(f)
+                if f[orden[0]] < mejor[0]:
+                    mejor = (float(f[orden[0]]), C[orden[0]].copy(), float(deficit[orden[0]]))
+
+                y_w = w @ Y[orden[:mu]]
+                x = x + sigma * y_w
+                invsqrt = vecs @ np.diag(1 / D) @ vecs.T
+                ps = (1 - cs) * ps + np.sqrt(cs * (2 - cs) * mueff) * invsqrt @ y_w
+                hsig = np.linalg.norm(ps) / np.sqrt(1 - (1 - cs) ** (2 * gen)) / chiN < 1.4 + 2 / (n + 1)
+                pc = (1 - cc) * pc + hsig * np.sqrt(cc * (2 - cc) * mueff) * y_w
+                Yw = Y[orden[:mu]]
+                Cov = ((1 - c1 - cmu) * Cov + c1 * (np.outer(pc, pc) + (1 - hsig) * cc * (2 - cc) * Cov)
+                       + cmu * (Yw.T * w) @ Yw)
+                sigma *= np.exp((cs / damps) * (np.linalg.norm(ps) / chiN - 1))
+
+                self.historial.append({'generacion': gen, 'mejor_f': mejor[0],
+                                       'f_mediana': float(np.median(f)), 'sigma': sigma})
+                if verbose and gen % 5 == 1:
+                    print(f"  gen {gen:3d}: mejor={mejor[0]:,.3f}  C={np.round(mejor[1], 1)}  "
+                          f"σ={sigma:.3g}  evals={self.n_evaluaciones}")
+                if sigma * np.max(D) < tol * max(1.0, np.abs(x).max()):
+                    break
+
+        f_opt, C_opt, def_opt = mejor
+        print(f"✅ Diseño: C_VRFI={C_opt[0]:.1f}  C_A={C_opt[1]:.1f}  C_B={C_opt[2]:.1f} Hm³ "
+              f"(déficit {def_opt:,.2f} Hm³/año, {self.n_evaluaciones} evaluaciones en "
+              f"{time.time() - t0:.1f} s)")
+        return {
+            'capacidades': dict(zip(NOMBRES_CAP, C_opt.tolist())),
+            'objetivo': f_opt,
+            'deficit_anual': def_opt,
+            'capacidad_total': float(C_opt.sum()),
+            'n_evaluaciones': self.n_evaluaciones,
+            'historial': self.historial,
+        }
+
+
+def main():
+    base = DimensionamientoEmbalse(semilla=42)
+    d0 = base.deficit_esperado([[175.0, 260.0, 105.0]])[0]
+    print(f"Diseño actual 175/260/105: déficit {d0:,.2f} Hm³/año")
+
+    reparto = DimensionamientoEmbalse(capacidad_total=540.0, semilla=42)
+    reparto.optimizar(max_evaluaciones=1500)
+
+    libre = DimensionamientoEmbalse(costo_capacidad=0.05, semilla=42)
+    libre.optimizar(max_evaluaciones=3000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# model/experimento_pareado.py
+import time
+from statistics import NormalDist
+
+import numpy as np
+
+from model.simulador import SimuladorEmbalse
+from model.reduccion_varianza import MuestreoMonteCarlo, config_montecarlo
+
+# Un solo estanque de 540 Hm³ sin prioridades (estructura de caso_base) con las reglas
+# del simulador: todo el volumen en el VRFI, sin volumen propio A/B y apoyo del 100%
+TANQUE_UNICO = {'C_VRFI': 540.0, 'C_A': 0.0, 'C_B': 0.0, 'frac_apoyo': 1.0, 'rsv_floor': 0.0}
+
+VARIANTES_DEFECTO = {
+    'A/B/VRFI 175/260/105': {},
+    'tanque único 540': TANQUE_UNICO,
+    'reparto 200/240/100': {'C_VRFI': 200.0, 'C_A': 240.0, 'C_B': 100.0},
+    'share_A 0.65': {'share_A': 0.65},
+}
+
+
+def variante_montecarlo(**kwargs_mc):
+    """
+    Variante que resuelve el MIP de MonteCarloEmbalse (kwargs_mc: share_A, rsv_floor,
+    frac_apoyo, ...) sobre las mismas filas de años idx que el resto de las variantes,
+    con anos_disponibles[idx]. Sólo con FE fijos (el MIP no sortea factores); una
+    simulación sin solución queda en NaN y se excluye del pareo.
+    """
+    def deficits(idx, factores):
+        if factores:
+            raise ValueError("El MIP de MonteCarloEmbalse usa FE fijos: use factores=None")
+        from monte_carlo import MonteCarloEmbalse
+        mc = MonteCarloEmbalse(num_simulaciones=len(idx), duracion_anos=idx.shape[1],
+                               salida_solver=False, **kwargs_mc)
+        anos = np.asarray(mc.anos_disponibles)
+        d = np.full(len(idx), np.nan)
+        for i, fila in enumerate(idx):
+            r = mc.ejecutar_simulacion(i, anos[fila].tolist())
+            if r is not None:
+                d[i] = (r['deficit_tipo_A'] + r['deficit_tipo_B']) / idx.shape[1]
+        return d
+    return deficits
+
+
+class ExperimentoPareado:
+    """
+    Comparación de variantes de reglas o capacidades con números aleatorios comunes.
+
+    Todas las variantes se simulan sobre la MISMA matriz de escenarios (órdenes de
+    años y factores de demanda de MuestreoMonteCarlo.muestra), así que la diferencia
+    simulación a simulación contra la referencia sólo refleja la variante. El error
+    de la diferencia media sale de la varianza de las diferencias pareadas, no de la
+    suma de las varianzas de cada variante como con escenarios independientes.
+
+    variantes = {nombre: params de SimuladorEmbalse o callable(idx, factores)}; el
+    callable recibe la matriz común de índices de años (n_sims, duración) y los
+    factores, y devuelve el déficit anual medio (n_sims,) en Hm³/año, p.ej.
+    variante_montecarlo() para el MIP. La referencia es la primera.
+    """
+
+    def __init__(self, variantes=None, referencia=None, metodo='simple', **kwargs_muestreo):
+        self.variantes = dict(VARIANTES_DEFECTO if variantes is None else variantes)
+        self.referencia = referencia or next(iter(self.variantes))
+        if self.referencia not in self.variantes:
+            raise ValueError(f"Referencia {self.referencia!r} no está entre las variantes")
+        self.metodo = metodo
+        self.muestreo = MuestreoMonteCarlo(**kwargs_muestreo)
+        self.simuladores = {nombre: v if callable(v) else SimuladorEmbalse(v)
+                            for nombre, v in self.variantes.items()}
+
+    def deficits(self, n_sims, semilla=None):
+        """Déficit anual medio (Hm³/año) por variante sobre una sola muestra común: {nombre: (n_sims,)}."""
+        idx, factores = self.muestreo.muestra(n_sims, semilla, self.metodo)
+        return {nombre: np.asarray(sim(idx, factores), dtype=float) if callable(sim)
+                else self.muestreo.deficits(idx, factores, sim)
+                for nombre, sim in self.simuladores.items()}
+
+    @staticmethod
+    def diferencias(d_var, d_ref, nivel=0.95):
+        """
+        Diferencia media (variante − referencia) con IC normal pareado y el IC que
+        tendría con escenarios independientes (misma n, varianzas marginales). Los pares
+        con NaN (simulaciones sin solución) se excluyen.
+        """
+        ok = np.isfinite(d_var) & np.isfinite(d_ref)
+        d_var, d_ref = d_var[ok], d_ref[ok]
+        n = len(d_ref)
+        z = NormalDist().inv_cdf(0.5 + nivel / 2.0)
+        diff = d_var - d_ref
+        media = float(diff.mean())
+        ee_par = float(diff.std(ddof=1) / np.sqrt(n))
+        ee_ind = float(np.sqrt((d_var.var(ddof=1) + d_ref.var(ddof=1)) / n))
+        return {
+            'media': media,
+            'ic_pareado': (media - z * ee_par, media + z * ee_par),
+            'ic_independiente': (media - z * ee_ind, media + z * ee_ind),
+            # simulaciones independientes necesarias por cada pareada para el mismo error
+            'factor_n': (ee_ind / ee_par) ** 2 if ee_par > 1e-9 else np.inf,
+            'significativo': bool(abs(media) > z * ee_par),
+            'n': n,
+        }
+
+    def correr(self, n_sims=None, semilla=42, nivel=None, verbose=True):
+        """
+        Simula todas las variantes con escenarios comunes y reporta, contra la
+        referencia, la diferencia de déficit con su IC. n_sims y nivel por defecto
+        de montecarlo.n_simulaciones y montecarlo.nivel_confianza en config.yaml.
+        """
+        cfg = config_montecarlo()
+        n_sims = n_sims or int(cfg.get('n_simulaciones', 50))
+        nivel = nivel or float(cfg.get('nivel_confianza', 0.95))
+        t0 = time.time()
+        d = self.deficits(n_sims, semilla)
+        ref = d[self.referencia]
+        tabla = {nombre: self.diferencias(d[nombre], ref, nivel)
+                 for nombre in self.variantes if nombre != self.referencia}
+
+        if verbose:
+            print(f"\n=== EXPERIMENTO PAREADO: N={n_sims} escenarios comunes ({self.metodo}), "
+                  f"IC {100 * nivel:.0f}% ===")
+            print(f"  Referencia {self.referencia}: déficit {np.nanmean(ref):,.2f} Hm³/año")
+            print(f"  {'variante':<24}{'Δ déficit':>10}{'IC pareado':>22}{'IC independiente':>24}{'×N':>9}")
+            for nombre, t in tabla.items():
+                marca = "✅" if t['significativo'] else "⚠️"
+                print(f"{marca} {nombre:<23}{t['media']:>10.2f}"
+                      f"{'[{:.2f}, {:.2f}]'.format(*t['ic_pareado']):>22}"
+                      f"{'[{:.2f}, {:.2f}]'.format(*t['ic_independiente']):>24}"
+                      f"{t['factor_n']:>9.1f}" + (f"  (n={t['n']})" if t['n'] < n_sims else ""))
+            print(f"  ×N: simulaciones independientes por cada pareada para el mismo error "
+                  f"({time.time() - t0:.1f} s)")
+        return {'deficits': d, 'diferencias': tabla, 'n_sims': n_sims, 'nivel': nivel}
+
+
+def main():
+    ExperimentoPareado().correr(semilla=42)
+
+
+if __name__ == "__main__":
+    main()
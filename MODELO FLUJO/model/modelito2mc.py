@@ -1,7 +1,9 @@
 # model/modelito2.py
 import gurobipy as gp
 from gurobipy import GRB
-import pandas as pd
+
+from utils.hydro_dataset import HydroDataset
+from utils.forzantes import Forzantes
 
 class EmbalseNuevaPunilla:
 
@@ -11,7 +13,7 @@ class EmbalseNuevaPunilla:
 
     Unidades
     --------
-    - Caudales base (Q_nuble, Q_hoya*) en m³/s → se convierten a Hm³/mes con `segundos_por_mes`.
+    - Caudales base (self.hidro: Ñuble y hoyas, HydroDataset) en m³/s → se convierten a Hm³/mes con `segundos_por_mes`.
     - Volúmenes (stocks V_*, llenados IN_*, rebalse E_TOT, entregas Q_*) en Hm³.
     - Demandas mensuales (DemA, DemB) en Hm³.
 
@@ -174,11 +176,7 @@ class EmbalseNuevaPunilla:
         }
 
         # ============ DATOS (m³/s) ============
-        self.inflow  = {}
-        self.Q_nuble = {}
-        self.Q_hoya1 = {}
-        self.Q_hoya2 = {}
-        self.Q_hoya3 = {}
+        self.hidro = None   # HydroDataset (cuenca × año × mes), ver load_flow_data
 
         # ============ DEMANDAS (m³/mes por acción) ============
         self.num_A = 21221
@@ -192,6 +190,10 @@ class EmbalseNuevaPunilla:
         self.FEA = 1.0
         self.FEB = 1.0
 
+        # ============ REGLAS DE OPERACIÓN (calibrables) ============
+        self.share_A = 0.71      # reparto del remanente A/B (B recibe 1 - share_A)
+        self.frac_apoyo = 0.5    # fracción de la demanda cubierta por propio/apoyo VRFI
+
         # ============ SSR (Hm³/año) ============
         self.V_C_H = 3.9
         self.fix_ssr_monthly = False
@@ -276,33 +278,8 @@ class EmbalseNuevaPunilla:
 
     # ===================== Datos =====================
     def load_flow_data(self, file_path):
-        xls = pd.ExcelFile(file_path)
-        nuble = pd.read_excel(xls, sheet_name='Hoja1', skiprows=4,  nrows=31)
-        hoya1 = pd.read_excel(xls, sheet_name='Hoja1', skiprows=39, nrows=31)
-        hoya2 = pd.read_excel(xls, sheet_name='Hoja1', skiprows=75, nrows=31)
-        hoya3 = pd.read_excel(xls, sheet_name='Hoja1', skiprows=110,nrows=31)
-
-        excel_col_names   = ['MAY','JUN','JUL','AGO','SEP','OCT','NOV','DIC','ENE','FEB','MAR','ABR']
-        model_month_order = [1,2,3,4,5,6,7,8,9,10,11,12]
-
-        Q_nuble, Q_hoya1, Q_hoya2, Q_hoya3, Q_afl = {},{},{},{},{}
-
-        for idx, row in nuble.iterrows():
-            year_str = str(row.get('AÑO',''))
-            if (pd.notna(row.get('AÑO')) and '/' in year_str
-                and not any(w in year_str.upper() for w in ['PROMEDIO','TOTAL','MAX','MIN'])):
-                try:
-                    year = int(year_str.split('/')[0])
-                    for col, mm in zip(excel_col_names, model_month_order):
-                        n1 = nuble.loc[idx, col]; h1 = hoya1.loc[idx, col]
-                        h2 = hoya2.loc[idx, col]; h3 = hoya3.loc[idx, col]
-                        if pd.notna(n1): Q_nuble[year, mm] = float(n1); Q_afl[year, mm] = float(n1)
-                        if pd.notna(h1): Q_hoya1[year, mm] = float(h1)
-                        if pd.notna(h2): Q_hoya2[year, mm] = float(h2)
-                        if pd.notna(h3): Q_hoya3[year, mm] = float(h3)
-                except Exception:
-                    pass
-        return Q_afl, Q_nuble, Q_hoya1, Q_hoya2, Q_hoya3
+        # arreglo (cuenca × año × mes) desde la caché binaria de caudales.xlsx
+        return HydroDataset.desde_excel(file_path)
 
     # ===================== Restricciones SOLO PARA EL MONTI CHARLI Q SINO NO FUNCA =====================
     def setup_constraints_montecarlo(self):
@@ -312,18 +289,12 @@ class EmbalseNuevaPunilla:
         """
         m = self.model
         data_file = "data/caudales.xlsx"
-        self.inflow, self.Q_nuble, self.Q_hoya1, self.Q_hoya2, self.Q_hoya3 = self.load_flow_data(data_file)
+        self.hidro = self.load_flow_data(data_file)
 
-        # QPD efectivo
-        derechos_MAY_ABR = [52.00,52.00,52.00,52.00,57.70,76.22,69.22,52.00,52.00,52.00,52.00,52.00]
-        qeco_MAY_ABR     = [10.00,10.35,14.48,15.23,15.23,15.23,15.23,15.23,12.80,15.20,16.40,17.60]
-        self.QPD_eff = {}
-        for año in self.anos:
-            y = int(año.split('/')[0])
-            for mes in self.months:
-                H = self.Q_hoya1.get((y,mes),0.0) + self.Q_hoya2.get((y,mes),0.0) + self.Q_hoya3.get((y,mes),0.0)
-                qpd_nom = max(derechos_MAY_ABR[mes-1], qeco_MAY_ABR[mes-1], max(0.0, 95.7 - H))
-                self.QPD_eff[año, mes] = min(qpd_nom, self.Q_nuble.get((y,mes),0.0))
+        # Forzantes precalculados (QPD efectivo, Qin, UPREF, demandas) en el orden del horizonte
+        self.drv = Forzantes(self.hidro, self.num_A, self.num_B, self.FEA, self.FEB, self.V_C_H)
+        F = self.drv.por_orden(self.anos)
+        self.QPD_eff = self.drv.qpd_dict(self.anos)
 
         # ========== CAMBIO CRÍTICO: Cada año empieza con stocks en 0 ==========
         for año in self.anos:
@@ -331,17 +302,13 @@ class EmbalseNuevaPunilla:
             m.addConstr(self.V_A[año,1]    == 0, name=f"init_VA_{año}")
             m.addConstr(self.V_B[año,1]    == 0, name=f"init_VB_{año}")
 
-        for año in self.anos:
-            y = int(año.split('/')[0])
+        for k, año in enumerate(self.anos):
             for i, mes in enumerate(self.months):
-                seg   = self.segundos_por_mes[mes]
-                Qin_s = self.inflow.get((y,mes), 0.0)
-                Qin   = Qin_s * seg / 1_000_000.0
-                UPREF = self.QPD_eff[año, mes] * seg / 1_000_000.0
+                Qin   = F['Qin'][k, i]
+                UPREF = F['UPREF'][k, i]
 
-                key   = self.m_mayo_abril_to_civil[mes]
-                demA  = (self.DA_a_m[key] * self.num_A * self.FEA) / 1_000_000.0
-                demB  = (self.DB_a_b[key] * self.num_B * self.FEB) / 1_000_000.0
+                demA  = self.drv.demA[i]
+                demB  = self.drv.demB[i]
 
                 # ========== CAMBIO CRÍTICO: Stocks previos solo del mes anterior DENTRO del mismo año ==========
                 if i == 0:
@@ -365,8 +332,8 @@ class EmbalseNuevaPunilla:
 
                 m.addGenConstrMin(self.FillR[año,mes], [self.Rem[año,mes], self.HeadR[año,mes]], name=f"fillR_min_{año}_{mes}")
                 m.addConstr(self.zR[año,mes]     == self.Rem[año,mes] - self.FillR[año,mes],     name=f"zR_{año}_{mes}")
-                m.addConstr(self.ShareA[año,mes] == 0.71 * self.zR[año,mes],                      name=f"shareA_{año}_{mes}")
-                m.addConstr(self.ShareB[año,mes] == 0.29 * self.zR[año,mes],                      name=f"shareB_{año}_{mes}")
+                m.addConstr(self.ShareA[año,mes] == self.share_A * self.zR[año,mes],                      name=f"shareA_{año}_{mes}")
+                m.addConstr(self.ShareB[año,mes] == (1 - self.share_A) * self.zR[año,mes],                      name=f"shareB_{año}_{mes}")
                 m.addGenConstrMin(self.FillA[año,mes], [self.ShareA[año,mes], self.HeadA[año,mes]], name=f"fillA_min_{año}_{mes}")
                 m.addGenConstrMin(self.FillB[año,mes], [self.ShareB[año,mes], self.HeadB[año,mes]], name=f"fillB_min_{año}_{mes}")
 
@@ -404,20 +371,20 @@ class EmbalseNuevaPunilla:
 
                 # (4.5) Propio primero
                 m.addConstr(self.A_avail[año,mes] == V_A_prev + self.IN_A[año,mes], name=f"A_avail_def_{año}_{mes}")
-                m.addConstr(self.A_dem50[año,mes] == 0.5*demA,                      name=f"A_dem50_def_{año}_{mes}")
+                m.addConstr(self.A_dem50[año,mes] == self.frac_apoyo*demA,                      name=f"A_dem50_def_{año}_{mes}")
                 m.addGenConstrMin(self.A_own_req[año,mes], [self.A_avail[año,mes], self.A_dem50[año,mes]],
                                 name=f"A_own_req_min_{año}_{mes}")
                 m.addConstr(self.Q_A[año,mes] >= self.A_own_req[año,mes],           name=f"A_use_own_first_{año}_{mes}")
 
                 m.addConstr(self.B_avail[año,mes] == V_B_prev + self.IN_B[año,mes], name=f"B_avail_def_{año}_{mes}")
-                m.addConstr(self.B_dem50[año,mes] == 0.5*demB,                      name=f"B_dem50_def_{año}_{mes}")
+                m.addConstr(self.B_dem50[año,mes] == self.frac_apoyo*demB,                      name=f"B_dem50_def_{año}_{mes}")
                 m.addGenConstrMin(self.B_own_req[año,mes], [self.B_avail[año,mes], self.B_dem50[año,mes]],
                                 name=f"B_own_req_min_{año}_{mes}")
                 m.addConstr(self.Q_B[año,mes] >= self.B_own_req[año,mes],           name=f"B_use_own_first_{año}_{mes}")
 
                 # (5) Apoyo VRFI
-                m.addConstr(self.tA[año,mes] == 0.5*demA - self.Q_A[año,mes], name=f"tA_def_{año}_{mes}")
-                m.addConstr(self.tB[año,mes] == 0.5*demB - self.Q_B[año,mes], name=f"tB_def_{año}_{mes}")
+                m.addConstr(self.tA[año,mes] == self.frac_apoyo*demA - self.Q_A[año,mes], name=f"tA_def_{año}_{mes}")
+                m.addConstr(self.tB[año,mes] == self.frac_apoyo*demB - self.Q_B[año,mes], name=f"tB_def_{año}_{mes}")
 
                 m.addGenConstrMax(self.needA[año,mes], [self.tA[año,mes], self.zeroVar], name=f"needA_max_{año}_{mes}")
                 m.addGenConstrMax(self.needB[año,mes], [self.tB[año,mes], self.zeroVar], name=f"needB_max_{año}_{mes}")
@@ -476,18 +443,12 @@ class EmbalseNuevaPunilla:
     def setup_constraints(self):
         m = self.model
         data_file = "data/caudales.xlsx"
-        self.inflow, self.Q_nuble, self.Q_hoya1, self.Q_hoya2, self.Q_hoya3 = self.load_flow_data(data_file)
+        self.hidro = self.load_flow_data(data_file)
 
-        # QPD efectivo (m³/s) en MAY..ABR
-        derechos_MAY_ABR = [52.00,52.00,52.00,52.00,57.70,76.22,69.22,52.00,52.00,52.00,52.00,52.00]
-        qeco_MAY_ABR     = [10.00,10.35,14.48,15.23,15.23,15.23,15.23,15.23,12.80,15.20,16.40,17.60]
-        self.QPD_eff = {}
-        for año in self.anos:
-            y = int(año.split('/')[0])
-            for mes in self.months:
-                H = self.Q_hoya1.get((y,mes),0.0) + self.Q_hoya2.get((y,mes),0.0) + self.Q_hoya3.get((y,mes),0.0)
-                qpd_nom = max(derechos_MAY_ABR[mes-1], qeco_MAY_ABR[mes-1], max(0.0, 95.7 - H))
-                self.QPD_eff[año, mes] = min(qpd_nom, self.Q_nuble.get((y,mes),0.0))
+        # Forzantes precalculados (QPD efectivo, Qin, UPREF, demandas) en el orden del horizonte
+        self.drv = Forzantes(self.hidro, self.num_A, self.num_B, self.FEA, self.FEB, self.V_C_H)
+        F = self.drv.por_orden(self.anos)
+        self.QPD_eff = self.drv.qpd_dict(self.anos)
 
         # Iniciales (MAY del primer año)
         primer = self.anos[0]
@@ -495,17 +456,14 @@ class EmbalseNuevaPunilla:
         m.addConstr(self.V_A[primer,1]    == 0, name="init_VA")
         m.addConstr(self.V_B[primer,1]    == 0, name="init_VB")
 
-        for año in self.anos:
+        for k, año in enumerate(self.anos):
             y = int(año.split('/')[0])
             for i, mes in enumerate(self.months):
-                seg   = self.segundos_por_mes[mes]
-                Qin_s = self.inflow.get((y,mes), 0.0)
-                Qin   = Qin_s * seg / 1_000_000.0
-                UPREF = self.QPD_eff[año, mes] * seg / 1_000_000.0
+                Qin   = F['Qin'][k, i]
+                UPREF = F['UPREF'][k, i]
 
-                key   = self.m_mayo_abril_to_civil[mes]
-                demA  = (self.DA_a_m[key] * self.num_A * self.FEA) / 1_000_000.0
-                demB  = (self.DB_a_b[key] * self.num_B * self.FEB) / 1_000_000.0
+                demA  = self.drv.demA[i]
+                demB  = self.drv.demB[i]
 
                 # Stocks previos
                 if i == 0:
@@ -526,8 +484,8 @@ class EmbalseNuevaPunilla:
 
                 m.addGenConstrMin(self.FillR[año,mes], [self.Rem[año,mes], self.HeadR[año,mes]], name=f"fillR_min_{año}_{mes}")
                 m.addConstr(self.zR[año,mes]     == self.Rem[año,mes] - self.FillR[año,mes],     name=f"zR_{año}_{mes}")
-                m.addConstr(self.ShareA[año,mes] == 0.71 * self.zR[año,mes],                      name=f"shareA_{año}_{mes}")
-                m.addConstr(self.ShareB[año,mes] == 0.29 * self.zR[año,mes],                      name=f"shareB_{año}_{mes}")
+                m.addConstr(self.ShareA[año,mes] == self.share_A * self.zR[año,mes],                      name=f"shareA_{año}_{mes}")
+                m.addConstr(self.ShareB[año,mes] == (1 - self.share_A) * self.zR[año,mes],                      name=f"shareB_{año}_{mes}")
                 m.addGenConstrMin(self.FillA[año,mes], [self.ShareA[año,mes], self.HeadA[año,mes]], name=f"fillA_min_{año}_{mes}")
                 m.addGenConstrMin(self.FillB[año,mes], [self.ShareB[año,mes], self.HeadB[año,mes]], name=f"fillB_min_{año}_{mes}")
 
@@ -569,20 +527,20 @@ class EmbalseNuevaPunilla:
 
                 # ========= (4.5) PROPIO PRIMERO hasta min(disponible, 50% demanda) =========
                 m.addConstr(self.A_avail[año,mes] == V_A_prev + self.IN_A[año,mes], name=f"A_avail_def_{año}_{mes}")
-                m.addConstr(self.A_dem50[año,mes] == 0.5*demA,                      name=f"A_dem50_def_{año}_{mes}")
+                m.addConstr(self.A_dem50[año,mes] == self.frac_apoyo*demA,                      name=f"A_dem50_def_{año}_{mes}")
                 m.addGenConstrMin(self.A_own_req[año,mes], [self.A_avail[año,mes], self.A_dem50[año,mes]],
                                   name=f"A_own_req_min_{año}_{mes}")
                 m.addConstr(self.Q_A[año,mes] >= self.A_own_req[año,mes],           name=f"A_use_own_first_{año}_{mes}")
 
                 m.addConstr(self.B_avail[año,mes] == V_B_prev + self.IN_B[año,mes], name=f"B_avail_def_{año}_{mes}")
-                m.addConstr(self.B_dem50[año,mes] == 0.5*demB,                      name=f"B_dem50_def_{año}_{mes}")
+                m.addConstr(self.B_dem50[año,mes] == self.frac_apoyo*demB,                      name=f"B_dem50_def_{año}_{mes}")
                 m.addGenConstrMin(self.B_own_req[año,mes], [self.B_avail[año,mes], self.B_dem50[año,mes]],
                                   name=f"B_own_req_min_{año}_{mes}")
                 m.addConstr(self.Q_B[año,mes] >= self.B_own_req[año,mes],           name=f"B_use_own_first_{año}_{mes}")
 
                 # ========= (5) Apoyo VRFI: solo para completar 50% como máximo =========
-                m.addConstr(self.tA[año,mes] == 0.5*demA - self.Q_A[año,mes], name=f"tA_def_{año}_{mes}")
-                m.addConstr(self.tB[año,mes] == 0.5*demB - self.Q_B[año,mes], name=f"tB_def_{año}_{mes}")
+                m.addConstr(self.tA[año,mes] == self.frac_apoyo*demA - self.Q_A[año,mes], name=f"tA_def_{año}_{mes}")
+                m.addConstr(self.tB[año,mes] == self.frac_apoyo*demB - self.Q_B[año,mes], name=f"tB_def_{año}_{mes}")
 
                 m.addGenConstrMax(self.needA[año,mes], [self.tA[año,mes], self.zeroVar], name=f"needA_max_{año}_{mes}")
                 m.addGenConstrMax(self.needB[año,mes], [self.tB[año,mes], self.zeroVar], name=f"needB_max_{año}_{mes}")
@@ -654,12 +612,14 @@ class EmbalseNuevaPunilla:
 
     # ===================== Exportar resultados a Excel =====================
     def export_to_excel(self, filename="resultados_embalse.xlsx"):
+        import pandas as pd
+
         data = []
         for año in self.anos:
-            y = int(año.split('/')[0])
+            iy = self.hidro.indice[año]
             for mes in self.months:
                 seg = self.segundos_por_mes[mes]
-                Qin_m3s = self.inflow.get((y,mes), 0.0); Qin = Qin_m3s*seg/1_000_000.0
+                Qin_m3s = self.hidro.nuble[iy, mes-1]; Qin = Qin_m3s*seg/1_000_000.0
                 QPD_eff_Hm3 = self.QPD_eff[año,mes]*seg/1_000_000.0
 
                 key = self.m_mayo_abril_to_civil[mes]
@@ -726,6 +686,7 @@ class EmbalseNuevaPunilla:
         lines = []
         for año in self.anos:
             y = int(año.split('/')[0])
+            iy = self.hidro.indice[año]
 
             lines.append("="*37)
             lines.append(f"REPORTE ANUAL: {año}  (mes a mes)")
@@ -739,7 +700,7 @@ class EmbalseNuevaPunilla:
 
             for i, mes in enumerate(self.months):
                 seg = self.segundos_por_mes[mes]
-                Qin_m3s = self.inflow.get((y,mes), 0.0)
+                Qin_m3s = self.hidro.nuble[iy, mes-1]
                 Qin_Hm3 = Qin_m3s * seg / 1_000_000.0
                 QPD_m3s = self.QPD_eff[año, mes]
                 QPD_Hm3 = QPD_m3s * seg / 1_000_000.0
@@ -837,7 +798,7 @@ class EmbalseNuevaPunilla:
     def solve(self):
         try:
             data_file = "data/caudales.xlsx"
-            self.inflow, self.Q_nuble, self.Q_hoya1, self.Q_hoya2, self.Q_hoya3 = self.load_flow_data(data_file)
+            self.hidro = self.load_flow_data(data_file)
             self.setup_variables()
             self.setup_constraints()
             self.set_objective()
@@ -3,6 +3,8 @@ import gurobipy as gp
 from gurobipy import GRB
 from typing import List, Dict, Any
 
+from model.sensibilidad import lp_rama_activa, valor_marginal
+
 
 class EmbalseModelMulti:
     """
@@ -97,6 +99,10 @@ class EmbalseModelMulti:
 
         EPS0 = 1.0  # m3 para “parte vacío” (evita problemas numéricos)
 
+        # demandas efectivas por mes del horizonte (para sensibilidades)
+        self.DemA_eff = [0.0] * N
+        self.DemB_eff = [0.0] * N
+
         for k in range(N):
             mes = k % 12
             seg = p['segundos_mes'][mes]
@@ -193,6 +199,8 @@ class EmbalseModelMulti:
             feB = (self.p['FE_B_12'][mes] if 'FE_B_12' in self.p else float(self.p.get('FE_B', 1.0)))
             DemA_eff = feA * demA
             DemB_eff = feB * demB
+            self.DemA_eff[k] = DemA_eff
+            self.DemB_eff[k] = DemB_eff
 
             m.addConstr(self.d_A[k] == DemA_eff - (self.R_A[k] + self.UVRFI_A[k]), f"def_deficit_A_{k}")
             m.addConstr(self.d_B[k] == DemB_eff - (self.R_B[k] + self.UVRFI_B[k]), f"def_deficit_B_{k}")
@@ -272,6 +280,97 @@ class EmbalseModelMulti:
     def set_objective(self, N: int) -> None:
         self.m.setObjective(gp.quicksum(self.d_A[k] + self.d_B[k] for k in range(N)), GRB.MINIMIZE)
 
+    def energia_expr(self, N: int) -> gp.LinExpr:
+        """Energía turbinada del horizonte (MWh), misma fórmula que 'energia_total'."""
+        seg = self.p['segundos_mes']
+        return gp.quicksum((self.p['eta'] * seg[k % 12] / 3_600_000.0) * self.Q_turb[k]
+                           for k in range(N))
+
+    # -------------------------
+    # Sensibilidades (LP de rama activa)
+    # -------------------------
+    def get_sensitivities(self, N: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Valores marginales del déficit (m³ de déficit por m³ de parámetro) para
+        C_R, C_A, C_B, consumo_humano_anual y escalas de demanda A/B.
+
+        Se obtienen de los Pi/RC del LP con las genConstr fijadas en su rama
+        activa (ver model/sensibilidad.py): son exactos mientras la solución no
+        cambie de rama y el parámetro quede dentro de 'rango'.
+        """
+        lp = lp_rama_activa(self.m)
+        lp.setParam('OutputFlag', 0)
+        lp.optimize()
+        if lp.status != GRB.OPTIMAL:
+            print(f"⚠️ LP de rama activa no óptimo (status {lp.status}); sin sensibilidades")
+            return {}
+
+        p = self.p
+        sens = {}
+        for cuenta, cap in (('R', 'C_R'), ('A', 'C_A'), ('B', 'C_B')):
+            sens[cap] = valor_marginal(
+                lp,
+                restricciones=[(f"cap{cuenta}_def_{k}", 1.0) for k in range(N)],
+                cotas_sup=[(f"V_{cuenta}[{k}]", 1.0) for k in range(N)],
+                valor_base=p[cap],
+            )
+        n_years = N // 12
+        sens['consumo_humano_anual'] = valor_marginal(
+            lp,
+            restricciones=[(f"humano_anual_y{y}", 1.0) for y in range(n_years)],
+            valor_base=p['consumo_humano_anual'],
+        )
+        # Escala s de la demanda (Dem_eff·s): RHS de déficit, no sobre-servicio y topes del 50%
+        # (el tope del 50% sólo existe en el LP en los meses con la cuenta vacía)
+        for g, dem, vacio in (('A', self.DemA_eff, self.A_empty), ('B', self.DemB_eff, self.B_empty)):
+            filas = []
+            for k in range(N):
+                filas += [(f"def_deficit_{g}_{k}", dem[k]),
+                          (f"no_overserve_{g}_{k}", dem[k]),
+                          (f"aux{g}1_def_{k}", 0.5 * dem[k])]
+                if round(vacio[k].X) == 1:
+                    filas.append((f"uvrfi{g}_half_dem_if_empty_{k}_activa", 0.5 * dem[k]))
+            sens[f'escala_demanda_{g}'] = valor_marginal(lp, restricciones=filas, valor_base=1.0)
+        return sens
+
+    # -------------------------
+    # Solución
+    # -------------------------
+    def get_solution(self, N: int) -> Dict[str, Any]:
+        sol = {
+            'V_R':  [self.V_R[k].X for k in range(N)],
+            'V_A':  [self.V_A[k].X for k in range(N)],
+            'V_B':  [self.V_B[k].X for k in range(N)],
+            'R_A':  [self.R_A[k].X for k in range(N)],
+            'R_B':  [self.R_B[k].X for k in range(N)],
+            'R_H':  [self.R_H[k].X for k in range(N)],
+            'd_A':  [self.d_A[k].X for k in range(N)],
+            'd_B':  [self.d_B[k].X for k in range(N)],
+            'UPREF':[self.UPREF[k].X for k in range(N)],
+            'IN_VRFI':[self.IN_VRFI[k].X for k in range(N)],
+            'INA':  [self.INA[k].X for k in range(N)],
+            'INB':  [self.INB[k].X for k in range(N)],
+            'SUP':  [self.SUP[k].X for k in range(N)],
+            'EB':   [self.EB[k].X for k in range(N)],
+            'UVRFI_A': [self.UVRFI_A[k].X for k in range(N)],
+            'UVRFI_B': [self.UVRFI_B[k].X for k in range(N)],
+            'Q_turb':[self.Q_turb[k].X for k in range(N)],
+            'L_R':  [self.L_R[k].X for k in range(N)],
+            'L_A':  [self.L_A[k].X for k in range(N)],
+            'L_B':  [self.L_B[k].X for k in range(N)],
+            'A_empty': [self.A_empty[k].X for k in range(N)],
+            'B_empty': [self.B_empty[k].X for k in range(N)],
+            'objetivo': self.m.objVal,
+            'status':   self.m.status,
+        }
+        # energía total
+        energia = 0.0
+        seg = self.p['segundos_mes']
+        for k in range(N):
+            energia += (self.p['eta'] * sol['Q_turb'][k] * seg[k % 12]) / 3_600_000.0
+        sol['energia_total'] = energia
+        return sol
+
     # -------------------------
     # Solve
     # -------------------------
@@ -280,7 +379,8 @@ class EmbalseModelMulti:
               QPD_eff_all_m3s: List[float],     # m3/s por mes (min(QPD_nom, Qin))
               dem_A_12: List[float],            # m3/mes (12)
               dem_B_12: List[float],            # m3/mes (12)
-              n_years: int):
+              n_years: int,
+              sensibilidad: bool = False):
         try:
             N = 12 * n_years
             self.setup_variables(N)
@@ -303,39 +403,112 @@ class EmbalseModelMulti:
             if self.m.status not in (GRB.OPTIMAL, GRB.SUBOPTIMAL):
                 return None
 
-            sol = {
-                'V_R':  [self.V_R[k].X for k in range(N)],
-                'V_A':  [self.V_A[k].X for k in range(N)],
-                'V_B':  [self.V_B[k].X for k in range(N)],
-                'R_A':  [self.R_A[k].X for k in range(N)],
-                'R_B':  [self.R_B[k].X for k in range(N)],
-                'R_H':  [self.R_H[k].X for k in range(N)],
-                'd_A':  [self.d_A[k].X for k in range(N)],
-                'd_B':  [self.d_B[k].X for k in range(N)],
-                'UPREF':[self.UPREF[k].X for k in range(N)],
-                'IN_VRFI':[self.IN_VRFI[k].X for k in range(N)],
-                'INA':  [self.INA[k].X for k in range(N)],
-                'INB':  [self.INB[k].X for k in range(N)],
-                'SUP':  [self.SUP[k].X for k in range(N)],
-                'EB':   [self.EB[k].X for k in range(N)],
-                'UVRFI_A': [self.UVRFI_A[k].X for k in range(N)],
-                'UVRFI_B': [self.UVRFI_B[k].X for k in range(N)],
-                'Q_turb':[self.Q_turb[k].X for k in range(N)],
-                'L_R':  [self.L_R[k].X for k in range(N)],
-                'L_A':  [self.L_A[k].X for k in range(N)],
-                'L_B':  [self.L_B[k].X for k in range(N)],
-                'A_empty': [self.A_empty[k].X for k in range(N)],
-                'B_empty': [self.B_empty[k].X for k in range(N)],
-                'objetivo': self.m.objVal,
-                'status':   self.m.status,
-            }
-            # energía total
-            energia = 0.0
-            seg = self.p['segundos_mes']
-            for k in range(N):
-                energia += (self.p['eta'] * sol['Q_turb'][k] * seg[k % 12]) / 3_600_000.0
-            sol['energia_total'] = energia
+            sol = self.get_solution(N)
+            if sensibilidad:
+                sol['sensibilidades'] = self.get_sensitivities(N)
             return sol
         except Exception as e:
             print(f"Error solve multi: {e}")
             return None
+
+    # -------------------------
+    # Frente de Pareto déficit–energía (epsilon-restricción)
+    # -------------------------
+    def _fijar_inicio(self) -> None:
+        """MIP start = solución actual (sirve mientras siga factible para el siguiente punto)."""
+        vars_m = self.m.getVars()
+        self.m.setAttr('Start', vars_m, self.m.getAttr('X', vars_m))
+
+    def solve_pareto(self,
+                     Q_afluente_all: List[float],
+                     QPD_eff_all_m3s: List[float],
+                     dem_A_12: List[float],
+                     dem_B_12: List[float],
+                     n_years: int,
+                     n_puntos: int = 20,
+                     guardar_soluciones: bool = False) -> List[Dict[str, Any]]:
+        """
+        Traza el frente déficit–energía sobre un único modelo construido:
+          1) min déficit               → (E_lo, D_min)
+          2) max energía               → E_max
+          3) min déficit s.a. energía ≥ ε, con ε de E_max a E_lo.
+
+        ε se recorre de mayor a menor: la solución del punto anterior sigue
+        siendo factible al relajar ε, así que se entrega como MIP start y cada
+        punto parte con incumbente. Devuelve una lista de puntos
+        {'energia_min', 'energia', 'deficit', 'status', 'tiempo'} (+ 'sol').
+        """
+        puntos = []
+        try:
+            N = 12 * n_years
+            self.setup_variables(N)
+            self.setup_constraints(Q_afluente_all, QPD_eff_all_m3s, dem_A_12, dem_B_12, n_years)
+            self.set_objective(N)
+            energia = self.energia_expr(N)
+            c_eps = self.m.addConstr(energia >= 0.0, "energia_min")
+
+            if 'TimeLimit' in self.p:
+                self.m.setParam('TimeLimit', self.p['TimeLimit'])
+            self.m.setParam('OutputFlag', 0)
+
+            def hay_solucion():
+                return self.m.SolCount > 0 and self.m.status in (GRB.OPTIMAL, GRB.SUBOPTIMAL,
+                                                                 GRB.TIME_LIMIT)
+
+            # 1) extremo de mínimo déficit
+            self.m.optimize()
+            if not hay_solucion():
+                print(f"⚠️ Pareto: sin solución de mínimo déficit (status {self.m.status})")
+                return puntos
+            E_lo = energia.getValue()
+            extremo_lo = {
+                'energia_min': E_lo,
+                'energia': E_lo,
+                'deficit': self.m.objVal,
+                'status': self.m.status,
+                'tiempo': self.m.Runtime,
+            }
+            if guardar_soluciones:
+                extremo_lo['sol'] = self.get_solution(N)
+            self._fijar_inicio()
+
+            # 2) extremo de máxima energía (el punto 1 es factible → start)
+            self.m.setObjective(energia, GRB.MAXIMIZE)
+            self.m.optimize()
+            if not hay_solucion():
+                print(f"⚠️ Pareto: sin solución de máxima energía (status {self.m.status})")
+                return [extremo_lo]
+            E_max = self.m.ObjBound if self.m.status == GRB.TIME_LIMIT else self.m.objVal
+            E_max = min(E_max, energia.getValue())
+            if E_max - E_lo <= 1e-6 * max(1.0, abs(E_max)):
+                print("ℹ️ Pareto: el mínimo déficit ya maximiza la energía (frente de un punto)")
+                return [extremo_lo]
+            self._fijar_inicio()
+
+            # 3) barrido ε descendente
+            self.set_objective(N)
+            n_puntos = max(2, int(n_puntos))
+            for i in range(n_puntos - 1):
+                eps = E_max - (E_max - E_lo) * i / (n_puntos - 1)
+                c_eps.RHS = eps
+                self.m.optimize()
+                if not hay_solucion():
+                    print(f"⚠️ Pareto: ε={eps:.1f} MWh sin solución (status {self.m.status})")
+                    continue
+                punto = {
+                    'energia_min': eps,
+                    'energia': energia.getValue(),
+                    'deficit': self.m.objVal,
+                    'status': self.m.status,
+                    'tiempo': self.m.Runtime,
+                }
+                if guardar_soluciones:
+                    punto['sol'] = self.get_solution(N)
+                puntos.append(punto)
+                self._fijar_inicio()
+
+            puntos.append(extremo_lo)  # ε = E_lo coincide con el mínimo déficit
+            return puntos
+        except Exception as e:
+            print(f"Error solve_pareto multi: {e}")
+            return puntos
@@ -0,0 +1,165 @@
+# model/reduccion_varianza.py
+import time
+
+import numpy as np
+
+from model.simulador import SimuladorEmbalse, DEM_A, DEM_B
+from utils.hydro_dataset import HydroDataset
+from utils.forzantes import Forzantes
+from utils.escenarios import GeneradorEscenarios, clases_hidrologicas
+
+# Factores de escala de demanda (FE_A, FE_B como en main_multi), uniformes en [min, max].
+# El Monte Carlo de producción usa FE fijos: por defecto MuestreoMonteCarlo no los sortea.
+FACTORES_DEMANDA = {'FE_A': (0.8, 1.2), 'FE_B': (0.8, 1.2)}
+CUANTILES = (0.50, 0.90, 0.95)
+METODOS = ('simple', 'estratificado', 'hipercubo', 'estratificado+hipercubo')
+
+
+def config_montecarlo(ruta="config/config.yaml"):
+    """Sección montecarlo de config.yaml ({} sin PyYAML o sin archivo)."""
+    try:
+        import yaml
+    except ImportError:
+        return {}
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            cfg = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+    return cfg.get('montecarlo', {}) or {}
+
+
+def n_simulaciones_config(ruta="config/config.yaml", defecto=50):
+    """montecarlo.n_simulaciones de config.yaml (sin PyYAML o sin archivo: el defecto)."""
+    return int(config_montecarlo(ruta).get('n_simulaciones', defecto))
+
+
+class MuestreoMonteCarlo:
+    """
+    Muestreo del Monte Carlo de reglas (SimuladorEmbalse) con reducción de varianza.
+
+    Dos técnicas, que comparar() mide por separado y combinadas:
+      • 'estratificado': órdenes de años estratificados por el número de años secos
+        (tercil inferior del Ñuble anual) en el horizonte, el factor que más mueve el
+        déficit (GeneradorEscenarios.indices_estratificados). Con 30 de 30 años sin
+        reemplazo ese número es fijo y no hay ganancia: sirve con reemplazo u
+        horizontes más cortos que el registro.
+      • 'hipercubo': factores de demanda en hipercubo latino, sólo si se sortean
+        factores (factores=FACTORES_DEMANDA); con FE fijos no aplica.
+    'simple' es el muestreo de MonteCarloEmbalse (años al azar, factores uniformes
+    independientes). Todos dan estimadores insesgados con pesos iguales.
+    """
+
+    def __init__(self, params=None, factores=None, duracion_anos=30, reemplazo=False,
+                 data_file="data/caudales.xlsx"):
+        hidro = HydroDataset.desde_excel(data_file)
+        self.Rem_hist = Forzantes(hidro).Rem                        # (años, 12) Hm³
+        self.clases = clases_hidrologicas(hidro.nuble.mean(axis=1))
+        self.factores = dict(factores or {})
+        self.reemplazo = reemplazo
+        self.duracion = duracion_anos if reemplazo else min(duracion_anos, len(hidro))
+        self.simulador = SimuladorEmbalse(params)
+
+    @property
+    def metodos(self):
+        """Métodos que tienen sentido: sin factores sorteados no hay hipercubo."""
+        return METODOS if self.factores else METODOS[:2]
+
+    # -------------------------
+    # Muestras
+    # -------------------------
+    def muestra(self, n_sims, semilla=None, metodo='simple'):
+        """Índices de años (n_sims, duración) y factores {nombre: (n_sims,)} del método pedido."""
+        if metodo not in METODOS:
+            raise ValueError(f"Método de muestreo desconocido: {metodo!r} (use {METODOS})")
+        gen = GeneradorEscenarios(semilla)
+        if 'estratificado' in metodo:
+            idx = gen.indices_estratificados(n_sims, self.duracion, self.clases, self.reemplazo)
+        else:
+            idx = gen.indices(n_sims, self.duracion, len(self.Rem_hist), self.reemplazo)
+        if 'hipercubo' in metodo:
+            return idx, gen.hipercubo_latino(n_sims, self.factores)
+        return idx, gen.uniformes(n_sims, self.factores)
+
+    def deficits(self, idx, factores, simulador=None):
+        """Déficit anual medio (Hm³/año) de cada simulación (con otro simulador si se da)."""
+        n = len(idx)
+        Rem = self.Rem_hist[idx].reshape(n, -1)
+        demA = factores.get('FE_A', np.ones(n))[:, None] * DEM_A
+        demB = factores.get('FE_B', np.ones(n))[:, None] * DEM_B
+        res = (simulador or self.simulador).simular(Rem, demA=demA, demB=demB, guardar=())
+        return res['deficit_total'] / self.duracion
+
+    @staticmethod
+    def estimadores(deficit):
+        """Media y percentiles del déficit por fila de deficit (..., n_sims)."""
+        est = {'media': deficit.mean(axis=-1)}
+        for q in CUANTILES:
+            est[f"p{round(100 * q)}"] = np.quantile(deficit, q, axis=-1)
+        return est
+
+    # -------------------------
+    # Comparación
+    # -------------------------
+    def comparar(self, n_sims=None, repeticiones=200, semilla=42, verbose=True):
+        """
+        Repite el Monte Carlo de n_sims simulaciones (por defecto montecarlo.n_simulaciones
+        de config.yaml) con cada método y compara la varianza entre repeticiones de cada
+        estimador contra el muestreo simple. N equivalente = simulaciones de muestreo
+        simple que darían la misma varianza que n_sims con el método.
+        """
+        n_sims = n_sims or n_simulaciones_config()
+        t0 = time.time()
+        resultados = {}
+        for metodo in self.metodos:
+            idx, fac = [], {k: [] for k in self.factores}
+            for r in range(repeticiones):
+                i, f = self.muestra(n_sims, [semilla, r], metodo)
+                idx.append(i)
+                for k in fac:
+                    fac[k].append(f[k])
+            d = self.deficits(np.concatenate(idx), {k: np.concatenate(v) for k, v in fac.items()})
+            resultados[metodo] = self.estimadores(d.reshape(repeticiones, n_sims))
+
+        tabla = {}
+        for metodo, est in resultados.items():
+            tabla[metodo] = {}
+            for nombre, x in est.items():
+                s = resultados['simple'][nombre]
+                razon = s.var(ddof=1) / x.var(ddof=1) if x.var() > 0 else np.inf
+                tabla[metodo][nombre] = {'media': float(x.mean()), 'de': float(x.std(ddof=1)),
+                                         'razon_varianza': float(razon), 'n_equivalente': float(razon * n_sims)}
+
+        if verbose:
+            muestreo = "con reemplazo" if self.reemplazo else "sin reemplazo"
+            factores = list(self.factores) if self.factores else "FE fijos"
+            print(f"\n=== REDUCCIÓN DE VARIANZA: {repeticiones} repeticiones de N={n_sims}, "
+                  f"{self.duracion} años {muestreo}, {factores} ===")
+            print(f"  {'estimador':<10}" + "".join(f"{m:>26}" for m in tabla))
+            for nombre in resultados['simple']:
+                celdas = []
+                for metodo in tabla:
+                    t = tabla[metodo][nombre]
+                    celdas.append(f"{t['media']:.2f} ± {t['de']:.2f}" if metodo == 'simple'
+                                  else f"{t['media']:.2f} ± {t['de']:.2f} (×{t['razon_varianza']:.2f})")
+                print(f"  {nombre:<10}" + "".join(f"{c:>26}" for c in celdas))
+            for metodo in list(tabla)[1:]:
+                r = [t['razon_varianza'] for t in tabla[metodo].values()]
+                marca = "✅" if min(r) > 1.2 else "⚠️"
+                print(f"{marca} {metodo}: razón de varianzas {min(r):.2f}–{max(r):.2f} "
+                      f"(N equivalente {min(r) * n_sims:.0f}–{max(r) * n_sims:.0f})")
+            print(f"  Déficit en Hm³/año ({time.time() - t0:.1f} s)")
+        return tabla
+
+
+def main():
+    # Monte Carlo de producción (30 de 30 años, FE fijos): la estratificación no cambia nada
+    MuestreoMonteCarlo().comparar(repeticiones=200, semilla=42)
+    # Con reemplazo el número de años secos varía y la estratificación sí reduce varianza
+    MuestreoMonteCarlo(reemplazo=True).comparar(repeticiones=200, semilla=42)
+    # Factores de demanda sorteados: aporte del hipercubo latino, solo y combinado
+    MuestreoMonteCarlo(factores=FACTORES_DEMANDA, reemplazo=True).comparar(repeticiones=200, semilla=42)
+
+
+if __name__ == "__main__":
+    main()
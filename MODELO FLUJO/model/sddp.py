@@ -0,0 +1,306 @@
+# model/sddp.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import gurobipy as gp
+from gurobipy import GRB
+
+from model.simulador import leer_series_historicas, DEM_A, DEM_B, PARAMS_DEFECTO
+
+CUENTAS = ('R', 'A', 'B')
+
+
+# Desempates del objetivo, como el 1e-3·apoyo VRFI del MIP de monte_carlo.py
+PESO_DESEMPATE = 1e-3
+
+
+def _construir_etapa(mes, p):
+    """
+    Problema de un mes (Hm³): relajación LP del bloque mensual del MIP de
+    monte_carlo.py (las mismas reglas que SimuladorEmbalse.paso).
+
+    Cada genConstr se relaja a sus cotas lineales, así el costo futuro es convexo en
+    (V_R, V_A, V_B) y admite cortes de Benders:
+      • llenado VRFI → A/B → rebalse: fillR = min(rem, C_VRFI − V_R) queda como
+        fillR ≤ cada argumento e IN_A/IN_B ≤ min(share·zR, holgura); la prioridad se
+        impone con un desempate PESO_DESEMPATE·zR, no como igualdad (exigirla pide
+        binarios y rompe la convexidad);
+      • piso rsv_floor: el apoyo ≤ max(VRFI libre − rsv_floor, 0) no es convexo; se usa
+        su envolvente cóncava en [0, C_VRFI], apoyo ≤ (1 − rsv_floor/C_VRFI)·VRFI libre,
+        exacta con el VRFI vacío o lleno y holgada en a lo más rsv_floor Hm³;
+      • topes frac_apoyo: servicio propio + apoyo ≤ frac_apoyo·dem por acción (lineal,
+        tA = frac_apoyo·dem − Q_A ≥ 0 en el MIP); "propio primero" (Q_A ≥ min(disp,
+        frac_apoyo·dem)) se impone con el desempate PESO_DESEMPATE·apoyo;
+      • reparto share_A del apoyo con reasignación: se omite, no cambia d_A + d_B.
+    El backlog SSR no es estado: el SSR mensual tiene holgura penalizada. El estado
+    previo entra por las restricciones 'estado_*' (RHS = volumen al inicio del mes) y
+    el remanente del río por el RHS de 'rem'.
+    """
+    m = gp.Model(f"SDDP_mes_{mes}")
+    m.setParam('OutputFlag', 0)
+    m.setParam('Threads', 1)
+
+    demA, demB = DEM_A[mes], DEM_B[mes]
+    frac = p['frac_apoyo']
+    cap = {'R': p['C_VRFI'], 'A': p['C_A'], 'B': p['C_B']}
+
+    Vp = {c: m.addVar(lb=0, ub=cap[c], name=f"Vprev_{c}") for c in CUENTAS}
+    V = {c: m.addVar(lb=0, ub=cap[c], name=f"V_{c}") for c in CUENTAS}
+    estado = {c: m.addConstr(Vp[c] == 0.0, name=f"estado_{c}") for c in CUENTAS}
+
+    fillR = m.addVar(lb=0, name="fillR")
+    zR = m.addVar(lb=0, name="zR")
+    INA = m.addVar(lb=0, name="INA")
+    INB = m.addVar(lb=0, name="INB")
+    EB = m.addVar(lb=0, name="EB")
+    R_H = m.addVar(lb=0, name="R_H")
+    ssr_def = m.addVar(lb=0, name="ssr_def")
+    R_A = m.addVar(lb=0, name="R_A")
+    R_B = m.addVar(lb=0, name="R_B")
+    UVRFI_A = m.addVar(lb=0, name="UVRFI_A")
+    UVRFI_B = m.addVar(lb=0, name="UVRFI_B")
+    d_A = m.addVar(lb=0, name="d_A")
+    d_B = m.addVar(lb=0, name="d_B")
+    L = {c: m.addVar(lb=0, name=f"L_{c}") for c in CUENTAS}
+    theta = m.addVar(lb=0, name="theta")   # costo futuro (déficit ≥ 0)
+
+    # remanente y llenado VRFI → A/B → EB (min relajados a sus cotas)
+    rem = m.addConstr(fillR + zR == 0.0, name="rem")
+    m.addConstr(fillR <= cap['R'] - Vp['R'], "capR")
+    m.addConstr(INA <= p['share_A'] * zR, "INA_share")
+    m.addConstr(INB <= (1.0 - p['share_A']) * zR, "INB_share")
+    m.addConstr(INA <= cap['A'] - Vp['A'], "INA_cap")
+    m.addConstr(INB <= cap['B'] - Vp['B'], "INB_cap")
+    m.addConstr(EB == zR - INA - INB, "EB_def")
+
+    # SSR mensual (el backlog del MIP acopla meses; aquí holgura penalizada)
+    m.addConstr(R_H + ssr_def == p['V_C_H'] / 12.0, "ssr")
+
+    # pérdidas efectivas
+    perd = p.get('perdidas_mensuales', [0.0] * 12)[mes]
+    for c in CUENTAS:
+        m.addConstr(L[c] <= p.get(f'lambda_{c}', 0.0) * perd, f"L_{c}_cap")
+        m.addConstr(L[c] <= Vp[c], f"L_{c}_stockprev")
+
+    # apoyo VRFI sobre el piso (envolvente cóncava) y entregas propias
+    libre = Vp['R'] + fillR - R_H
+    pendiente = max(1.0 - p['rsv_floor'] / cap['R'], 0.0) if cap['R'] > 0 else 0.0
+    m.addConstr(R_H + UVRFI_A + UVRFI_B <= Vp['R'] + fillR, "vrfi_avail")
+    m.addConstr(UVRFI_A + UVRFI_B <= pendiente * libre, "vrfi_piso")
+    m.addConstr(R_A <= Vp['A'] + INA, "disp_A")
+    m.addConstr(R_B <= Vp['B'] + INB, "disp_B")
+
+    # topes frac_apoyo: propio ≤ frac·dem y apoyo ≤ frac·dem − propio
+    m.addConstr(R_A + UVRFI_A <= frac * demA, "frac_A")
+    m.addConstr(R_B + UVRFI_B <= frac * demB, "frac_B")
+
+    m.addConstr(d_A == demA - (R_A + UVRFI_A), "def_deficit_A")
+    m.addConstr(d_B == demB - (R_B + UVRFI_B), "def_deficit_B")
+
+    # balances
+    m.addConstr(V['R'] == Vp['R'] + fillR - R_H - UVRFI_A - UVRFI_B - L['R'], "bal_R")
+    m.addConstr(V['A'] == Vp['A'] + INA - R_A - L['A'], "bal_A")
+    m.addConstr(V['B'] == Vp['B'] + INB - R_B - L['B'], "bal_B")
+
+    m.setObjective(d_A + d_B + p['penalizacion_ssr'] * ssr_def
+                   + PESO_DESEMPATE * (zR + UVRFI_A + UVRFI_B) + theta, GRB.MINIMIZE)
+    m.update()
+
+    h = {'V': V, 'estado': estado, 'rem': rem, 'theta': theta,
+         'd_A': d_A, 'd_B': d_B, 'n_cortes': 0,
+         'decisiones': {'R_H': R_H, 'R_A': R_A, 'R_B': R_B, 'UVRFI_A': UVRFI_A,
+                        'UVRFI_B': UVRFI_B, 'IN_VRFI': fillR, 'INA': INA, 'INB': INB, 'EB': EB}}
+    return m, h
+
+
+def _agregar_cortes(modelo, h, cortes):
+    """Agrega los cortes (α, β) aún no presentes: θ ≥ α + β·V."""
+    for alpha, beta in cortes[h['n_cortes']:]:
+        modelo.addConstr(h['theta'] >= alpha + gp.quicksum(beta[i] * h['V'][c]
+                                                           for i, c in enumerate(CUENTAS)))
+    h['n_cortes'] = len(cortes)
+
+
+def _resolver_etapa(modelo, h, x, rem):
+    """Fija estado y remanente, resuelve y devuelve (costo, V siguiente, costo inmediato)."""
+    for i, c in enumerate(CUENTAS):
+        h['estado'][c].RHS = x[i]
+    h['rem'].RHS = rem
+    modelo.optimize()
+    if modelo.status != GRB.OPTIMAL:
+        raise RuntimeError(f"Etapa SDDP no óptima (status {modelo.status})")
+    V = np.array([h['V'][c].X for c in CUENTAS])
+    return modelo.objVal, V, modelo.objVal - h['theta'].X
+
+
+# Cada proceso worker guarda sus propios modelos de etapa entre iteraciones
+_ETAPAS_WORKER = None
+
+
+def _init_worker(n_etapas, p):
+    global _ETAPAS_WORKER
+    _ETAPAS_WORKER = [_construir_etapa(t % 12, p) for t in range(n_etapas)]
+
+
+def _pasadas_forward(args):
+    """
+    Simula un grupo de trayectorias con los cortes vigentes, que viajan una sola vez
+    por tarea; devuelve [(estados visitados, costo)] por trayectoria.
+    """
+    cortes, x0, lote_rems = args
+    for t, (modelo, h) in enumerate(_ETAPAS_WORKER):
+        _agregar_cortes(modelo, h, cortes[t])
+    salida = []
+    for rems in lote_rems:
+        x = np.asarray(x0, dtype=float)
+        estados = [x]
+        costo = 0.0
+        for t, (modelo, h) in enumerate(_ETAPAS_WORKER):
+            _, x, inmediato = _resolver_etapa(modelo, h, x, rems[t])
+            estados.append(x)
+            costo += inmediato
+        salida.append((np.array(estados), costo))
+    return salida
+
+
+class SDDPEmbalse:
+    """
+    Stochastic Dual Dynamic Programming sobre las tres cuentas (VRFI, A, B) para un
+    horizonte de n_anos·12 meses.
+
+    Cada mes es la relajación LP del bloque mensual del MIP de monte_carlo.py (ver
+    _construir_etapa para las reglas que quedan relajadas). Los afluentes se muestrean
+    de los 30 años históricos de cada mes (independencia entre etapas). Las pasadas
+    forward corren en paralelo en un pool de procesos, en una tarea por proceso con
+    los cortes una sola vez; cada worker mantiene sus modelos y agrega sólo los cortes
+    nuevos. La pasada backward genera un corte de Benders promedio por estado visitado.
+
+    Resultado: cortes θ_t(V) ≥ α + β·V por etapa; decidir() entrega la operación de
+    un mes para cualquier estado con un solo LP pequeño.
+    """
+
+    def __init__(self, params=None, n_anos=3, V0=(0.0, 0.0, 0.0), n_workers=None,
+                 data_file="data/caudales.xlsx", semilla=None):
+        self.p = dict(PARAMS_DEFECTO)
+        self.p.setdefault('penalizacion_ssr', 10.0)
+        self.p.setdefault('lambda_R', 0.4)
+        self.p.setdefault('lambda_A', 0.4)
+        self.p.setdefault('lambda_B', 0.2)
+        if params:
+            self.p.update(params)
+
+        self.T = 12 * n_anos
+        self.V0 = np.asarray(V0, dtype=float)
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.rng = np.random.default_rng(semilla)
+
+        self.Rem_hist = leer_series_historicas(data_file)['Rem']   # (años, 12)
+        self.etapas = [_construir_etapa(t % 12, self.p) for t in range(self.T)]
+        self.cortes = [[] for _ in range(self.T)]
+        self.historial = []
+
+    def _realizaciones(self, t):
+        return self.Rem_hist[:, t % 12]
+
+    def _corte(self, t, x):
+        """Corte promedio para la etapa t−1 en el estado x (volumen al inicio de la etapa t)."""
+        modelo, h = self.etapas[t]
+        _agregar_cortes(modelo, h, self.cortes[t])
+        Q = []
+        pi = []
+        for rem in self._realizaciones(t):
+            obj, _, _ = _resolver_etapa(modelo, h, x, rem)
+            Q.append(obj)
+            pi.append([h['estado'][c].Pi for c in CUENTAS])
+        Q_med = float(np.mean(Q))
+        beta = np.mean(pi, axis=0)
+        return Q_med - float(beta @ x), beta, Q_med
+
+    def solve(self, max_iter=30, n_pasadas=None, tol=0.01, verbose=True):
+        """
+        Itera forward (paralelo) / backward hasta que la cota inferior quede dentro del
+        IC95% del costo forward medio y además mejore menos que tol (relativa) entre
+        iteraciones, o se alcance max_iter.
+        """
+        n_pasadas = n_pasadas or self.n_workers
+        print(f"\n=== SDDP: {self.T} etapas, {n_pasadas} pasadas forward por iteración, "
+              f"{self.n_workers} procesos ===")
+        t0 = time.time()
+
+        with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker,
+                                 initargs=(self.T, self.p)) as executor:
+            cota_ant = None
+            cota_inf, media = -np.inf, np.nan   # sin iteraciones (max_iter=0)
+            n_hist = self.Rem_hist.shape[0]
+            for it in range(1, max_iter + 1):
+                anos = self.rng.integers(0, n_hist, (n_pasadas, self.T))
+                rems = self.Rem_hist[anos, np.arange(self.T) % 12]          # (n_pasadas, T)
+                lotes = np.array_split(rems, min(self.n_workers, n_pasadas))
+                tareas = [(self.cortes, self.V0, lote) for lote in lotes]
+                pasadas = [r for grupo in executor.map(_pasadas_forward, tareas) for r in grupo]
+
+                # backward: cortes en los estados visitados
+                for t in range(self.T - 1, 0, -1):
+                    for estados, _ in pasadas:
+                        alpha, beta, _ = self._corte(t, estados[t])
+                        self.cortes[t - 1].append((alpha, beta))
+
+                # cota inferior: primera etapa en V0 promediada sobre sus afluentes
+                _, _, cota_inf = self._corte(0, self.V0)
+                costos = np.array([c for _, c in pasadas])
+                media = float(costos.mean())
+                ic = 1.96 * float(costos.std(ddof=1)) / np.sqrt(len(costos)) if len(costos) > 1 else 0.0
+                brecha = (media - cota_inf) / max(abs(media), 1e-9)
+                self.historial.append({'iteracion': it, 'cota_inferior': cota_inf,
+                                       'costo_forward': media, 'ic95': ic, 'brecha': brecha})
+                if verbose:
+                    print(f"  it {it:3d}: cota inf={cota_inf:,.1f}  forward={media:,.1f} ± {ic:,.1f} Hm³  "
+                          f"brecha={brecha:.2%}")
+                estable = cota_ant is not None and (cota_inf - cota_ant) <= tol * max(abs(cota_inf), 1e-9)
+                if estable and cota_inf >= media - ic:
+                    break
+                cota_ant = cota_inf
+
+        print(f"✅ SDDP terminado en {time.time() - t0:.1f} s, "
+              f"{sum(len(c) for c in self.cortes)} cortes")
+        return {'cota_inferior': cota_inf, 'costo_forward': media, 'historial': self.historial}
+
+    def decidir(self, t, estado, rem):
+        """Operación óptima del mes t (0-based desde MAY del año 1) para un estado y remanente dados."""
+        modelo, h = self.etapas[t]
+        _agregar_cortes(modelo, h, self.cortes[t])
+        obj, V, inmediato = _resolver_etapa(modelo, h, np.asarray(estado, dtype=float), rem)
+        dec = {k: v.X for k, v in h['decisiones'].items()}
+        dec.update({'V_R': float(V[0]), 'V_A': float(V[1]), 'V_B': float(V[2]),
+                    'd_A': h['d_A'].X, 'd_B': h['d_B'].X,
+                    'costo_inmediato': inmediato, 'costo_futuro': obj - inmediato})
+        return dec
+
+    def guardar_cortes(self, archivo="cortes_sddp.npz"):
+        """Función de costo futuro: por etapa, α (n,) y β (n, 3)."""
+        datos = {}
+        for t, cortes in enumerate(self.cortes):
+            datos[f"alpha_{t}"] = np.array([a for a, _ in cortes])
+            datos[f"beta_{t}"] = np.array([b for _, b in cortes]).reshape(-1, 3)
+        np.savez(archivo, T=self.T, **datos)
+        print(f"✅ Cortes guardados en: {archivo}")
+
+    def cargar_cortes(self, archivo="cortes_sddp.npz"):
+        datos = np.load(archivo)
+        if int(datos['T']) != self.T:
+            raise ValueError(f"Los cortes son para {int(datos['T'])} etapas, no {self.T}")
+        self.cortes = [list(zip(datos[f"alpha_{t}"], datos[f"beta_{t}"])) for t in range(self.T)]
+
+
+def main():
+    sddp = SDDPEmbalse(n_anos=3, semilla=42)
+    sddp.solve(max_iter=20)
+    sddp.guardar_cortes()
+    dec = sddp.decidir(0, (50.0, 100.0, 40.0), rem=sddp.Rem_hist[:, 0].mean())
+    print({k: round(v, 2) for k, v in dec.items()})
+
+
+if __name__ == "__main__":
+    main()
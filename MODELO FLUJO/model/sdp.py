@@ -0,0 +1,208 @@
+# model/sdp.py
+import time
+
+import numpy as np
+
+from model.simulador import SimuladorEmbalse, leer_series_historicas, DEM_A, DEM_B, MESES
+
+
+class SDPEmbalse:
+    """
+    Programación dinámica estocástica para la política mensual de entregas VRFI/A/B.
+
+    Estado: (V_VRFI, V_A, V_B) discretizados en una grilla regular + clase de afluente
+    del mes (cuantiles del remanente Rem = Qin − QPD_eff, por mes). Las transiciones
+    entre clases se estiman de caudales.xlsx (mes m → mes m+1, ABR → MAY del año
+    siguiente). La decisión del mes (conocido el afluente) es la fracción fA, fB de
+    la demanda que cada acción sirve con volumen propio; el llenado, SSR y apoyo
+    VRFI siguen las reglas de SimuladorEmbalse.paso, que se evalúa por broadcasting
+    sobre toda la grilla × clases × decisiones a la vez.
+
+    Costo mensual: (d_A + d_B)^exponente (1 = déficit total como en los MIP; 2
+    premia repartir el déficit entre meses). El backlog SSR no es estado: se supone
+    al día al tomar la decisión.
+    """
+
+    def __init__(self, params=None, n_grilla=(15, 15, 10), n_clases=3, n_decisiones=6,
+                 exponente=1.0, descuento=1.0, data_file="data/caudales.xlsx"):
+        self.sim = SimuladorEmbalse(params)
+        self.p = self.sim.p
+        self.n_clases = n_clases
+        self.exponente = exponente
+        self.descuento = descuento
+
+        self.grillas = [np.linspace(0.0, self.p[c], n)
+                        for c, n in zip(('C_VRFI', 'C_A', 'C_B'), n_grilla)]
+        # frac_apoyo primero: ante empate argmin elige la regla base (la del MIP)
+        self.decisiones = np.linspace(self.p['frac_apoyo'], 1.0, n_decisiones)
+
+        series = leer_series_historicas(data_file)
+        self.Rem_hist = series['Rem']          # (años, 12)
+        self._estimar_clases()
+
+        self.valor = None
+        self.politica_A = None
+        self.politica_B = None
+
+    # -------------------------
+    # Afluentes: clases y transiciones
+    # -------------------------
+    def _estimar_clases(self, suavizado=1.0):
+        """Umbrales por cuantiles, valor representativo por clase y matrices P[m] (K x K)."""
+        K = self.n_clases
+        R = self.Rem_hist
+        q = np.linspace(0, 1, K + 1)[1:-1]
+        self.umbrales = np.quantile(R, q, axis=0).T                   # (12, K-1)
+        clase = np.stack([np.searchsorted(self.umbrales[m], R[:, m], side='right')
+                          for m in range(12)], axis=1)                 # (años, 12)
+
+        self.Rem_clase = np.zeros((12, K))
+        for m in range(12):
+            for k in range(K):
+                sel = R[clase[:, m] == k, m]
+                self.Rem_clase[m, k] = sel.mean() if sel.size else np.median(R[:, m])
+
+        # pares (mes m, mes m+1); ABR de un año con MAY del siguiente
+        self.P = np.zeros((12, K, K))
+        for m in range(12):
+            if m < 11:
+                desde, hacia = clase[:, m], clase[:, m + 1]
+            else:
+                desde, hacia = clase[:-1, 11], clase[1:, 0]
+            cuenta = np.full((K, K), suavizado)
+            np.add.at(cuenta, (desde, hacia), 1.0)
+            self.P[m] = cuenta / cuenta.sum(axis=1, keepdims=True)
+
+    def clase_de(self, mes, Rem):
+        """Clase de afluente de Rem en el mes (0=MAY..11=ABR)."""
+        return np.searchsorted(self.umbrales[mes], Rem, side='right')
+
+    # -------------------------
+    # Interpolación trilineal vectorizada
+    # -------------------------
+    def _interp(self, W, k, vR, vA, vB):
+        """W: (K, nR, nA, nB); k y v*: arreglos broadcast-compatibles."""
+        idx, pesos = [], []
+        for g, v in zip(self.grillas, (vR, vA, vB)):
+            paso = g[1] - g[0]
+            pos = np.clip(v / paso, 0.0, len(g) - 1)
+            i0 = np.minimum(pos.astype(int), len(g) - 2)
+            idx.append(i0)
+            pesos.append(pos - i0)
+        (i, j, l), (t, u, w) = idx, pesos
+        return ((1 - t) * ((1 - u) * ((1 - w) * W[k, i, j, l] + w * W[k, i, j, l + 1])
+                           + u * ((1 - w) * W[k, i, j + 1, l] + w * W[k, i, j + 1, l + 1]))
+                + t * ((1 - u) * ((1 - w) * W[k, i + 1, j, l] + w * W[k, i + 1, j, l + 1])
+                       + u * ((1 - w) * W[k, i + 1, j + 1, l] + w * W[k, i + 1, j + 1, l + 1])))
+
+    # -------------------------
+    # Recursión hacia atrás
+    # -------------------------
+    def resolver(self, max_anos=60, tol=1e-4, verbose=True):
+        """
+        Recursión de Bellman mes a mes (ABR → MAY) repetida por años hasta que la
+        política anual no cambia y la variación relativa del valor es < tol.
+        """
+        K = self.n_clases
+        nR, nA, nB = (len(g) for g in self.grillas)
+        nD = len(self.decisiones)
+
+        # ejes: (K, nR, nA, nB, nD_A, nD_B)
+        vR = self.grillas[0].reshape(1, nR, 1, 1, 1, 1)
+        vA = self.grillas[1].reshape(1, 1, nA, 1, 1, 1)
+        vB = self.grillas[2].reshape(1, 1, 1, nB, 1, 1)
+        fA = self.decisiones.reshape(1, 1, 1, 1, nD, 1)
+        fB = self.decisiones.reshape(1, 1, 1, 1, 1, nD)
+        kk = np.arange(K).reshape(K, 1, 1, 1, 1, 1)
+
+        V = np.zeros((12, K, nR, nA, nB))
+        pol_A = np.zeros((12, K, nR, nA, nB), dtype=np.int8)
+        pol_B = np.zeros_like(pol_A)
+        V_sig = np.zeros((K, nR, nA, nB))     # valor de MAY del año siguiente
+
+        t0 = time.time()
+        for ano in range(max_anos):
+            pol_ant = (pol_A.copy(), pol_B.copy())
+            V_may_ant = V[0].copy()
+            for m in range(11, -1, -1):
+                # valor esperado del mes siguiente condicionado a la clase actual
+                W = np.einsum('kj,jabc->kabc', self.P[m], V_sig)
+                Rem = self.Rem_clase[m].reshape(K, 1, 1, 1, 1, 1)
+                paso = self.sim.paso(vR, vA, vB, 0.0, Rem, DEM_A[m], DEM_B[m], fA, fB)
+                costo = (paso['d_A'] + paso['d_B']) ** self.exponente
+                Q = costo + self.descuento * self._interp(W, kk, paso['V_R'], paso['V_A'], paso['V_B'])
+
+                Q = Q.reshape(K, nR, nA, nB, nD * nD)
+                mejor = Q.argmin(axis=-1)
+                V[m] = np.take_along_axis(Q, mejor[..., None], axis=-1)[..., 0]
+                pol_A[m], pol_B[m] = np.divmod(mejor, nD)
+                V_sig = V[m]
+
+            # valor relativo (evita que crezca sin cota con descuento 1)
+            base = V[0].min()
+            V -= base
+            V_sig = V[0]
+            cambio = np.max(np.abs(V[0] - (V_may_ant - V_may_ant.min()))) / max(np.max(np.abs(V[0])), 1e-9)
+            igual = np.array_equal(pol_A, pol_ant[0]) and np.array_equal(pol_B, pol_ant[1])
+            if verbose:
+                print(f"  año {ano + 1:3d}: costo anual≈{base:,.2f}  Δvalor={cambio:.2e}  "
+                      f"política {'estable' if igual else 'cambia'}")
+            if ano > 0 and igual and cambio < tol:
+                break
+
+        self.valor = V
+        self.politica_A = self.decisiones[pol_A]
+        self.politica_B = self.decisiones[pol_B]
+        print(f"✅ SDP resuelta en {time.time() - t0:.1f} s ({ano + 1} años de recursión)")
+        return {'valor': V, 'politica_A': self.politica_A, 'politica_B': self.politica_B,
+                'umbrales': self.umbrales, 'Rem_clase': self.Rem_clase, 'P': self.P}
+
+    # -------------------------
+    # Uso de la política
+    # -------------------------
+    def politica(self, t, mes, estado, Rem_t):
+        """Política para SimuladorEmbalse.simular: punto de grilla más cercano."""
+        k = self.clase_de(mes, Rem_t)
+        ind = []
+        for g, v in zip(self.grillas, (estado['V_R'], estado['V_A'], estado['V_B'])):
+            ind.append(np.clip(np.rint(v / (g[1] - g[0])).astype(int), 0, len(g) - 1))
+        return (self.politica_A[mes, k, ind[0], ind[1], ind[2]],
+                self.politica_B[mes, k, ind[0], ind[1], ind[2]])
+
+    def tabla_politica(self, mes, clase):
+        """Tabla (V_VRFI x V_A) de fA y (V_VRFI x V_B) de fB promediadas en el tercer eje."""
+        return {
+            'mes': MESES[mes],
+            'fA': self.politica_A[mes, clase].mean(axis=2),
+            'fB': self.politica_B[mes, clase].mean(axis=1),
+        }
+
+    def evaluar(self, Rem=None, V0=(0.0, 0.0, 0.0)):
+        """
+        Compara la política SDP con la regla base usando el simulador rápido.
+        Rem: (n_escenarios, T) en Hm³ desde MAY; por defecto la serie histórica encadenada.
+        """
+        if Rem is None:
+            Rem = self.Rem_hist.reshape(1, -1)
+        base = self.sim.simular(Rem, V0=V0)
+        sdp = self.sim.simular(Rem, V0=V0, politica=self.politica)
+        return {
+            'deficit_regla_base': base['deficit_total'],
+            'deficit_sdp': sdp['deficit_total'],
+            'costo_regla_base': ((base['d_A'] + base['d_B']) ** self.exponente).sum(axis=-1),
+            'costo_sdp': ((sdp['d_A'] + sdp['d_B']) ** self.exponente).sum(axis=-1),
+        }
+
+
+def main():
+    sdp = SDPEmbalse(exponente=2.0)
+    sdp.resolver()
+    res = sdp.evaluar()
+    print(f"Déficit histórico regla base: {res['deficit_regla_base'][0]:,.1f} Hm³ "
+          f"(costo {res['costo_regla_base'][0]:,.0f})")
+    print(f"Déficit histórico política SDP: {res['deficit_sdp'][0]:,.1f} Hm³ "
+          f"(costo {res['costo_sdp'][0]:,.0f})")
+
+
+if __name__ == "__main__":
+    main()
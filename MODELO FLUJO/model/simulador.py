@@ -0,0 +1,173 @@
+# model/simulador.py
+import numpy as np
+
+from utils.hydro_dataset import HydroDataset
+from utils.forzantes import Forzantes, NUM_A, NUM_B, DA_ACCION, DB_ACCION
+
+# Meses en orden del Excel / monte_carlo.py: 1=MAY, ..., 12=ABR
+MESES = ['MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC', 'ENE', 'FEB', 'MAR', 'ABR']
+
+DEM_A = DA_ACCION * NUM_A / 1_000_000.0   # Hm³/mes
+DEM_B = DB_ACCION * NUM_B / 1_000_000.0
+
+PARAMS_DEFECTO = {
+    'C_VRFI': 175.0,
+    'C_A': 260.0,
+    'C_B': 105.0,
+    'V_C_H': 3.9,        # SSR anual (Hm³)
+    'rsv_floor': 1.5,    # piso de reserva VRFI
+    'share_A': 0.71,     # reparto del remanente y del apoyo VRFI
+    'frac_apoyo': 0.5,   # fracción de la demanda que el VRFI garantiza
+}
+
+
+def leer_series_historicas(data_file="data/caudales.xlsx"):
+    """
+    Lee Ñuble y hoyas como en monte_carlo.py y devuelve arreglos (años, 12) en orden MAY..ABR:
+    {'anos', 'Qin' (Hm³), 'UPREF' (Hm³), 'Rem' (Hm³)}.
+    """
+    hidro = HydroDataset.desde_excel(data_file)
+    drv = Forzantes(hidro)
+    return {'anos': list(hidro.anos), 'Qin': drv.Qin, 'UPREF': drv.UPREF, 'Rem': drv.Rem}
+
+
+class SimuladorEmbalse:
+    """
+    Simulación vectorizada (NumPy) de las reglas de operación de monte_carlo.py:
+      • el remanente llena VRFI primero, luego A/B en share_A / (1 − share_A), resto rebalsa;
+      • SSR mensual = V_C_H/12 con backlog, servido desde VRFI;
+      • cada acción sirve con su propio volumen min(disp, frac_apoyo·dem): el MIP no
+        sirve más que frac_apoyo·dem desde A/B (tA = frac_apoyo·dem − Q_A ≥ 0);
+      • el VRFI (sobre rsv_floor) apoya hasta frac_apoyo·dem, repartido share_A con reasignación.
+    Con esta regla base los déficits coinciden con los del MIP de monte_carlo.py.
+
+    Todo se evalúa con broadcasting: Rem puede tener forma (..., T) para muchos
+    escenarios y los parámetros pueden ser arreglos (p.ej. capacidades por candidato).
+    No resuelve ningún MIP, así que reemplaza al modelo de Gurobi cuando sólo se
+    necesitan las reglas (políticas, calibración, dimensionamiento).
+    """
+
+    def __init__(self, params=None):
+        self.p = dict(PARAMS_DEFECTO)
+        if params:
+            self.p.update(params)
+
+    def paso(self, V_R, V_A, V_B, backlog, Rem, demA, demB, fA=None, fB=None):
+        """
+        Un mes de operación. fA/fB ∈ [frac_apoyo, 1]: fracción de la demanda que se
+        intenta servir con volumen propio (None = frac_apoyo, la regla de monte_carlo.py;
+        1 = servir todo lo posible desde A/B).
+        Devuelve un dict con el estado siguiente y los flujos del mes.
+        """
+        p = self.p
+        share_A = p['share_A']
+        frac = p['frac_apoyo']
+        fA = frac if fA is None else fA
+        fB = frac if fB is None else fB
+
+        # Llenado: VRFI primero, luego A/B y rebalse
+        FillR = np.minimum(Rem, p['C_VRFI'] - V_R)
+        zR = Rem - FillR
+        IN_A = np.minimum(share_A * zR, p['C_A'] - V_A)
+        IN_B = np.minimum((1.0 - share_A) * zR, p['C_B'] - V_B)
+        E = Rem - FillR - IN_A - IN_B
+
+        # SSR con backlog
+        due = p['V_C_H'] / 12.0 + backlog
+        Q_ch = np.minimum(due, V_R + FillR)
+        backlog = due - Q_ch
+        libre = np.maximum(V_R + FillR - Q_ch - p['rsv_floor'], 0.0)
+
+        # Servicio propio
+        A_disp = V_A + IN_A
+        B_disp = V_B + IN_B
+        Q_A = np.minimum(A_disp, np.maximum(frac, fA) * demA)
+        Q_B = np.minimum(B_disp, np.maximum(frac, fB) * demB)
+
+        # Apoyo VRFI hasta frac·dem con reparto y reasignación
+        needA = np.maximum(frac * demA - Q_A, 0.0)
+        needB = np.maximum(frac * demB - Q_B, 0.0)
+        S = np.minimum(libre, needA + needB)
+        pA = share_A * S
+        pB = (1.0 - share_A) * S
+        allocA = np.minimum(pA, needA)
+        allocB = np.minimum(pB, needB)
+        apoyoA = allocA + np.minimum(pB - allocB, needA - allocA)
+        apoyoB = allocB + np.minimum(pA - allocA, needB - allocB)
+
+        servA = Q_A + apoyoA
+        servB = Q_B + apoyoB
+        return {
+            'V_R': V_R + FillR - Q_ch - apoyoA - apoyoB,
+            'V_A': A_disp - Q_A,
+            'V_B': B_disp - Q_B,
+            'backlog': backlog,
+            'd_A': demA - servA,
+            'd_B': demB - servB,
+            'Q_A': Q_A, 'Q_B': Q_B,
+            'apoyo_A': apoyoA, 'apoyo_B': apoyoB,
+            'Q_ch': Q_ch,
+            'rebalse': E,
+            'Q_turb': servA + servB + E,
+        }
+
+    def simular(self, Rem, demA=None, demB=None, V0=(0.0, 0.0, 0.0), politica=None,
+                mes_inicial=0, guardar=('d_A', 'd_B', 'V_R', 'V_A', 'V_B')):
+        """
+        Simula T meses consecutivos. Rem: (..., T) en Hm³; demA/demB: (12,) o (..., T)
+        (por defecto las demandas de monte_carlo.py). politica(t, mes, estado, Rem_t)
+        devuelve (fA, fB) o None para la regla base. Devuelve arreglos (..., T) de
+        las series en 'guardar' más los totales 'deficit_total', 'deficit_A', 'deficit_B'.
+        """
+        Rem = np.asarray(Rem, dtype=float)
+        T = Rem.shape[-1]
+        lote = Rem.shape[:-1]
+        meses = (mes_inicial + np.arange(T)) % 12
+
+        def por_mes(dem, defecto):
+            dem = defecto if dem is None else np.asarray(dem, dtype=float)
+            return dem[..., meses] if dem.shape[-1] == 12 and T != 12 else dem
+
+        demA = por_mes(demA, DEM_A)
+        demB = por_mes(demB, DEM_B)
+
+        cero = np.zeros(np.broadcast_shapes(lote, *(np.shape(v) for v in self.p.values())))
+        estado = {
+            'V_R': cero + V0[0], 'V_A': cero + V0[1], 'V_B': cero + V0[2], 'backlog': cero.copy()
+        }
+        series = {k: np.empty(cero.shape + (T,)) for k in guardar}
+        dA_tot = np.zeros_like(cero)
+        dB_tot = np.zeros_like(cero)
+
+        for t in range(T):
+            fA, fB = None, None
+            if politica is not None:
+                dec = politica(t, meses[t], estado, Rem[..., t])
+                if dec is not None:
+                    fA, fB = dec
+            paso = self.paso(estado['V_R'], estado['V_A'], estado['V_B'], estado['backlog'],
+                             Rem[..., t], demA[..., t], demB[..., t], fA, fB)
+            estado = {k: paso[k] for k in ('V_R', 'V_A', 'V_B', 'backlog')}
+            dA_tot += paso['d_A']
+            dB_tot += paso['d_B']
+            for k in guardar:
+                series[k][..., t] = paso[k]
+
+        series['deficit_A'] = dA_tot
+        series['deficit_B'] = dB_tot
+        series['deficit_total'] = dA_tot + dB_tot
+        series['estado_final'] = estado
+        return series
+
+    def simular_ensamble(self, ensamble, tam_lote=1024, demA=None, demB=None):
+        """
+        Simula un EnsambleHidrologico en disco (utils.ensamble) por lotes de escenarios,
+        sin cargarlo completo. Devuelve los déficits totales por escenario (Hm³); con
+        parámetros vectoriales el escenario es el último eje, como en simular.
+        """
+        totales = {'deficit_A': [], 'deficit_B': [], 'deficit_total': []}
+        for _, Rem in ensamble.lotes_rem(tam_lote):
+            res = self.simular(Rem, demA=demA, demB=demB, guardar=())
+            for k in totales:
+                totales[k].append(res[k])
+        return {k: np.concatenate(v, axis=-1) for k, v in totales.items()}
@@ -0,0 +1,175 @@
+# model/sintetico.py
+import time
+
+import numpy as np
+
+from utils.hydro_dataset import HydroDataset
+from utils.cache_caudales import CUENCAS
+from utils.ensamble import EnsambleHidrologico
+from utils.escenarios import GeneradorEscenarios
+
+
+def _raiz_psd(M):
+    """Raíz simétrica de una matriz semidefinida (autovalores negativos por redondeo → 0)."""
+    vals, vecs = np.linalg.eigh((M + M.T) / 2.0)
+    return (vecs * np.sqrt(np.maximum(vals, 0.0))) @ vecs.T
+
+
+class GeneradorAR1Periodico:
+    """
+    Hidrología sintética multisitio: AR(1) periódico (un modelo por mes) sobre el
+    logaritmo de los caudales de Ñuble + Hoya 1–3, ajustado con el método matricial
+    de Matalas:
+
+        Z_t = A_m Z_{t−1} + B_m ε_t,     ε_t ~ N(0, I)
+        A_m = M1_m · M0_{m−1}⁻¹,         B_m B_mᵀ = M0_m − A_m M1_mᵀ
+
+    con Z los log-caudales estandarizados por mes y sitio, M0_m la covarianza entre
+    sitios del mes m y M1_m la covarianza cruzada con el mes anterior (MAY usa el ABR
+    del año previo). Conserva autocorrelación mes a mes y correlación entre cuencas
+    en espacio log. Las hoyas están casi perfectamente correlacionadas entre sí, así
+    que M0 es casi singular: se usan pseudo-inversa y raíz simétrica.
+
+    La marginal de cada cuenca y mes es Q = exp(mu + sd·Z) con mu, sd elegidos para
+    reproducir la media Y la varianza muestrales (momentos de la lognormal), no los
+    momentos de log Q: en los meses casi secos de las hoyas (DIC–ABR, mínimos de
+    0.02 m³/s) el log tiene una cola izquierda larga que inflaba sd y, al volver
+    a m³/s, la desviación y los máximos sintéticos (≈2× la desviación histórica).
+    Las hoyas fijan el QPD efectivo (95.7 − H), así que esa varianza pasaba al Rem.
+
+    Todos los escenarios avanzan juntos en el tiempo (vectorizado en el eje de
+    escenarios); el escenario i usa el flujo i de GeneradorEscenarios(semilla).
+    """
+
+    def __init__(self, hidro=None, calentamiento=5):
+        self.hidro = hidro if hidro is not None else HydroDataset.desde_excel()
+        self.calentamiento = calentamiento     # años descartados al inicio de cada serie
+        self.ajustar()
+
+    def ajustar(self):
+        Q = self.hidro.may_abr.transpose(1, 2, 0)                             # (años, 12, 4)
+        L = np.log(np.maximum(Q, 1e-6))
+        Z = (L - L.mean(axis=0)) / L.std(axis=0)      # sólo para la dependencia (M0, M1)
+
+        # marginal lognormal con la media y la varianza de Q:
+        # E[Q] = exp(mu + sd²/2),  Var[Q] = E[Q]²·(exp(sd²) − 1)
+        media, var = Q.mean(axis=0), Q.var(axis=0)
+        self.sd = np.sqrt(np.log1p(var / media ** 2))                        # (12, 4)
+        self.mu = np.log(media) - self.sd ** 2 / 2.0
+
+        # pares (Z_t, Z_{t−1}) por mes; para MAY el anterior es ABR del año previo
+        serie = Z.reshape(-1, len(CUENCAS))
+        self.M0 = np.stack([Z[:, m].T @ Z[:, m] / len(Z) for m in range(12)])
+        self.M1 = np.empty_like(self.M0)
+        for m in range(12):
+            t = np.arange(m, len(serie), 12)
+            t = t[t > 0]
+            self.M1[m] = serie[t].T @ serie[t - 1] / len(t)
+
+        self.A = np.empty_like(self.M0)
+        self.B = np.empty_like(self.M0)
+        for m in range(12):
+            previo = self.M0[m - 1]
+            self.A[m] = self.M1[m] @ np.linalg.pinv(previo, rcond=1e-8, hermitian=True)
+            self.B[m] = _raiz_psd(self.M0[m] - self.A[m] @ self.M1[m].T)
+        self._raiz_M0_abr = _raiz_psd(self.M0[11])
+        return self
+
+    # -------------------------
+    # Generación
+    # -------------------------
+    def simular(self, n_escenarios, n_anos, semilla=None, inicio=0):
+        """Q sintético (n_escenarios, 4, n_anos, 12) en m³/s, orden MAY..ABR."""
+        gen = GeneradorEscenarios(semilla)
+        T = 12 * (n_anos + self.calentamiento)
+        eps = np.empty((n_escenarios, T + 1, len(CUENCAS)))
+        for k in range(n_escenarios):
+            eps[k] = gen.rng(inicio + k).standard_normal((T + 1, len(CUENCAS)))
+
+        z = eps[:, 0] @ self._raiz_M0_abr.T              # estado inicial ~ N(0, M0_ABR)
+        Z = np.empty((n_escenarios, T, len(CUENCAS)))
+        for t in range(T):
+            m = t % 12
+            z = z @ self.A[m].T + eps[:, t + 1] @ self.B[m].T
+            Z[:, t] = z
+
+        Z = Z[:, 12 * self.calentamiento:].reshape(n_escenarios, n_anos, 12, len(CUENCAS))
+        return np.exp(self.mu + self.sd * Z).transpose(0, 3, 1, 2)
+
+    def generar_ensamble(self, ruta, n_escenarios, n_anos=30, semilla=None, tam_lote=1024,
+                         dtype='float32'):
+        """Escribe el ensamble por lotes en un EnsambleHidrologico (utils.ensamble) y lo abre."""
+        gen = GeneradorEscenarios(semilla)
+        meta = {'generador': 'ar1_periodico_matalas', 'entropia': str(gen.entropia),
+                'calentamiento': self.calentamiento, 'anos_ajuste': [self.hidro.anos[0], self.hidro.anos[-1]]}
+        t0 = time.time()
+        with EnsambleHidrologico.crear(ruta, n_escenarios, n_anos, dtype, meta) as ens:
+            for i in range(0, n_escenarios, tam_lote):
+                n = min(tam_lote, n_escenarios - i)
+                ens.escribir(i, self.simular(n, n_anos, gen.entropia, inicio=i))
+        print(f"✅ {n_escenarios:,} escenarios x {n_anos} años sintéticos ({n_escenarios * n_anos:,} años) "
+              f"en {time.time() - t0:.1f} s → {ruta}")
+        return EnsambleHidrologico.abrir(ruta)
+
+    # -------------------------
+    # Validación
+    # -------------------------
+    @staticmethod
+    def estadisticos(Q):
+        """
+        Media, desviación y autocorrelación lag-1 mensual por cuenca, correlación
+        Ñuble–hoyas, máximo por serie y sequías.
+        """
+        Q = np.asarray(Q, dtype=float)
+        if Q.ndim == 3:
+            Q = Q[None]
+        serie = Q.reshape(Q.shape[0], len(CUENCAS), -1)                 # (n, 4, T)
+        a, b = serie[..., 1:], serie[..., :-1]
+        a = a - a.mean(axis=-1, keepdims=True)
+        b = b - b.mean(axis=-1, keepdims=True)
+        lag1 = (a * b).sum(-1) / np.sqrt((a ** 2).sum(-1) * (b ** 2).sum(-1))
+        c = serie - serie.mean(axis=-1, keepdims=True)
+        cruz = (c[:, :1] * c[:, 1:]).sum(-1) / np.sqrt((c[:, :1] ** 2).sum(-1) * (c[:, 1:] ** 2).sum(-1))
+
+        anual = Q[:, 0].mean(axis=-1)                                   # Ñuble medio anual (n, años)
+        k = min(3, anual.shape[1])
+        movil = np.lib.stride_tricks.sliding_window_view(anual, k, axis=1).mean(axis=-1)
+        return {
+            'media': Q.mean(axis=(0, 2)),                               # (4, 12)
+            'desv': Q.std(axis=2).mean(axis=0),
+            'lag1': lag1.mean(axis=0),                                  # (4,)
+            'corr_nuble_hoyas': cruz.mean(axis=0),                      # (3,)
+            'maximo': np.median(Q.max(axis=(2, 3)), axis=0),            # (4,) mediana del máximo por serie
+            'anual_min': float(anual.min()),
+            f'sequia_{k}a_min': float(movil.min()),
+        }
+
+    def validar(self, Q_sint):
+        """Compara estadísticos del ensamble sintético con el histórico y los imprime."""
+        hist = self.estadisticos(self.hidro.may_abr)
+        sint = self.estadisticos(Q_sint)
+        print("\n=== AR(1) PERIÓDICO: SINTÉTICO vs HISTÓRICO ===")
+        for c, nombre in enumerate(CUENCAS):
+            err = np.abs(sint['media'][c] / hist['media'][c] - 1).max()
+            razon = sint['desv'][c] / hist['desv'][c]
+            marca = "✅" if np.all(np.abs(razon - 1) < 0.15) else "⚠️"
+            print(f"{marca} {nombre:<6} media máx. error {100 * err:5.1f}%   "
+                  f"desv/hist {razon.min():.2f}–{razon.max():.2f}   "
+                  f"lag-1 {sint['lag1'][c]:.3f} (hist {hist['lag1'][c]:.3f})   "
+                  f"máximo {sint['maximo'][c]:.1f} (hist {hist['maximo'][c]:.1f}) m³/s")
+        print(f"  corr Ñuble–hoyas {np.round(sint['corr_nuble_hoyas'], 3)} "
+              f"(hist {np.round(hist['corr_nuble_hoyas'], 3)})")
+        clave = next(k for k in hist if k.startswith('sequia'))
+        print(f"  Ñuble anual mínimo {sint['anual_min']:.2f} m³/s (hist {hist['anual_min']:.2f}); "
+              f"{clave} {sint[clave]:.2f} (hist {hist[clave]:.2f})")
+        return {'historico': hist, 'sintetico': sint}
+
+
+def main():
+    gen = GeneradorAR1Periodico()
+    ens = gen.generar_ensamble("data/.cache/sintetico_ar1.ens", n_escenarios=2000, n_anos=30, semilla=42)
+    gen.validar(ens.Q[:500])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# model/sustituto.py
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from model.simulador import SimuladorEmbalse, leer_series_historicas, DEM_A, DEM_B
+from model.dimensionamiento import escenarios_montecarlo
+from utils.memoria_compartida import MemoriaCompartida, adjuntar, compartido
+
+# Ejes del espacio de parámetros y nodos por defecto de la grilla regular
+EJES_DEFECTO = {
+    'C_VRFI': np.linspace(100.0, 250.0, 4),
+    'C_A': np.linspace(150.0, 350.0, 4),
+    'C_B': np.linspace(50.0, 160.0, 5),
+    'share_A': np.linspace(0.6, 0.8, 3),
+    'rsv_floor': np.linspace(0.0, 5.0, 3),
+    'esc_dem': np.linspace(0.8, 1.2, 3),     # escala de las demandas A y B
+}
+SALIDAS = ('deficit_esperado', 'p50', 'p90', 'p95')
+
+
+def _evaluar_lote(args):
+    """Salidas (n, len(SALIDAS)) para un lote de puntos (n, d) — una sola simulación."""
+    X, nombres, Rem, params = args
+    if Rem is None:
+        Rem = compartido('Rem')                    # ensamble en memoria compartida
+    p = dict(params)
+    esc = np.ones((len(X), 1, 1))
+    for i, nombre in enumerate(nombres):
+        if nombre == 'esc_dem':
+            esc = X[:, i].reshape(-1, 1, 1)
+        else:
+            p[nombre] = X[:, i:i + 1]                  # (n, 1) × ensamble → (n, n_esc)
+    res = SimuladorEmbalse(p).simular(Rem, demA=esc * DEM_A, demB=esc * DEM_B, guardar=())
+    anual = res['deficit_total'] / (Rem.shape[-1] / 12.0)     # (n, n_esc) Hm³/año
+    return np.column_stack([anual.mean(axis=1)] + [np.percentile(anual, q, axis=1) for q in (50, 90, 95)])
+
+
+class SustitutoDeficit:
+    """
+    Modelo sustituto del déficit anual (Hm³/año) en función del diseño y las reglas:
+    capacidades, share_A, rsv_floor y escala de demanda.
+
+    Se construye evaluando con SimuladorEmbalse todos los nodos de una grilla regular
+    sobre el ensamble Monte Carlo y se consulta por interpolación multilineal (2^d
+    vértices), del orden de microsegundos por punto. El error de interpolación se mide
+    contra simulaciones en puntos aleatorios fuera de la grilla y queda guardado con
+    el sustituto (.npz), así que cada respuesta viene con su error registrado.
+    """
+
+    def __init__(self, ejes=None, valores=None, error=None, info=None):
+        self.ejes = {k: np.asarray(v, dtype=float) for k, v in (ejes or EJES_DEFECTO).items()}
+        self.nombres = tuple(self.ejes)
+        self.valores = valores            # (n_1, ..., n_d, len(SALIDAS))
+        self.error = error or {}
+        self.info = info or {}
+        self._preparar()
+
+    def _preparar(self):
+        d = len(self.nombres)
+        self._grillas = [self.ejes[k] for k in self.nombres]
+        self._n = np.array([len(g) for g in self._grillas])
+        self._vertices = np.array(list(itertools.product((0, 1), repeat=d)))   # (2^d, d)
+        self._pasos = np.array([int(np.prod(self._n[i + 1:])) for i in range(d)])
+        self._plano = None if self.valores is None else self.valores.reshape(-1, len(SALIDAS))
+        self._base = dict(SimuladorEmbalse().p, esc_dem=1.0)
+
+    # -------------------------
+    # Construcción
+    # -------------------------
+    def construir(self, params=None, n_escenarios=100, duracion_anos=30, n_validacion=200,
+                  n_workers=None, semilla=None, data_file="data/caudales.xlsx", lote=256):
+        """Simula todos los nodos de la grilla y estima el error en n_validacion puntos al azar."""
+        rng = np.random.default_rng(semilla)
+        Rem_hist = leer_series_historicas(data_file)['Rem']
+        Rem = escenarios_montecarlo(Rem_hist, n_escenarios, duracion_anos, semilla)
+        params = dict(params or {})
+        n_workers = n_workers or os.cpu_count() or 1
+
+        nodos = np.array(list(itertools.product(*self._grillas)))
+        X_val = np.column_stack([rng.uniform(g[0], g[-1], n_validacion) for g in self._grillas])
+
+        print(f"\n=== SUSTITUTO: {len(nodos)} nodos + {n_validacion} de validación, "
+              f"ensamble {Rem.shape[0]}x{Rem.shape[1]} meses ===")
+        t0 = time.time()
+        X = np.vstack([nodos, X_val])
+        lotes = [X[i:i + lote] for i in range(0, len(X), lote)]
+        if n_workers > 1 and len(lotes) > 1:
+            tareas = [(L, self.nombres, None, params) for L in lotes]
+            with MemoriaCompartida({'Rem': Rem}) as mem, \
+                    ProcessPoolExecutor(max_workers=n_workers, initializer=adjuntar,
+                                        initargs=(mem.descriptor,)) as executor:
+                Y = np.vstack(list(executor.map(_evaluar_lote, tareas)))
+        else:
+            Y = np.vstack([_evaluar_lote((L, self.nombres, Rem, params)) for L in lotes])
+
+        self.valores = Y[:len(nodos)].reshape(tuple(self._n) + (len(SALIDAS),))
+        self._preparar()
+
+        dif = self.consultar_lote(X_val) - Y[len(nodos):]
+        self.error = {
+            s: {'mae': float(np.abs(dif[:, j]).mean()),
+                'rmse': float(np.sqrt(np.mean(dif[:, j] ** 2))),
+                'max': float(np.abs(dif[:, j]).max())}
+            for j, s in enumerate(SALIDAS)
+        }
+        self.info = {'n_escenarios': n_escenarios, 'duracion_anos': duracion_anos,
+                     'n_validacion': n_validacion, 'semilla': -1 if semilla is None else semilla}
+        print(f"✅ Sustituto construido en {time.time() - t0:.1f} s  "
+              f"(error déficit esperado: MAE {self.error['deficit_esperado']['mae']:.3f}, "
+              f"máx {self.error['deficit_esperado']['max']:.3f} Hm³/año)")
+        return self
+
+    # -------------------------
+    # Consulta
+    # -------------------------
+    def consultar_lote(self, X):
+        """X: (m, d) en el orden de self.nombres → (m, len(SALIDAS)). Fuera de la grilla se satura."""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        i0 = np.empty(X.shape, dtype=np.int64)
+        t = np.empty(X.shape)
+        for j, g in enumerate(self._grillas):
+            x = np.clip(X[:, j], g[0], g[-1])
+            k = np.clip(np.searchsorted(g, x, side='right') - 1, 0, len(g) - 2)
+            i0[:, j] = k
+            t[:, j] = (x - g[k]) / (g[k + 1] - g[k])
+        # pesos y posiciones de los 2^d vértices de cada celda
+        pesos = np.prod(np.where(self._vertices[None], t[:, None], 1.0 - t[:, None]), axis=2)
+        flat = (i0[:, None, :] + self._vertices[None]) @ self._pasos
+        return np.einsum('mv,mvs->ms', pesos, self._plano[flat])
+
+    def consultar(self, **valores):
+        """
+        Consulta puntual, p.ej. consultar(C_B=120). Los ejes omitidos toman el valor
+        base (PARAMS_DEFECTO, esc_dem=1). Devuelve las salidas y el error registrado.
+        """
+        desconocidos = set(valores) - set(self.nombres)
+        if desconocidos:
+            raise KeyError(f"Parámetros fuera del sustituto: {sorted(desconocidos)}")
+        x = [valores.get(k, self._base[k]) for k in self.nombres]
+        y = self.consultar_lote([x])[0]
+        res = dict(zip(SALIDAS, y.tolist()))
+        res['error'] = self.error
+        res['fuera_de_rango'] = [k for k, v in zip(self.nombres, x)
+                                 if not self.ejes[k][0] <= v <= self.ejes[k][-1]]
+        return res
+
+    # -------------------------
+    # Serialización
+    # -------------------------
+    def guardar(self, archivo="sustituto_deficit.npz"):
+        errores = np.array([[self.error[s][m] for m in ('mae', 'rmse', 'max')] for s in SALIDAS])
+        np.savez(archivo, nombres=np.array(self.nombres), valores=self.valores, errores=errores,
+                 info=np.array([self.info.get(k, 0) for k in ('n_escenarios', 'duracion_anos',
+                                                              'n_validacion', 'semilla')]),
+                 **{f"eje_{k}": v for k, v in self.ejes.items()})
+        print(f"✅ Sustituto guardado en: {archivo}")
+
+    @classmethod
+    def cargar(cls, archivo="sustituto_deficit.npz"):
+        datos = np.load(archivo)
+        nombres = [str(k) for k in datos['nombres']]
+        error = {s: dict(zip(('mae', 'rmse', 'max'), map(float, fila)))
+                 for s, fila in zip(SALIDAS, datos['errores'])}
+        info = dict(zip(('n_escenarios', 'duracion_anos', 'n_validacion', 'semilla'),
+                        datos['info'].tolist()))
+        return cls({k: datos[f"eje_{k}"] for k in nombres}, datos['valores'], error, info)
+
+
+def main():
+    sust = SustitutoDeficit().construir(semilla=42)
+    sust.guardar()
+
+    sust = SustitutoDeficit.cargar()
+    t0 = time.perf_counter()
+    res = sust.consultar(C_B=120.0)
+    dt = (time.perf_counter() - t0) * 1e6
+    print(f"¿Y si B tuviera 120 Hm³? déficit esperado {res['deficit_esperado']:,.2f} Hm³/año "
+          f"(p90 {res['p90']:,.2f}, ±{res['error']['deficit_esperado']['rmse']:.2f} RMSE) "
+          f"— consulta en {dt:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
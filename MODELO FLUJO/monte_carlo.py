@@ -1,10 +1,30 @@
 # monte_carlo_simulation.py
+import os
 import numpy as np
-import pandas as pd
-import gurobipy as gp
-from gurobipy import GRB
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+from utils.hydro_dataset import HydroDataset
+from utils.forzantes import Forzantes
+from utils.memoria_compartida import MemoriaCompartida, adjuntar, dataset_compartido
+from utils.escenarios import GeneradorEscenarios, claves_unicas
+
+# Instancia del proceso trabajador (ver ejecutar_monte_carlo_paralelo)
+_MC_TRABAJADOR = None
+
+
+def _init_trabajador(descriptor, kwargs):
+    """Adjunta el dataset y los forzantes compartidos; no se lee el Excel ni se copia nada."""
+    global _MC_TRABAJADOR
+    adjuntar(descriptor)
+    _MC_TRABAJADOR = MonteCarloEmbalse(dataset=dataset_compartido(), **kwargs)
+
+
+def _simular_en_trabajador(args):
+    num_sim, escenario, time_limit, mip_gap = args
+    return _MC_TRABAJADOR.ejecutar_simulacion(num_sim, escenario, time_limit, mip_gap)
+
+
 class MonteCarloEmbalse:
     """
     Simulación de Monte Carlo para el Embalse Nueva Punilla.
@@ -12,9 +32,29 @@ class MonteCarloEmbalse:
     pero con el orden de los años aleatorio.
     """
     
-    def __init__(self, num_simulaciones=100, duracion_anos=30):
+    def __init__(self, num_simulaciones=100, duracion_anos=30,
+                 share_A=0.71, rsv_floor=1.5, frac_apoyo=0.5, dataset=None, semilla=None,
+                 largo_bloque=None, bloque_estacionario=False, reemplazo=False, estratificado=False,
+                 threads=None, salida_solver=True):
         self.num_simulaciones = num_simulaciones
+        # Gurobi: hilos por modelo (None = todos) y log en pantalla; en el pool van 1 y False
+        self.threads = threads
+        self.salida_solver = salida_solver
         self.duracion_anos = duracion_anos
+        # Órdenes de años: flujos SeedSequence por bloque de simulaciones, reproducibles por índice
+        self.generador = GeneradorEscenarios(semilla)
+        # Bootstrap por bloques (None = permutación sin reemplazo de años sueltos)
+        self.largo_bloque = largo_bloque
+        self.bloque_estacionario = bloque_estacionario
+        # Años con reemplazo (permite duracion_anos > 30) y estratificación por número de
+        # años secos (GeneradorEscenarios.indices_estratificados; ver model/reduccion_varianza.py)
+        self.reemplazo = reemplazo
+        self.estratificado = estratificado
+
+        # Reglas de operación (calibrables, ver model/calibracion.py)
+        self.share_A = share_A        # reparto A/B del remanente y del apoyo VRFI
+        self.rsv_floor = rsv_floor    # piso de reserva VRFI (Hm³)
+        self.frac_apoyo = frac_apoyo  # fracción de la demanda con propio primero / apoyo VRFI
         
         self.anos_disponibles = [
             '1989/1990', '1990/1991', '1991/1992', '1992/1993', '1993/1994',
@@ -26,63 +66,59 @@ class MonteCarloEmbalse:
         ]
         
         self.resultados_simulaciones = []
-        self._cargar_datos_base()
+        # Simulaciones sin incumbente al cerrar el Monte Carlo adaptativo: {num_simulacion: cota}
+        self.sin_incumbente = {}
+        self._cota_sin_incumbente = None
+        if dataset is not None:
+            # (HydroDataset, Forzantes) ya cargados, p.ej. vistas de memoria compartida
+            self.hidro, self.drv = dataset
+        else:
+            self._cargar_datos_base()
         
     def _cargar_datos_base(self):
-        """Carga los datos de caudales base desde Excel."""
+        """Carga los caudales base como HydroDataset (caché binaria de data/caudales.xlsx)."""
         data_file = "data/caudales.xlsx"
-        xls = pd.ExcelFile(data_file)
-        
-        nuble = pd.read_excel(xls, sheet_name='Hoja1', skiprows=4, nrows=31)
-        hoya1 = pd.read_excel(xls, sheet_name='Hoja1', skiprows=39, nrows=31)
-        hoya2 = pd.read_excel(xls, sheet_name='Hoja1', skiprows=75, nrows=31)
-        hoya3 = pd.read_excel(xls, sheet_name='Hoja1', skiprows=110, nrows=31)
-        
-        excel_col_names = ['MAY','JUN','JUL','AGO','SEP','OCT','NOV','DIC','ENE','FEB','MAR','ABR']
-        model_month_order = [1,2,3,4,5,6,7,8,9,10,11,12]
-        
-        self.Q_nuble_base = {}
-        self.Q_hoya1_base = {}
-        self.Q_hoya2_base = {}
-        self.Q_hoya3_base = {}
-        self.Q_afl_base = {}
-        
-        for idx, row in nuble.iterrows():
-            year_str = str(row.get('AÑO',''))
-            if (pd.notna(row.get('AÑO')) and '/' in year_str
-                and not any(w in year_str.upper() for w in ['PROMEDIO','TOTAL','MAX','MIN'])):
-                try:
-                    year = int(year_str.split('/')[0])
-                    for col, mm in zip(excel_col_names, model_month_order):
-                        n1 = nuble.loc[idx, col]
-                        h1 = hoya1.loc[idx, col]
-                        h2 = hoya2.loc[idx, col]
-                        h3 = hoya3.loc[idx, col]
-                        if pd.notna(n1):
-                            self.Q_nuble_base[year, mm] = float(n1)
-                            self.Q_afl_base[year, mm] = float(n1)
-                        if pd.notna(h1): self.Q_hoya1_base[year, mm] = float(h1)
-                        if pd.notna(h2): self.Q_hoya2_base[year, mm] = float(h2)
-                        if pd.notna(h3): self.Q_hoya3_base[year, mm] = float(h3)
-                except Exception:
-                    pass
+        self.hidro = HydroDataset.desde_excel(data_file)
+        self.drv = Forzantes(self.hidro)
     
-    def generar_escenario(self):
-        # Genera un escenario aleatorio seleccionando años sin reemplazo, aleatoriza el input
-        anos_disponibles = self.anos_disponibles.copy()
-        escenario = []
-        
-        for _ in range(min(self.duracion_anos, len(anos_disponibles))):
-            ano_seleccionado = np.random.choice(anos_disponibles)
-            escenario.append(ano_seleccionado)
-            anos_disponibles.remove(ano_seleccionado)
-            
-        return escenario
+    def generar_escenarios(self, n=None, inicio=0):
+        """
+        Escenarios de las simulaciones inicio..inicio+n−1 (años sin reemplazo, orden
+        aleatorio, con reemplazo, o bloques de años consecutivos con largo_bloque) en
+        una sola llamada; la simulación i siempre recibe el mismo orden. Con
+        estratificado, el número de años secos de cada escenario se estratifica sobre
+        las num_simulaciones de la corrida.
+        """
+        n = self.num_simulaciones if n is None else n
+        if self.largo_bloque:
+            return self.generador.secuencias(self.anos_disponibles, n, self.duracion_anos, inicio=inicio,
+                                             largo_bloque=self.largo_bloque,
+                                             estacionario=self.bloque_estacionario)
+        dur = self.duracion_anos if self.reemplazo else min(self.duracion_anos, len(self.anos_disponibles))
+        clases = None
+        if self.estratificado:
+            from utils.escenarios import clases_hidrologicas
+            anual = self.hidro.nuble.mean(axis=1)[[self.hidro.indice[a] for a in self.anos_disponibles]]
+            clases = clases_hidrologicas(anual)
+        return self.generador.secuencias(self.anos_disponibles, n, dur, self.reemplazo, inicio=inicio,
+                                         clases=clases, n_total=self.num_simulaciones)
+
+    def diagnostico_rachas(self, escenarios=None):
+        """Rachas de años secos (tercil inferior del Ñuble anual) de los escenarios vs el histórico."""
+        from utils.escenarios import diagnostico_rachas
+        escenarios = self.generar_escenarios() if escenarios is None else escenarios
+        idx = np.array([[self.hidro.indice[a] for a in esc] for esc in escenarios])
+        return diagnostico_rachas(idx, self.hidro.nuble.mean(axis=1))
+
+    def generar_escenario(self, num_sim=0):
+        # Escenario de la simulación num_sim (regenerable por separado)
+        return self.generar_escenarios(1, inicio=num_sim)[0]
     
-    def ejecutar_simulacion(self, num_sim, anos_escenario):
+    def ejecutar_simulacion(self, num_sim, anos_escenario, time_limit=None, mip_gap=None):
         """
         Ejecuta una simulación con años consecutivos.
         Los stocks se transfieren de un año al siguiente.
+        time_limit / mip_gap: presupuesto opcional por simulación (None = sin límite).
         """
         print(f"\n{'='*60}")
         print(f"Ejecutando Simulación #{num_sim + 1}/{self.num_simulaciones}")
@@ -90,7 +126,7 @@ class MonteCarloEmbalse:
         print(f"{'='*60}")
         
         try:
-            resultado = self._resolver_modelo_montecarlo(anos_escenario)
+            resultado = self._resolver_modelo_montecarlo(anos_escenario, time_limit, mip_gap)
             
             if resultado is not None:
                 resultado['num_simulacion'] = num_sim + 1
@@ -107,35 +143,38 @@ class MonteCarloEmbalse:
             traceback.print_exc()
             return None
     
-    def _resolver_modelo_montecarlo(self, anos_escenario):
+    def _resolver_modelo_montecarlo(self, anos_escenario, time_limit=None, mip_gap=None):
         """
         Resuelve el modelo con años en secuencia.
         Los stocks finales de un año son los iniciales del siguiente.
+        Si se agota el presupuesto (time_limit), devuelve el incumbente y la cota.
         """
+        import gurobipy as gp        # diferido: cargar datos/escenarios no toca la licencia
+        from gurobipy import GRB
+
         model = gp.Model("MC_Embalse")
-        model.setParam('OutputFlag', 1)
+        model.setParam('OutputFlag', 1 if self.salida_solver else 0)
+        if self.threads is not None:
+            model.setParam('Threads', self.threads)
+        if time_limit is not None:
+            model.setParam('TimeLimit', time_limit)
+        if mip_gap is not None:
+            model.setParam('MIPGap', mip_gap)
         
         # Parámetros
         C_VRFI = 175
         C_TIPO_A = 260
         C_TIPO_B = 105
         V_C_H = 3.9
-        RSV_FLOOR = 1.5  # Piso de reserva VRFI
-        
-        segundos_por_mes = {
-            1: 31*24*3600, 2: 30*24*3600, 3: 31*24*3600, 4: 31*24*3600,
-            5: 30*24*3600, 6: 31*24*3600, 7: 30*24*3600, 8: 31*24*3600,
-            9: 31*24*3600, 10: 28*24*3600, 11: 31*24*3600, 12: 30*24*3600
-        }
-        
-        num_A = 21221
-        num_B = 7100
-        DA_a_m = {1:9503,2:6516,3:3452,4:776,5:0,6:0,7:0,8:0,9:0,10:2444,11:6516,12:9580}
-        DB_a_b = {1:3361,2:2305,3:1221,4:274,5:0,6:0,7:0,8:0,9:0,10:864,11:2305,12:3388}
-        m_civil = {1:5,2:6,3:7,4:8,5:9,6:10,7:11,8:12,9:1,10:2,11:3,12:4}
+        RSV_FLOOR = self.rsv_floor  # Piso de reserva VRFI
+        SHARE_A = self.share_A
+        FRAC_APOYO = self.frac_apoyo
         
-        derechos = [52.00,52.00,52.00,52.00,57.70,76.22,69.22,52.00,52.00,52.00,52.00,52.00]
-        qeco = [10.00,10.35,14.48,15.23,15.23,15.23,15.23,15.23,12.80,15.20,16.40,17.60]
+        # Forzantes del escenario (Hm³/mes): Qin, UPREF (QPD efectivo), demandas A/B
+        F = self.drv.por_orden(anos_escenario)
+        anos_escenario = claves_unicas(anos_escenario)   # con bloques un año puede repetirse
+        demA_mes = self.drv.demA
+        demB_mes = self.drv.demB
         
         months = list(range(1, 13))
         
@@ -206,38 +245,20 @@ class MonteCarloEmbalse:
         extra_to_A = model.addVars(anos_escenario, months, name="extra_to_A", lb=0)
         extra_to_B = model.addVars(anos_escenario, months, name="extra_to_B", lb=0)
 
-        # Calcular QPD efectivo
-        QPD_eff = {}
-        for año in anos_escenario:
-            y = int(año.split('/')[0])
-            for mes in months:
-                H = (self.Q_hoya1_base.get((y,mes),0) + 
-                     self.Q_hoya2_base.get((y,mes),0) + 
-                     self.Q_hoya3_base.get((y,mes),0))
-                qpd_nom = max(derechos[mes-1], qeco[mes-1], max(0, 95.7 - H))
-                QPD_eff[año, mes] = min(qpd_nom, self.Q_nuble_base.get((y,mes),0))
-        
         ssr_month = V_C_H / 12.0
 
         # RESTRICCIONES
-        # Primer año empieza con stocks en 0
-        primer_ano = anos_escenario[0]
-        model.addConstr(V_VRFI[primer_ano, 1] == 0, name="init_VRFI")
-        model.addConstr(V_A[primer_ano, 1] == 0, name="init_VA")
-        model.addConstr(V_B[primer_ano, 1] == 0, name="init_VB")
+        # Primer año empieza con stocks en 0: entra como V_*_prev = 0 del primer mes
+        # (V_*[primer_ano, 1] es el volumen al final de mayo, no se fija)
         
         for idx_ano, año in enumerate(anos_escenario):
-            y = int(año.split('/')[0])
             
             for i, mes in enumerate(months):
-                seg = segundos_por_mes[mes]
-                Qin_s = self.Q_afl_base.get((y,mes), 0)
-                Qin = Qin_s * seg / 1_000_000.0
-                UPREF = QPD_eff[año, mes] * seg / 1_000_000.0
+                Qin = F['Qin'][idx_ano, i]
+                UPREF = F['UPREF'][idx_ano, i]
                 
-                key = m_civil[mes]
-                demA = (DA_a_m[key] * num_A) / 1_000_000.0
-                demB = (DB_a_b[key] * num_B) / 1_000_000.0
+                demA = demA_mes[i]
+                demB = demB_mes[i]
                 
                 # Stocks previos - CONSECUTIVOS entre años
                 if i == 0:  # Primer mes del año
@@ -288,8 +309,8 @@ class MonteCarloEmbalse:
                 
                 model.addGenConstrMin(FillR[año,mes], [Rem[año,mes], HeadR[año,mes]])
                 model.addConstr(zR[año,mes] == Rem[año,mes] - FillR[año,mes])
-                model.addConstr(ShareA[año,mes] == 0.71 * zR[año,mes])
-                model.addConstr(ShareB[año,mes] == 0.29 * zR[año,mes])
+                model.addConstr(ShareA[año,mes] == SHARE_A * zR[año,mes])
+                model.addConstr(ShareB[año,mes] == (1 - SHARE_A) * zR[año,mes])
                 model.addGenConstrMin(IN_A[año,mes], [ShareA[año,mes], HeadA[año,mes]])
                 model.addGenConstrMin(IN_B[año,mes], [ShareB[año,mes], HeadB[año,mes]])
                 
@@ -312,18 +333,18 @@ class MonteCarloEmbalse:
                 
                 # Propio primero
                 model.addConstr(A_avail[año,mes] == V_A_prev + IN_A[año,mes])
-                model.addConstr(A_dem50[año,mes] == 0.5*demA)
+                model.addConstr(A_dem50[año,mes] == FRAC_APOYO*demA)
                 model.addGenConstrMin(A_own_req[año,mes], [A_avail[año,mes], A_dem50[año,mes]])
                 model.addConstr(Q_A[año,mes] >= A_own_req[año,mes])
                 
                 model.addConstr(B_avail[año,mes] == V_B_prev + IN_B[año,mes])
-                model.addConstr(B_dem50[año,mes] == 0.5*demB)
+                model.addConstr(B_dem50[año,mes] == FRAC_APOYO*demB)
                 model.addGenConstrMin(B_own_req[año,mes], [B_avail[año,mes], B_dem50[año,mes]])
                 model.addConstr(Q_B[año,mes] >= B_own_req[año,mes])
                 
                 # Apoyo VRFI
-                model.addConstr(tA[año,mes] == 0.5*demA - Q_A[año,mes])
-                model.addConstr(tB[año,mes] == 0.5*demB - Q_B[año,mes])
+                model.addConstr(tA[año,mes] == FRAC_APOYO*demA - Q_A[año,mes])
+                model.addConstr(tB[año,mes] == FRAC_APOYO*demB - Q_B[año,mes])
                 model.addGenConstrMax(needA[año,mes], [tA[año,mes], zeroVar])
                 model.addGenConstrMax(needB[año,mes], [tB[año,mes], zeroVar])
                 
@@ -332,8 +353,8 @@ class MonteCarloEmbalse:
                 model.addGenConstrMin(SupportTot[año,mes], [VRFI_avail_free[año, mes], needTot[año,mes]])
 
                 # Reparto proporcional base 71/29
-                model.addConstr(pA[año, mes] == 0.71 * SupportTot[año, mes])
-                model.addConstr(pB[año, mes] == 0.29 * SupportTot[año, mes])
+                model.addConstr(pA[año, mes] == SHARE_A * SupportTot[año, mes])
+                model.addConstr(pB[año, mes] == (1 - SHARE_A) * SupportTot[año, mes])
 
                 # Asignación base sin exceder la necesidad
                 model.addGenConstrMin(allocA_base[año, mes], [pA[año, mes], needA[año, mes]])
@@ -373,12 +394,22 @@ class MonteCarloEmbalse:
         # Resolver
         model.optimize()
         
-        if model.status not in (GRB.OPTIMAL, GRB.SUBOPTIMAL):
+        # Con presupuesto agotado sirve el incumbente si existe
+        if model.status not in (GRB.OPTIMAL, GRB.SUBOPTIMAL, GRB.TIME_LIMIT):
+            return None
+        if model.SolCount == 0:
+            # presupuesto agotado sin incumbente: se guarda la cota (−inf si no hay) para
+            # acotar los percentiles (ver adaptativo); None queda para infactible/error
+            try:
+                self._cota_sin_incumbente = float(model.ObjBound)
+            except (AttributeError, gp.GurobiError):
+                self._cota_sin_incumbente = -np.inf
             return None
         
-        # Obtener tiempo de ejecución y gap
+        # Obtener tiempo de ejecución, gap y cota inferior (ObjBound)
         tiempo_ejecucion = model.Runtime
         gap = model.MIPGap if hasattr(model, 'MIPGap') else 0.0
+        cota_inferior = model.ObjBound if model.IsMIP else model.objVal
         
         # Calcular métricas
         deficit_total = model.objVal
@@ -390,7 +421,7 @@ class MonteCarloEmbalse:
         rebalse_total = sum(E_TOT[año, mes].X for año in anos_escenario for mes in months)
         
         # Calcular caudal disponible total (Qin - QPD)
-        caudal_disponible_total = 0
+        caudal_disponible_total = float(F['Rem'].sum())
         
         # Calcular demandas y servicios totales para satisfacción
         demanda_total_A = 0
@@ -399,19 +430,10 @@ class MonteCarloEmbalse:
         servicio_total_B = 0
         
         for año in anos_escenario:
-            y = int(año.split('/')[0])
-            for mes in months:
-                # Caudal disponible
-                seg = segundos_por_mes[mes]
-                Qin_s = self.Q_afl_base.get((y,mes), 0)
-                Qin = Qin_s * seg / 1_000_000.0
-                UPREF = QPD_eff[año, mes] * seg / 1_000_000.0
-                caudal_disponible_total += (Qin - UPREF)
-                
+            for i, mes in enumerate(months):
                 # Demandas y servicios
-                key = m_civil[mes]
-                demA = (DA_a_m[key] * num_A) / 1_000_000.0
-                demB = (DB_a_b[key] * num_B) / 1_000_000.0
+                demA = demA_mes[i]
+                demB = demB_mes[i]
                 
                 demanda_total_A += demA
                 demanda_total_B += demB
@@ -445,6 +467,8 @@ class MonteCarloEmbalse:
             'apoyo_vrfi_b': apoyo_vrfi_B,
             'rebalse_total': rebalse_total,
             'gap': gap,
+            'cota_inferior': cota_inferior,
+            'optimo': model.status == GRB.OPTIMAL,
             'tiempo_ejecucion_seg': tiempo_ejecucion,
             'vol_final_VRFI': vol_final_VRFI,
             'vol_final_A': vol_final_A,
@@ -469,8 +493,7 @@ class MonteCarloEmbalse:
         print(f"Duración por simulación: {self.duracion_anos} años")
         print(f"{'#'*60}\n")
         
-        for i in range(self.num_simulaciones):
-            escenario = self.generar_escenario()
+        for i, escenario in enumerate(self.generar_escenarios()):
             resultado = self.ejecutar_simulacion(i, escenario)
             
             if resultado is not None:
@@ -480,9 +503,161 @@ class MonteCarloEmbalse:
         print(f"MONTE CARLO COMPLETADO")
         print(f"Simulaciones exitosas: {len(self.resultados_simulaciones)}/{self.num_simulaciones}")
         print(f"{'#'*60}\n")
-    
+
+    def ejecutar_monte_carlo_paralelo(self, n_workers=None, time_limit=None, mip_gap=None,
+                                      threads_por_proceso=1):
+        """
+        Igual que ejecutar_monte_carlo, pero reparte las simulaciones en un pool de procesos.
+        Cada trabajador resuelve con Threads=threads_por_proceso y sin log de Gurobi
+        (como sddp.py), para no sobresuscribir la máquina ni entremezclar salidas.
+
+        Los escenarios se sortean aquí (los mismos que la versión serial). El
+        HydroDataset y los forzantes precalculados se publican una vez en memoria
+        compartida; cada trabajador adjunta vistas de sólo lectura en vez de releer
+        caudales.xlsx o recibir copias, así la memoria no crece con n_workers.
+        """
+        n_workers = n_workers or os.cpu_count() or 1
+        escenarios = self.generar_escenarios()
+        kwargs = {'num_simulaciones': self.num_simulaciones, 'duracion_anos': self.duracion_anos,
+                  'share_A': self.share_A, 'rsv_floor': self.rsv_floor, 'frac_apoyo': self.frac_apoyo,
+                  'largo_bloque': self.largo_bloque, 'bloque_estacionario': self.bloque_estacionario,
+                  'reemplazo': self.reemplazo, 'estratificado': self.estratificado,
+                  'threads': threads_por_proceso, 'salida_solver': False}
+
+        print(f"\n{'#'*60}")
+        print(f"INICIANDO SIMULACIÓN DE MONTE CARLO EN PARALELO")
+        print(f"Número de simulaciones: {self.num_simulaciones}  |  procesos: {n_workers}")
+        print(f"Duración por simulación: {self.duracion_anos} años")
+        print(f"{'#'*60}\n")
+
+        with MemoriaCompartida.desde_dataset(self.hidro, self.drv) as mem:
+            print(f"Datos compartidos: {mem.nbytes / 1024:.1f} KiB (una copia para todos los procesos)")
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_trabajador,
+                                     initargs=(mem.descriptor, kwargs)) as executor:
+                tareas = [(i, esc, time_limit, mip_gap) for i, esc in enumerate(escenarios)]
+                for resultado in executor.map(_simular_en_trabajador, tareas):
+                    if resultado is not None:
+                        self.resultados_simulaciones.append(resultado)
+
+        print(f"\n{'#'*60}")
+        print(f"MONTE CARLO COMPLETADO")
+        print(f"Simulaciones exitosas: {len(self.resultados_simulaciones)}/{self.num_simulaciones}")
+        print(f"{'#'*60}\n")
+
+    def ejecutar_monte_carlo_adaptativo(self, time_limit=30, mip_gap=1e-4,
+                                        percentiles=(5, 10, 25, 50, 75, 90, 95),
+                                        tol_percentil=0.5, factor_tiempo=4, max_rondas=3):
+        """
+        Monte Carlo con presupuesto por simulación.
+
+        Ronda 0: cada simulación se resuelve con TimeLimit=time_limit; si se agota,
+        se guarda el incumbente (deficit_total) y la cota (cota_inferior).
+        Como los percentiles son monótonos en cada valor, el percentil verdadero
+        queda entre el percentil de las cotas y el de los incumbentes. Solo se
+        re-resuelven (con factor_tiempo veces más tiempo; sin límite en la última
+        ronda) las simulaciones abiertas cuyo intervalo [cota, incumbente] corta
+        el intervalo de algún percentil más ancho que tol_percentil (Hm³).
+
+        Las simulaciones que agotan el presupuesto sin incumbente cuentan como abiertas
+        con el intervalo [cota, +inf] (cota −inf si Gurobi no alcanzó a dar una), así los
+        intervalos de los percentiles siguen siendo válidos. time_limit=None resuelve
+        todo sin límite desde la primera ronda.
+        """
+        print(f"\n{'#'*60}")
+        print(f"INICIANDO MONTE CARLO ADAPTATIVO")
+        print(f"Número de simulaciones: {self.num_simulaciones}")
+        print(f"Presupuesto inicial: {time_limit} seg, gap {mip_gap}")
+        print(f"{'#'*60}\n")
+
+        escenarios = self.generar_escenarios()
+        resultados = {}
+        sin_incumbente = {}  # agotaron el presupuesto sin solución factible: {i: cota}
+        for i, escenario in enumerate(escenarios):
+            self._cota_sin_incumbente = None
+            resultado = self.ejecutar_simulacion(i, escenario, time_limit, mip_gap)
+            if resultado is not None:
+                resultado['rondas'] = 1
+                resultados[i] = resultado
+            elif self._cota_sin_incumbente is not None:
+                sin_incumbente[i] = self._cota_sin_incumbente
+
+        presupuesto = time_limit
+        for ronda in range(1, max_rondas + 1):
+            pendientes = sorted(set(sin_incumbente) |
+                                set(self._simulaciones_a_refinar(resultados, percentiles, tol_percentil,
+                                                                 sin_incumbente)))
+            if not pendientes:
+                break
+            if presupuesto is not None:
+                presupuesto = None if ronda == max_rondas else presupuesto * factor_tiempo
+            print(f"\nRonda {ronda}: re-resolviendo {len(pendientes)} simulaciones "
+                  f"(presupuesto: {'sin límite' if presupuesto is None else f'{presupuesto} seg'})")
+            previos_sin = sin_incumbente
+            sin_incumbente = {}
+            for i in pendientes:
+                self._cota_sin_incumbente = None
+                resultado = self.ejecutar_simulacion(i, escenarios[i], presupuesto, mip_gap)
+                if resultado is None:
+                    if i not in resultados and self._cota_sin_incumbente is not None:
+                        sin_incumbente[i] = max(previos_sin.get(i, -np.inf), self._cota_sin_incumbente)
+                    continue
+                previo = resultados.get(i)
+                resultado['rondas'] = ronda + 1
+                if previo is not None:
+                    resultado['tiempo_ejecucion_seg'] += previo['tiempo_ejecucion_seg']
+                resultados[i] = resultado
+
+        self.resultados_simulaciones.extend(resultados[i] for i in sorted(resultados))
+        self.sin_incumbente = {i + 1: c for i, c in sin_incumbente.items()}   # por num_simulacion
+
+        print(f"\n{'#'*60}")
+        print(f"MONTE CARLO ADAPTATIVO COMPLETADO")
+        print(f"Simulaciones exitosas: {len(resultados)}/{self.num_simulaciones}")
+        print(f"Simulaciones no óptimas: {sum(not r['optimo'] for r in resultados.values())}")
+        if sin_incumbente:
+            print(f"⚠️ Sin incumbente (intervalo [cota, +inf]): {len(sin_incumbente)}")
+        print(f"{'#'*60}\n")
+
+    @staticmethod
+    def intervalos_percentiles(cotas, incumbentes, percentiles):
+        """
+        [percentil de las cotas, percentil de los incumbentes] por percentil. Acepta
+        cotas −inf e incumbentes +inf (simulaciones sin incumbente): se usa el orden
+        estadístico inferior/superior en vez de interpolar, que sigue acotando.
+        """
+        cotas = np.asarray(cotas, dtype=float)
+        incumbentes = np.asarray(incumbentes, dtype=float)
+        return [(float(np.percentile(cotas, p, method='lower')),
+                 float(np.percentile(incumbentes, p, method='higher'))) for p in percentiles]
+
+    @staticmethod
+    def _simulaciones_a_refinar(resultados, percentiles, tol_percentil, sin_incumbente=None):
+        """
+        Índices de simulaciones abiertas que pueden mover algún percentil reportado.
+        sin_incumbente = {i: cota} entran abiertas con intervalo [cota, +inf].
+        """
+        sin_incumbente = sin_incumbente or {}
+        if not resultados and not sin_incumbente:
+            return []
+        idx = np.array(sorted(resultados) + sorted(sin_incumbente), dtype=int)
+        sup = np.array([resultados[i]['deficit_total'] for i in sorted(resultados)] +
+                       [np.inf] * len(sin_incumbente))
+        inf = np.array([resultados[i]['cota_inferior'] for i in sorted(resultados)] +
+                       [sin_incumbente[i] for i in sorted(sin_incumbente)])
+        abiertas = np.array([not resultados[i]['optimo'] for i in sorted(resultados)] +
+                            [True] * len(sin_incumbente))
+
+        refinar = np.zeros(len(idx), dtype=bool)
+        for p_inf, p_sup in MonteCarloEmbalse.intervalos_percentiles(inf, sup, percentiles):
+            if p_sup - p_inf <= tol_percentil:
+                continue
+            refinar |= abiertas & (inf <= p_sup) & (sup >= p_inf)
+        return idx[refinar].tolist()
+
     def exportar_resultados(self, archivo_salida=None):
         """Exporta los resultados a Excel."""
+        import pandas as pd
+
         if not self.resultados_simulaciones:
             print(" No hay resultados para exportar")
             return
@@ -499,7 +674,18 @@ class MonteCarloEmbalse:
         percentiles = [5, 10, 25, 50, 75, 90, 95]
         df_percentiles = df_resultados[columnas_numericas].quantile([p/100 for p in percentiles])
         df_percentiles.index = [f'percentil_{p}' for p in percentiles]
-        
+
+        # Intervalo [cota, incumbente] de cada percentil del déficit; las simulaciones
+        # sin incumbente del adaptativo entran con [cota, +inf]
+        cotas = list(df_resultados['cota_inferior']) + list(self.sin_incumbente.values())
+        incumbentes = list(df_resultados['deficit_total']) + [np.inf] * len(self.sin_incumbente)
+        intervalos = self.intervalos_percentiles(cotas, incumbentes, percentiles)
+        df_cotas = pd.DataFrame({
+            'percentil': percentiles,
+            'deficit_cota_inferior': [a for a, _ in intervalos],
+            'deficit_incumbente': [b for _, b in intervalos],
+        })
+
         idx_mejor = df_resultados['deficit_total'].idxmin()
         idx_peor = df_resultados['deficit_total'].idxmax()
         
@@ -513,7 +699,8 @@ class MonteCarloEmbalse:
             df_resultados.to_excel(writer, sheet_name='Resultados_Completos', index=False)
             df_estadisticas.to_excel(writer, sheet_name='Estadisticas')
             df_percentiles.to_excel(writer, sheet_name='Percentiles')
-            
+            df_cotas.to_excel(writer, sheet_name='Percentiles_Cotas', index=False)
+
             df_escenarios = pd.concat([df_mejor_escenario, df_peor_escenario], ignore_index=True)
             df_escenarios.to_excel(writer, sheet_name='Escenarios_Extremos', index=False)
             
@@ -596,7 +783,8 @@ def main():
     
     mc = MonteCarloEmbalse(
         num_simulaciones=NUM_SIMULACIONES,
-        duracion_anos=DURACION_ANOS
+        duracion_anos=DURACION_ANOS,
+        semilla=42
     )
     
     mc.ejecutar_monte_carlo()
@@ -604,5 +792,4 @@ def main():
 
 
 if __name__ == "__main__":
-    np.random.seed(42)
     main()
\ No newline at end of file
@@ -2,19 +2,21 @@
 from pathlib import Path
 import sys
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime
 
 ROOT = Path(__file__).resolve().parent
 sys.path.insert(0, str(ROOT))
 
 from model.modelo_flujo_multi import EmbalseModelMulti
-from utils.data_loader import DataLoader
+from utils.cache_caudales import cargar_caudales, a_dataframes
+from utils.escenarios import GeneradorEscenarios
 
 # Configuración Monte Carlo - REDUCIDO PARA DEBUG
 NUM_SIMULACIONES = 5  # Reducido para pruebas
 DURACION_ANOS = 5     # Reducido para pruebas
+SEMILLA = 42          # SeedSequence de los órdenes de años (None = entropía del sistema)
+LARGO_BLOQUE = None   # años por bloque del bootstrap por bloques (None = permutación)
+ESTRATIFICADO = False # estratificar el número de años secos (ver model/reduccion_varianza.py)
 
 # Años disponibles
 anos = ['1989/1990', '1990/1991', '1991/1992', '1992/1993', '1993/1994',
@@ -24,37 +26,37 @@ anos = ['1989/1990', '1990/1991', '1991/1992', '1992/1993', '1993/1994',
         '2009/2010', '2010/2011', '2011/2012', '2012/2013', '2013/2014',
         '2014/2015', '2015/2016', '2016/2017', '2017/2018', '2018/2019']
 
-def simular_escenario(anos_simulados):
-    """Selecciona años aleatorios sin reemplazo"""
-    copia_anos = anos.copy()
-    lista_resultados = []
-    for _ in range(anos_simulados):
-        ano_seleccionado = np.random.choice(copia_anos)
-        lista_resultados.append(str(ano_seleccionado))  # Asegurar string
-        copia_anos.remove(ano_seleccionado)
-    return lista_resultados
+def clases_anos():
+    """Clase hidrológica (0 = seco … 2 = húmedo, terciles del Ñuble anual) de cada año de anos."""
+    from utils.hydro_dataset import HydroDataset
+    from utils.escenarios import clases_hidrologicas
+    hidro = HydroDataset.desde_excel(str(ROOT / "data" / "caudales.xlsx"))
+    return clases_hidrologicas(hidro.nuble.mean(axis=1)[[hidro.indice[a] for a in anos]])
 
-def simular_varias_veces(anos_simulados, num_simulaciones=NUM_SIMULACIONES):
-    """Genera múltiples secuencias de años aleatorios"""
-    resultados = []
-    for _ in range(num_simulaciones):
-        resultado = simular_escenario(anos_simulados)
-        resultados.append(resultado)
-    return resultados
+def simular_escenario(anos_simulados, num_sim=0, semilla=SEMILLA, largo_bloque=LARGO_BLOQUE,
+                      estratificado=ESTRATIFICADO, num_simulaciones=NUM_SIMULACIONES):
+    """Años aleatorios de la simulación num_sim (la misma que en simular_varias_veces)"""
+    clases = clases_anos() if estratificado else None
+    return GeneradorEscenarios(semilla).secuencias(anos, 1, anos_simulados, inicio=num_sim,
+                                                   largo_bloque=largo_bloque, clases=clases,
+                                                   n_total=num_simulaciones)[0]
+
+def simular_varias_veces(anos_simulados, num_simulaciones=NUM_SIMULACIONES, semilla=SEMILLA,
+                         largo_bloque=LARGO_BLOQUE, estratificado=ESTRATIFICADO):
+    """Genera todas las secuencias de años aleatorios en una llamada (sin reemplazo, por bloques o estratificadas)"""
+    clases = clases_anos() if estratificado else None
+    return GeneradorEscenarios(semilla).secuencias(anos, num_simulaciones, anos_simulados,
+                                                   largo_bloque=largo_bloque, clases=clases)
 
 def cargar_y_limpiar_datos():
     """Carga y limpia todos los datos de caudales"""
+    import pandas as pd
     ruta = ROOT / "data" / "caudales.xlsx"
     print(f"📁 Cargando datos de: {ruta}")
     
     try:
-        xls = pd.ExcelFile(ruta)
-        
-        # Cargar las diferentes hojas
-        nuble = pd.read_excel(xls, sheet_name='Hoja1', skiprows=4, nrows=31)
-        hoya1 = pd.read_excel(xls, sheet_name='Hoja1', skiprows=38, nrows=31)
-        hoya2 = pd.read_excel(xls, sheet_name='Hoja1', skiprows=74, nrows=31)
-        hoya3 = pd.read_excel(xls, sheet_name='Hoja1', skiprows=111, nrows=31)
+        # Una sola lectura de Hoja1; bloques ubicados por su encabezado 'AÑO'
+        nuble, hoya1, hoya2, hoya3 = a_dataframes(cargar_caudales(str(ruta)))
         
         # Limpiar datos - asegurar que AÑO sea string y limpiar valores
         for df in [nuble, hoya1, hoya2, hoya3]:
@@ -73,49 +75,36 @@ def cargar_y_limpiar_datos():
         print(f"❌ Error cargando datos: {e}")
         return None, None, None, None
 
-def obtener_caudales_anuales(ano, nuble_df):
-    """Obtiene los caudales mensuales para un año específico"""
-    try:
-        # Buscar el año en el DataFrame
-        fila = nuble_df[nuble_df['AÑO'] == str(ano)]
-        
-        if not fila.empty:
-            # Extraer caudales mensuales en orden ABR-MAR
-            caudales = fila.iloc[0][['ABR', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 
-                                   'OCT', 'NOV', 'DIC', 'ENE', 'FEB', 'MAR']].values
-            
-            # Verificar que no haya valores None o NaN
-            if np.any(pd.isna(caudales)):
-                print(f"⚠️ Valores NaN encontrados para año {ano}, usando ceros")
-                caudales = np.zeros(12)
-            
-            return caudales.tolist()
-        else:
-            print(f"⚠️ Año {ano} no encontrado, usando caudales promedio")
-            # Usar promedio de todos los años como fallback
-            columnas = ['ABR', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC', 'ENE', 'FEB', 'MAR']
-            promedios = [nuble_df[col].mean() for col in columnas]
-            return promedios
-            
-    except Exception as e:
-        print(f"❌ Error obteniendo caudales para {ano}: {e}")
-        return [0] * 12  # Fallback a ceros
+# Orden de meses que recibe el modelo (fila del año: ABR, MAY..MAR)
+COLUMNAS_ABR_MAR = ['ABR', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC', 'ENE', 'FEB', 'MAR']
 
-def preparar_datos_para_modelo(anos_seleccionados, nuble_df):
-    """Prepara los datos en el formato que necesita el modelo"""
-    datos_anuales = []
-    
-    for ano in anos_seleccionados:
-        caudales = obtener_caudales_anuales(ano, nuble_df)
-        
-        datos_anuales.append({
-            'año': str(ano),
-            'Q_nuble': caudales
-        })
-        
-        print(f"📊 Año {ano}: Caudales = {[f'{c:.1f}' for c in caudales]}")
-    
-    return datos_anuales
+def construir_tabla_caudales(nuble_df):
+    """
+    Índice año → fila y matriz (años + 1, 12) de caudales en orden ABR..MAR, armados
+    una sola vez. Años con NaN quedan en cero; la última fila es el promedio de todos
+    los años (respaldo para años que no están en la tabla).
+    """
+    M = nuble_df[COLUMNAS_ABR_MAR].to_numpy(dtype=float)
+    con_nan = np.isnan(M).any(axis=1)
+    if con_nan.any():
+        print(f"⚠️ Valores NaN en {list(nuble_df['AÑO'][con_nan])}, usando ceros")
+    promedio = np.nanmean(M, axis=0)
+    M[con_nan] = 0.0
+    indice = {str(a): i for i, a in enumerate(nuble_df['AÑO'])}
+    return indice, np.vstack([M, promedio])
+
+def preparar_Q_all(secuencias, tabla):
+    """
+    Q_all (n_secuencias, 12·años) de todas las secuencias con un solo gather:
+    etiquetas → filas por el índice precalculado y M[filas] encadena los años.
+    """
+    indice, M = tabla
+    respaldo = len(M) - 1
+    ausentes = sorted({str(a) for sec in secuencias for a in sec} - set(indice))
+    if ausentes:
+        print(f"⚠️ Años {ausentes} no encontrados, usando caudales promedio")
+    filas = np.array([[indice.get(str(a), respaldo) for a in sec] for sec in secuencias], dtype=int)
+    return M[filas].reshape(len(filas), -1)
 
 def verificar_datos(Q_all, QPD_eff_all_m3s, demandas_A, demandas_B):
     """Verifica que todos los datos sean válidos antes de ejecutar el modelo"""
@@ -197,8 +186,10 @@ def ejecutar_simulacion_monte_carlo():
         'penaliza_SUP': 0.0,
     }
     
-    # Generar secuencias de años
+    # Generar secuencias de años y sus caudales (un solo gather para todas)
     secuencias_anos = simular_varias_veces(DURACION_ANOS, NUM_SIMULACIONES)
+    Q_todas = preparar_Q_all(secuencias_anos, construir_tabla_caudales(nuble_df))
+    QPD_todas = np.minimum(95.7, np.maximum(0, Q_todas))   # QPD efectivo simplificado, no negativo
     
     resultados_simulaciones = []
     
@@ -207,29 +198,16 @@ def ejecutar_simulacion_monte_carlo():
         print(f"Años seleccionados: {secuencia}")
         
         try:
-            # Preparar datos para el modelo
-            datos_historicos = preparar_datos_para_modelo(secuencia, nuble_df)
+            # Series conectadas de la secuencia (fila i del gather)
+            Q_all = Q_todas[i].tolist()
+            QPD_eff_all_m3s = QPD_todas[i].tolist()
             
-            if not datos_historicos:
-                print(f"❌ No se pudieron preparar datos para la secuencia {secuencia}")
-                continue
-            
-            # Construir series conectadas
-            Q_all = []
-            nombres_anos = []
-            for escenario in datos_historicos:
-                nombres_anos.append(escenario['año'])
-                Q_all.extend(escenario['Q_nuble'])
-            
-            Y = len(datos_historicos)
+            Y = len(secuencia)
             N = 12 * Y
             
             print(f"📏 Horizonte: {Y} años, {N} meses")
             print(f"📊 Q_all (primeros 5): {Q_all[:5]}")
             
-            # Calcular QPD efectivo (simplificado)
-            QPD_eff_all_m3s = [min(95.7, max(0, q)) for q in Q_all]  # Asegurar no negativos
-            
             # Demandas (igual que en el main original)
             num_A = 21221
             num_B = 7100
@@ -286,6 +264,7 @@ def guardar_resultados_excel(resultados):
         print("❌ No hay resultados para guardar")
         return None, None
     
+    import pandas as pd
     df_resultados = pd.DataFrame(resultados)
     
     # Crear directorio de resultados si no existe
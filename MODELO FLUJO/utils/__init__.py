@@ -1,5 +1,15 @@
 # utils/__init__.py
-from .data_loader import DataLoader
-from .visualizacion import Visualizador
+# Carga diferida: DataLoader trae pandas y Visualizador matplotlib; importar
+# utils.hydro_dataset o utils.forzantes (simulador NumPy) no debe pagar ninguno.
+_PEREZOSOS = {'DataLoader': '.data_loader', 'Visualizador': '.visualizacion'}
 
-__all__ = ['DataLoader', 'Visualizador']
\ No newline at end of file
+__all__ = ['DataLoader', 'Visualizador']
+
+
+def __getattr__(nombre):
+    if nombre in _PEREZOSOS:
+        from importlib import import_module
+        valor = getattr(import_module(_PEREZOSOS[nombre], __name__), nombre)
+        globals()[nombre] = valor
+        return valor
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -0,0 +1,74 @@
+# utils/arranque.py
+import os
+import subprocess
+import sys
+import time
+
+# Presupuesto de arranque (ms, proceso completo) y módulos que no deben cargarse
+PRESUPUESTO_MS = 300
+PROHIBIDOS = ('gurobipy', 'matplotlib', 'pandas', 'openpyxl')
+
+# Cada caso corre en un proceso nuevo desde "MODELO FLUJO" e imprime los módulos prohibidos cargados
+_REPORTE = f"import sys; print('MODULOS', *[m for m in {PROHIBIDOS!r} if m in sys.modules])"
+CASOS = {
+    'ayuda': ['-c', "import runpy, sys\n"
+                    "sys.argv = ['ingesta_diaria', '--help']\n"
+                    "try:\n    runpy.run_module('utils.ingesta_diaria', run_name='__main__')\n"
+                    "except SystemExit:\n    pass\n" + _REPORTE],
+    'validacion': ['-c', "from utils.hydro_dataset import HydroDataset\n"
+                         "r = HydroDataset.desde_excel().resumen()\n"
+                         "assert r['anos'] > 0 and r['faltantes'] == 0, r\n" + _REPORTE],
+    'simulador': ['-c', "from model.simulador import SimuladorEmbalse, leer_series_historicas\n"
+                        "Rem = leer_series_historicas()['Rem'].reshape(-1)\n"
+                        "SimuladorEmbalse().simular(Rem)\n" + _REPORTE],
+}
+
+
+def _preparar_cache(data_file="data/caudales.xlsx"):
+    """La primera lectura del Excel (pandas + openpyxl) no cuenta: se deja la caché vigente."""
+    from utils.cache_caudales import cargar_caudales
+    cargar_caudales(data_file)
+
+
+def medir_arranque(repeticiones=5, presupuesto_ms=PRESUPUESTO_MS, casos=None):
+    """
+    Mide el tiempo de pared de cada caso (mediana de repeticiones, proceso nuevo cada
+    vez) y verifica que no se importen gurobipy, matplotlib, pandas ni openpyxl: un
+    --help, la validación de datos o una corrida del simulador NumPy no deben tocar
+    la licencia de Gurobi ni las dependencias de reportes.
+    """
+    casos = casos or list(CASOS)
+    _preparar_cache()
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    resultados = {}
+
+    print(f"\n=== ARRANQUE: presupuesto {presupuesto_ms} ms, {repeticiones} repeticiones ===")
+    for caso in casos:
+        tiempos, cargados = [], []
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            proc = subprocess.run([sys.executable] + CASOS[caso], cwd=raiz, capture_output=True, text=True)
+            tiempos.append((time.perf_counter() - t0) * 1000)
+            if proc.returncode != 0:
+                raise RuntimeError(f"Caso '{caso}' falló:\n{proc.stderr}")
+            for linea in proc.stdout.splitlines():
+                if linea.startswith('MODULOS'):
+                    cargados = linea.split()[1:]
+        ms = float(sorted(tiempos)[len(tiempos) // 2])
+        ok = ms < presupuesto_ms and not cargados
+        resultados[caso] = {'ms': ms, 'prohibidos': cargados, 'ok': ok}
+        print(f"  {'✅' if ok else '❌'} {caso:<11} {ms:7.1f} ms"
+              f"{f'  (importó {cargados})' if cargados else ''}")
+    return resultados
+
+
+def main():
+    res = medir_arranque()
+    if not all(r['ok'] for r in res.values()):
+        print("❌ Arranque fuera de presupuesto")
+        sys.exit(1)
+    print("✅ Arranque dentro de presupuesto")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# utils/cache_caudales.py
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+MESES = ['MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC', 'ENE', 'FEB', 'MAR', 'ABR']
+CUENCAS = ('nuble', 'hoya1', 'hoya2', 'hoya3')
+VERSION_CACHE = 2
+_ES_ANO = re.compile(r'^\d{4}/\d{4}$')
+
+# Memo en proceso: (ruta, mtime_ns, tamaño) → datos ya cargados
+_MEMORIA = {}
+
+
+def _sha1(ruta):
+    h = hashlib.sha1()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _rutas_cache(data_file):
+    carpeta = os.path.join(os.path.dirname(os.path.abspath(data_file)), '.cache')
+    base = os.path.splitext(os.path.basename(data_file))[0]
+    return carpeta, os.path.join(carpeta, f"{base}.npy"), os.path.join(carpeta, f"{base}.json")
+
+
+def leer_bloques(data_file):
+    """
+    Lee Hoja1 una sola vez y separa los cuatro bloques (Ñuble + 3 hoyas) buscando
+    las filas de encabezado 'AÑO'; cada bloque son las filas 'aaaa/aaaa' que siguen
+    (se corta en PROMEDIOS o en blanco). Las columnas de mes se ubican por nombre.
+
+    Verifica que los cuatro bloques tengan los mismos años en el mismo orden.
+    Devuelve (años, Q (4, años, 12) en m³/s MAY..ABR, NaN si falta).
+    """
+    import pandas as pd          # sólo al parsear el Excel; con caché vigente no se importa
+
+    hoja = pd.read_excel(data_file, sheet_name='Hoja1', header=None)
+    col0 = hoja.iloc[:, 0].astype(str).str.strip().str.upper().to_numpy()
+    encabezados = np.flatnonzero(col0 == 'AÑO')
+    if len(encabezados) != len(CUENCAS):
+        raise ValueError(f"Se esperaban {len(CUENCAS)} bloques con encabezado 'AÑO' en Hoja1, "
+                         f"se encontraron {len(encabezados)} (filas {list(encabezados + 1)})")
+
+    bloques = []
+    for nombre, h in zip(CUENCAS, encabezados):
+        columnas = [str(c).strip().upper() for c in hoja.iloc[h]]
+        faltan = [m for m in MESES if m not in columnas]
+        if faltan:
+            raise ValueError(f"Bloque {nombre} (fila {h + 1}) sin columnas {faltan}")
+        filas, anos = [], []
+        for r in range(h + 1, len(hoja)):
+            etiqueta = str(hoja.iat[r, 0]).replace(' ', '')
+            if not _ES_ANO.match(etiqueta):
+                break
+            filas.append(r)
+            anos.append(etiqueta)
+        valores = hoja.iloc[filas, [columnas.index(m) for m in MESES]]
+        bloques.append((anos, valores.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)))
+
+    anos = bloques[0][0]
+    for nombre, (a, _) in zip(CUENCAS[1:], bloques[1:]):
+        if a != anos:
+            distintos = [x for x in a if x not in anos] + [x for x in anos if x not in a]
+            raise ValueError(f"Bloque {nombre} desalineado con nuble: {len(a)} vs {len(anos)} años"
+                             f"{f', difieren {distintos[:5]}' if distintos else ', otro orden'}")
+    return anos, np.stack([v for _, v in bloques])
+
+
+def cargar_caudales(data_file="data/caudales.xlsx", usar_cache=True, mmap=True):
+    """
+    Caudales de caudales.xlsx parseados una sola vez.
+
+    La primera llamada lee el Excel y escribe data/.cache/caudales.npy (float64,
+    (4, años, 12)) más caudales.json con años, mtime, tamaño y sha1 del libro.
+    Las siguientes mapean el .npy en memoria (mmap_mode='r'); si cambia mtime/tamaño
+    se recalcula el sha1 y sólo se vuelve a parsear si el contenido cambió.
+
+    Devuelve {'anos': ['1989/1990', ...], 'Q': ndarray (4, años, 12) m³/s en orden
+    MAY..ABR, 'cuencas': CUENCAS}. El arreglo es de sólo lectura.
+    """
+    st = os.stat(data_file)
+    clave = (os.path.abspath(data_file), st.st_mtime_ns, st.st_size)
+    if usar_cache and clave in _MEMORIA:
+        return _MEMORIA[clave]
+
+    _, ruta_npy, ruta_meta = _rutas_cache(data_file)
+    datos = None
+    if usar_cache and os.path.exists(ruta_npy) and os.path.exists(ruta_meta):
+        try:
+            with open(ruta_meta, encoding='utf-8') as f:
+                meta = json.load(f)
+            vigente = meta.get('version') == VERSION_CACHE and (
+                (meta['mtime_ns'], meta['tamano']) == (st.st_mtime_ns, st.st_size)
+                or meta['sha1'] == _sha1(data_file))
+            if vigente:
+                datos, _ = leer_binario(ruta_npy, mmap=mmap)
+                if (meta['mtime_ns'], meta['tamano']) != (st.st_mtime_ns, st.st_size):
+                    meta.update(mtime_ns=st.st_mtime_ns, tamano=st.st_size)
+                    _escribir_json(ruta_meta, meta)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Caché de caudales ilegible ({e}); se vuelve a leer el Excel")
+            datos = None
+
+    if datos is None:
+        anos, Q = leer_bloques(data_file)
+        if usar_cache:
+            try:
+                guardar_binario(ruta_npy, anos, Q, mtime_ns=st.st_mtime_ns, tamano=st.st_size,
+                                sha1=_sha1(data_file))
+            except OSError as e:
+                print(f"⚠️ No se pudo escribir la caché de caudales: {e}")
+        Q.setflags(write=False)
+        datos = {'anos': anos, 'Q': Q, 'cuencas': CUENCAS}
+
+    if usar_cache:
+        _MEMORIA[clave] = datos
+    return datos
+
+
+def guardar_binario(ruta_npy, anos, Q, **meta):
+    """
+    Escribe el formato binario de HydroDataset: ruta_npy con Q float64 (4, años, 12)
+    en m³/s MAY..ABR (NaN = sin dato) y al lado un .json con versión, años, cuencas
+    y los metadatos extra que se pasen (origen, cobertura, ...). Escritura atómica.
+    """
+    Q = np.asarray(Q, dtype=float)
+    if Q.shape != (len(CUENCAS), len(anos), 12):
+        raise ValueError(f"Q debe ser ({len(CUENCAS)}, {len(anos)}, 12), no {Q.shape}")
+    carpeta = os.path.dirname(os.path.abspath(ruta_npy))
+    os.makedirs(carpeta, exist_ok=True)
+    tmp = ruta_npy + '.tmp.npy'
+    np.save(tmp, Q)
+    os.replace(tmp, ruta_npy)
+    _escribir_json(os.path.splitext(ruta_npy)[0] + '.json',
+                   dict(meta, version=VERSION_CACHE, anos=list(anos), cuencas=list(CUENCAS)))
+
+
+def leer_binario(ruta_npy, mmap=True):
+    """Lee el formato de guardar_binario → ({'anos', 'Q', 'cuencas'}, meta)."""
+    with open(os.path.splitext(ruta_npy)[0] + '.json', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != VERSION_CACHE:
+        raise ValueError(f"{ruta_npy}: versión {meta.get('version')} ≠ {VERSION_CACHE}")
+    Q = np.load(ruta_npy, mmap_mode='r' if mmap else None)
+    if Q.shape != (len(CUENCAS), len(meta['anos']), 12):
+        raise ValueError(f"{ruta_npy}: forma {Q.shape} no calza con {len(meta['anos'])} años")
+    return {'anos': meta['anos'], 'Q': Q, 'cuencas': CUENCAS}, meta
+
+
+def _escribir_json(ruta, meta):
+    tmp = ruta + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, ruta)
+
+
+def invalidar_cache(data_file="data/caudales.xlsx"):
+    """Borra la caché en disco y en memoria del libro indicado."""
+    _, ruta_npy, ruta_meta = _rutas_cache(data_file)
+    for ruta in (ruta_npy, ruta_meta):
+        if os.path.exists(ruta):
+            os.remove(ruta)
+    ruta_abs = os.path.abspath(data_file)
+    for clave in [k for k in _MEMORIA if k[0] == ruta_abs]:
+        del _MEMORIA[clave]
+
+
+def a_diccionarios(datos):
+    """
+    Formato de load_flow_data: (Q_afl, Q_nuble, Q_hoya1, Q_hoya2, Q_hoya3) con
+    claves (año inicial, mes 1=MAY..12=ABR); los meses sin dato se omiten.
+    """
+    salida = [{} for _ in CUENCAS]
+    Q = np.asarray(datos['Q'])
+    for i, etiqueta in enumerate(datos['anos']):
+        year = int(etiqueta.split('/')[0])
+        for c in range(len(CUENCAS)):
+            for m in range(12):
+                v = Q[c, i, m]
+                if not np.isnan(v):
+                    salida[c][year, m + 1] = float(v)
+    Q_nuble, Q_hoya1, Q_hoya2, Q_hoya3 = salida
+    return dict(Q_nuble), Q_nuble, Q_hoya1, Q_hoya2, Q_hoya3
+
+
+def a_dataframes(datos):
+    """
+    Bloques como DataFrames (AÑO, MAY..ABR, ANUAL) en el formato de DataLoader y
+    simulation.py: nuble, hoya1, hoya2, hoya3. Meses sin dato = 0; ANUAL = promedio.
+    """
+    import pandas as pd
+
+    Q = np.nan_to_num(np.asarray(datos['Q']))
+    salida = []
+    for c in range(len(CUENCAS)):
+        df = pd.DataFrame(Q[c], columns=MESES)
+        df.insert(0, 'AÑO', list(datos['anos']))
+        df['ANUAL'] = Q[c].mean(axis=1).round(2)
+        salida.append(df)
+    return tuple(salida)
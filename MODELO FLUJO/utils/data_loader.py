@@ -3,6 +3,10 @@ import re
 import pandas as pd
 import numpy as np
 
+from .cache_caudales import cargar_caudales, a_dataframes
+
+CLAVES_CUENCA = ('Q_nuble', 'Q_hoya1', 'Q_hoya2', 'Q_hoya3')
+
 
 class DataLoader:
     def __init__(self, file_path: str):
@@ -15,53 +19,24 @@ class DataLoader:
         # ABR del primer año (promedio global que definiste)
         self.ABRIL_PRIMERO = 22.05
 
+        # Caché de escenarios: se carga una vez y lo demás se deriva del tensor
+        self._escenarios = None
+        self._tensor = None       # (4 cuencas, años, 12 meses ABR→MAR), orden CLAVES_CUENCA
+        self._derivados = {}
+
     # -------------------------
     # Lectura del Excel
     # -------------------------
     def load_caudales_data(self):
         """
-        Carga el Excel con los cuatro bloques (Ñuble + 3 hoyas) desde 'Hoja1'
-        con offsets fijos (como venían usando). Luego limpia filas vacías y
-        la fila de PROMEDIO.
+        Carga el Excel con los cuatro bloques (Ñuble + 3 hoyas) de 'Hoja1'.
+        Los bloques se ubican por sus encabezados 'AÑO' en una sola lectura
+        (utils/cache_caudales.py, con caché binaria) y quedan alineados por año.
+        Luego limpia filas vacías y la fila de PROMEDIO.
         """
         try:
-            xls = pd.ExcelFile(self.file_path)
-
-            # Río Ñuble (filas 4-34 aprox.)
-            self.df_nuble = pd.read_excel(
-                xls, sheet_name='Hoja1', skiprows=4, nrows=31
-            )
-            self.df_nuble.columns = [
-                'AÑO', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT',
-                'NOV', 'DIC', 'ENE', 'FEB', 'MAR', 'ABR', 'ANUAL'
-            ]
-
-            # Hoya Intermedia 1 (filas 40-70)
-            self.df_hoya1 = pd.read_excel(
-                xls, sheet_name='Hoja1', skiprows=40, nrows=31
-            )
-            self.df_hoya1.columns = [
-                'AÑO', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT',
-                'NOV', 'DIC', 'ENE', 'FEB', 'MAR', 'ABR', 'ANUAL'
-            ]
-
-            # Hoya Intermedia 2 (filas 76-106)
-            self.df_hoya2 = pd.read_excel(
-                xls, sheet_name='Hoja1', skiprows=76, nrows=31
-            )
-            self.df_hoya2.columns = [
-                'AÑO', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT',
-                'NOV', 'DIC', 'ENE', 'FEB', 'MAR', 'ABR', 'ANUAL'
-            ]
-
-            # Hoya Intermedia 3 (filas 112-142)
-            self.df_hoya3 = pd.read_excel(
-                xls, sheet_name='Hoja1', skiprows=112, nrows=31
-            )
-            self.df_hoya3.columns = [
-                'AÑO', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT',
-                'NOV', 'DIC', 'ENE', 'FEB', 'MAR', 'ABR', 'ANUAL'
-            ]
+            datos = cargar_caudales(self.file_path)
+            self.df_nuble, self.df_hoya1, self.df_hoya2, self.df_hoya3 = a_dataframes(datos)
 
             # Limpieza
             self._clean_dataframes()
@@ -140,7 +115,31 @@ class DataLoader:
     # -------------------------
     # Escenarios
     # -------------------------
+    def invalidar_cache(self):
+        """Descarta los escenarios cargados; la próxima consulta vuelve a leer los datos."""
+        self._escenarios = None
+        self._tensor = None
+        self._derivados = {}
+
     def get_historical_scenarios(self):
+        """
+        Escenarios ABR→MAR “cosidos” (ver _cargar_escenarios). Se cargan una sola vez
+        por instancia; promedio, seco, húmedo y cuantiles se derivan del mismo tensor.
+        """
+        if self._escenarios is None:
+            scenarios = self._cargar_escenarios()
+            if not scenarios:
+                return []
+            self._escenarios = scenarios
+            self._tensor = np.stack([np.stack([s[k] for s in scenarios]) for k in CLAVES_CUENCA])
+        return self._escenarios
+
+    def get_scenarios_tensor(self):
+        """Tensor (4, años, 12) ABR→MAR de los escenarios, cuencas en orden CLAVES_CUENCA."""
+        self.get_historical_scenarios()
+        return self._tensor
+
+    def _cargar_escenarios(self):
         """
         Genera escenarios ABR→MAR “cosidos”:
           - Primer ABR = 22.05 (promedio).
@@ -218,12 +217,15 @@ class DataLoader:
             print(f"Error obteniendo matriz de caudales: {e}")
             return np.zeros((len(df), 12))
 
+    def _caudal_medio_anual(self, cuenca='Q_nuble'):
+        """Caudal medio (ABR→MAR) de cada año, para ordenar secos/húmedos."""
+        return self._tensor[CLAVES_CUENCA.index(cuenca)].mean(axis=1)
+
     def get_average_scenario(self):
         """
         Promedio mensual (ABR→MAR) sobre todos los años disponibles.
         """
-        scenarios = self.get_historical_scenarios()
-        if not scenarios:
+        if not self.get_historical_scenarios():
             print("❌ No hay escenarios para calcular promedio")
             # fallback razonable
             return {
@@ -233,30 +235,41 @@ class DataLoader:
                 'Q_hoya3': np.full(12, 8.0),
             }
 
-        avg = {
-            'Q_nuble': np.mean([s['Q_nuble'] for s in scenarios], axis=0),
-            'Q_hoya1': np.mean([s['Q_hoya1'] for s in scenarios], axis=0),
-            'Q_hoya2': np.mean([s['Q_hoya2'] for s in scenarios], axis=0),
-            'Q_hoya3': np.mean([s['Q_hoya3'] for s in scenarios], axis=0),
-        }
-        return avg
+        if 'promedio' not in self._derivados:
+            self._derivados['promedio'] = dict(zip(CLAVES_CUENCA, self._tensor.mean(axis=1)))
+        return self._derivados['promedio']
 
     def get_dry_year_scenario(self):
         """
         Año más seco según promedio de Q_nuble (ABR→MAR).
         """
-        scenarios = self.get_historical_scenarios()
-        if not scenarios:
+        if not self.get_historical_scenarios():
             return self.get_average_scenario()
-        idx = int(np.argmin([np.mean(s['Q_nuble']) for s in scenarios]))
-        return scenarios[idx]
+        if 'seco' not in self._derivados:
+            self._derivados['seco'] = int(np.argmin(self._caudal_medio_anual()))
+        return self._escenarios[self._derivados['seco']]
 
     def get_wet_year_scenario(self):
         """
         Año más húmedo según promedio de Q_nuble (ABR→MAR).
         """
-        scenarios = self.get_historical_scenarios()
-        if not scenarios:
+        if not self.get_historical_scenarios():
+            return self.get_average_scenario()
+        if 'humedo' not in self._derivados:
+            self._derivados['humedo'] = int(np.argmax(self._caudal_medio_anual()))
+        return self._escenarios[self._derivados['humedo']]
+
+    def get_quantile_year_scenario(self, q, cuenca='Q_nuble'):
+        """
+        Año histórico en el cuantil q (0 = más seco, 1 = más húmedo) según el caudal
+        medio ABR→MAR de la cuenca. Con q lista devuelve una lista de escenarios.
+        """
+        if not self.get_historical_scenarios():
             return self.get_average_scenario()
-        idx = int(np.argmax([np.mean(s['Q_nuble']) for s in scenarios]))
-        return scenarios[idx]
+        clave = ('orden', cuenca)
+        if clave not in self._derivados:
+            self._derivados[clave] = np.argsort(self._caudal_medio_anual(cuenca), kind='stable')
+        orden = self._derivados[clave]
+        qs = np.clip(np.atleast_1d(np.asarray(q, dtype=float)), 0.0, 1.0)
+        escenarios = [self._escenarios[int(i)] for i in orden[np.rint(qs * (len(orden) - 1)).astype(int)]]
+        return escenarios if np.ndim(q) else escenarios[0]
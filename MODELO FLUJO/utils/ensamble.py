@@ -0,0 +1,185 @@
+# utils/ensamble.py
+import json
+import os
+import struct
+
+import numpy as np
+
+from .cache_caudales import CUENCAS, MESES
+from .forzantes import qpd_efectivo, SEGUNDOS_MES
+from .escenarios import GeneradorEscenarios
+
+# Archivo .ens: [MAGIA | versión u16 | largo u32 | encabezado JSON | relleno] + datos
+MAGIA = b'ENSHIDRO'
+VERSION_ENSAMBLE = 1
+ALINEACION = 4096          # los datos parten en un múltiplo de página
+_FIJO = struct.Struct('<8sHI')
+
+
+class EnsambleHidrologico:
+    """
+    Ensamble de hidrología sintética en disco, leído y escrito con np.memmap.
+
+    Datos Q[escenario, cuenca, año, mes] en m³/s (cuencas nuble, hoya1..3; meses
+    MAY..ABR), en orden C: cada escenario es un bloque contiguo de 4·años·12 valores,
+    así un lote de escenarios consecutivos es un solo tramo del archivo. El encabezado
+    JSON lleva forma, dtype, cuencas, calendario, unidades y metadatos libres del
+    generador (semilla, método, años de origen...).
+
+    Con float32, 10^5 escenarios × 100 años ocupan ~1.9 GB en disco; en memoria sólo
+    vive el lote que se está escribiendo o simulando.
+    """
+
+    def __init__(self, ruta, encabezado, memmap):
+        self.ruta = ruta
+        self.encabezado = encabezado
+        self.Q = memmap
+
+    # -------------------------
+    # Apertura
+    # -------------------------
+    @classmethod
+    def crear(cls, ruta, n_escenarios, n_anos, dtype='float32', meta=None):
+        """Crea el archivo (relleno con ceros) y lo deja abierto para escritura."""
+        forma = (int(n_escenarios), len(CUENCAS), int(n_anos), 12)
+        encabezado = {
+            'forma': list(forma),
+            'dtype': np.dtype(dtype).str,
+            'ejes': ['escenario', 'cuenca', 'ano', 'mes'],
+            'cuencas': list(CUENCAS),
+            'meses': MESES,
+            'calendario': 'MAY..ABR',
+            'unidades': 'm3/s',
+            'escritos': 0,
+            'meta': dict(meta or {}),
+        }
+        carpeta = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(carpeta, exist_ok=True)
+        with open(ruta, 'wb') as f:
+            f.write(_empaquetar(encabezado))
+        Q = np.memmap(ruta, dtype=encabezado['dtype'], mode='r+', offset=ALINEACION, shape=forma)
+        return cls(ruta, encabezado, Q)
+
+    @classmethod
+    def abrir(cls, ruta, modo='r'):
+        """Abre un ensamble existente ('r' sólo lectura, 'r+' para seguir escribiendo)."""
+        with open(ruta, 'rb') as f:
+            magia, version, largo = _FIJO.unpack(f.read(_FIJO.size))
+            if magia != MAGIA:
+                raise ValueError(f"{ruta}: no es un ensamble hidrológico")
+            if version != VERSION_ENSAMBLE:
+                raise ValueError(f"{ruta}: versión {version} ≠ {VERSION_ENSAMBLE}")
+            encabezado = json.loads(f.read(largo).decode('utf-8'))
+        forma = tuple(encabezado['forma'])
+        esperado = ALINEACION + int(np.prod(forma)) * np.dtype(encabezado['dtype']).itemsize
+        if os.path.getsize(ruta) < esperado:
+            raise ValueError(f"{ruta}: archivo truncado ({os.path.getsize(ruta)} < {esperado} bytes)")
+        Q = np.memmap(ruta, dtype=encabezado['dtype'], mode=modo, offset=ALINEACION, shape=forma)
+        return cls(ruta, encabezado, Q)
+
+    def cerrar(self):
+        """Baja a disco los datos y el encabezado (contador de escritos, meta). Idempotente."""
+        if self.Q is None:
+            return
+        if self.Q.mode != 'r':
+            self._guardar()
+        self.Q = None
+
+    def _guardar(self):
+        """Datos primero y después el encabezado: 'escritos' nunca cuenta lotes que no están en disco."""
+        self.Q.flush()
+        with open(self.ruta, 'r+b') as f:
+            f.write(_empaquetar(self.encabezado))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    # -------------------------
+    # Metadatos
+    # -------------------------
+    @property
+    def n_escenarios(self):
+        return self.encabezado['forma'][0]
+
+    @property
+    def n_anos(self):
+        return self.encabezado['forma'][2]
+
+    @property
+    def escritos(self):
+        return self.encabezado['escritos']
+
+    @property
+    def meta(self):
+        return self.encabezado['meta']
+
+    # -------------------------
+    # Escritura / lectura por lotes
+    # -------------------------
+    def escribir(self, inicio, Q_lote):
+        """
+        Escribe Q_lote (n, 4, años, 12) en los escenarios [inicio, inicio + n) y guarda
+        el encabezado, así un generador que se cae a mitad deja un archivo válido con
+        los lotes ya escritos (abrir() + lotes() los leen).
+        """
+        n = len(Q_lote)
+        self.Q[inicio:inicio + n] = Q_lote
+        self.encabezado['escritos'] = max(self.escritos, inicio + n)
+        self._guardar()
+
+    def lotes(self, tam_lote=1024, inicio=0, fin=None):
+        """Itera (inicio, Q (n, 4, años, 12)) sobre escenarios escritos; cada lote se lee al usarlo."""
+        fin = self.escritos if fin is None else min(fin, self.escritos)
+        for i in range(inicio, fin, tam_lote):
+            yield i, self.Q[i:min(i + tam_lote, fin)]
+
+    def lotes_rem(self, tam_lote=1024, inicio=0, fin=None):
+        """Como lotes(), pero entrega el remanente Rem (n, 12·años) en Hm³ para el simulador."""
+        for i, Q in self.lotes(tam_lote, inicio, fin):
+            yield i, remanente(Q)
+
+
+def remanente(Q):
+    """Q (..., 4, años, 12) m³/s → Rem (..., 12·años) Hm³ = (Ñuble − QPD efectivo)·segundos."""
+    Q = np.asarray(Q, dtype=float)
+    nuble = Q[..., 0, :, :]
+    rem = (nuble - qpd_efectivo(nuble, Q[..., 1:, :, :].sum(axis=-3))) * SEGUNDOS_MES / 1_000_000.0
+    return rem.reshape(rem.shape[:-2] + (-1,))
+
+
+def _empaquetar(encabezado):
+    cuerpo = json.dumps(encabezado, ensure_ascii=False).encode('utf-8')
+    if _FIJO.size + len(cuerpo) > ALINEACION:
+        raise ValueError(f"Encabezado de {len(cuerpo)} bytes no cabe en {ALINEACION}; reducir 'meta'")
+    bloque = _FIJO.pack(MAGIA, VERSION_ENSAMBLE, len(cuerpo)) + cuerpo
+    return bloque + b' ' * (ALINEACION - len(bloque))
+
+
+def generar_remuestreo(hidro, ruta, n_escenarios, duracion_anos=30, semilla=None,
+                       tam_lote=4096, dtype='float32', largo_bloque=None, estacionario=False):
+    """
+    Ensamble por remuestreo histórico (como MonteCarloEmbalse.generar_escenario: años
+    sin reemplazo en orden aleatorio, encadenados), escrito por lotes en ruta. El
+    escenario i sale de su bloque de GeneradorEscenarios(semilla), así que no depende
+    de tam_lote y se puede regenerar por separado. Con largo_bloque se usa bootstrap
+    por bloques (GeneradorEscenarios.indices_bloques) y la duración no se acota.
+    """
+    gen = GeneradorEscenarios(semilla)
+    n_hist = len(hidro)
+    dur = duracion_anos if largo_bloque else min(duracion_anos, n_hist)
+    meta = {'generador': 'bloques' if largo_bloque else 'remuestreo', 'entropia': str(gen.entropia),
+            'largo_bloque': largo_bloque, 'estacionario': estacionario, 'anos_origen': list(hidro.anos)}
+    ens = EnsambleHidrologico.crear(ruta, n_escenarios, dur, dtype, meta)
+    for i in range(0, n_escenarios, tam_lote):
+        n = min(tam_lote, n_escenarios - i)
+        if largo_bloque:
+            orden = gen.indices_bloques(n, dur, n_hist, largo_bloque, estacionario, inicio=i)
+        else:
+            orden = gen.indices(n, dur, n_hist, inicio=i)
+        ens.escribir(i, hidro.may_abr[:, orden].transpose(1, 0, 2, 3))
+    ens.cerrar()
+    print(f"✅ Ensamble de {n_escenarios:,} escenarios x {dur} años → {ruta}")
+    return EnsambleHidrologico.abrir(ruta)
@@ -0,0 +1,246 @@
+# utils/escenarios.py
+import math
+
+import numpy as np
+
+# spawn_key reservados para flujos que no son de una simulación: el hipercubo latino
+# y los bloques de filas de los sorteos vectorizados
+_FLUJO_AUXILIAR = 2 ** 31
+_FLUJO_FILAS = 2 ** 31 + 1
+# Filas (simulaciones) por flujo en indices(), indices_bloques() y uniformes()
+FILAS_POR_FLUJO = 256
+
+
+class GeneradorEscenarios:
+    """
+    Órdenes de años para Monte Carlo con np.random.Generator derivados de un SeedSequence.
+
+    Los sorteos matriciales (indices, indices_bloques, uniformes) se hacen por
+    bloques absolutos de FILAS_POR_FLUJO simulaciones: el bloque b = i // 256 tiene
+    su flujo SeedSequence(entropía, spawn_key=(_FLUJO_FILAS, b)) y se sortea entero
+    de una vez (argsort vectorizado). Un flujo por fila costaba ~25 µs por
+    simulación sólo en armar el SeedSequence/PCG64 (2.5 s para 10^5 filas); por
+    bloque es ~100 veces menos. Como los bloques no dependen de n_sims ni de inicio,
+    cualquier simulación se puede regenerar sola (indices(1, ..., inicio=i), que
+    sortea su bloque y toma la fila) o repartir en procesos por tramos de índices,
+    con resultados idénticos bit a bit a la generación completa.
+
+    rng(i) = SeedSequence(entropía, spawn_key=(i,)) queda para lo que se genera
+    fila a fila (órdenes estratificados, ruido del AR(1) sintético).
+
+    Con semilla=None se toma entropía del sistema y queda en self.entropia para
+    poder reproducir la corrida.
+    """
+
+    def __init__(self, semilla=None):
+        self.entropia = np.random.SeedSequence(semilla).entropy
+
+    def rng(self, i):
+        """Generator de la simulación i."""
+        return np.random.Generator(np.random.PCG64(np.random.SeedSequence(self.entropia, spawn_key=(int(i),))))
+
+    def _sorteo_filas(self, n_sims, inicio, sorteo):
+        """
+        Filas inicio..inicio+n_sims−1 de sorteo(rng, FILAS_POR_FLUJO) → tupla de arreglos
+        (filas, ...), armadas con los bloques absolutos de FILAS_POR_FLUJO que cubren el tramo.
+        """
+        F = FILAS_POR_FLUJO
+        partes = []
+        for b in range(inicio // F, (inicio + n_sims + F - 1) // F):
+            rng = np.random.Generator(np.random.PCG64(
+                np.random.SeedSequence(self.entropia, spawn_key=(_FLUJO_FILAS, b))))
+            lo, hi = max(inicio, b * F) - b * F, min(inicio + n_sims, (b + 1) * F) - b * F
+            partes.append(tuple(M[lo:hi] for M in sorteo(rng, F)))
+        if not partes:
+            return tuple(M[:0] for M in sorteo(np.random.default_rng(0), 0))
+        return tuple(np.concatenate(col) for col in zip(*partes))
+
+    def indices(self, n_sims, n_anos, n_hist, reemplazo=False, inicio=0):
+        """
+        Matriz (n_sims, n_anos) de índices de años históricos para las simulaciones
+        inicio..inicio+n_sims−1: permutaciones (sin reemplazo, n_anos ≤ n_hist) o
+        muestras con reemplazo.
+        """
+        if not reemplazo and n_anos > n_hist:
+            raise ValueError(f"Sin reemplazo no se pueden tomar {n_anos} de {n_hist} años")
+        if reemplazo:
+            sorteo = lambda rng, m: (rng.integers(0, n_hist, (m, n_anos)),)
+        else:
+            sorteo = lambda rng, m: (np.argsort(rng.random((m, n_hist)), axis=1)[:, :n_anos],)
+        return self._sorteo_filas(n_sims, inicio, sorteo)[0].astype(np.int64)
+
+    def indices_bloques(self, n_sims, n_anos, n_hist, largo_bloque=3, estacionario=False, inicio=0):
+        """
+        Bootstrap circular por bloques de años consecutivos → matriz (n_sims, n_anos).
+
+        Fijo: bloques de largo_bloque años que parten en un año al azar del registro.
+        Estacionario (Politis–Romano): cada año abre un bloque nuevo con probabilidad
+        1/largo_bloque (largos geométricos de media largo_bloque). Al pasar el último
+        año histórico se vuelve al primero. n_anos puede superar n_hist.
+
+        Los sorteos y la matriz se arman de una vez: el año j de un bloque que partió
+        en la posición p con el año s es (s + j − p) mod n_hist.
+        """
+        U, S = self._sorteo_filas(n_sims, inicio, lambda rng, m: (
+            rng.random((m, n_anos)), rng.integers(0, n_hist, (m, n_anos))))
+
+        j = np.arange(n_anos)
+        nuevo = U < 1.0 / largo_bloque if estacionario else np.broadcast_to(j % largo_bloque == 0, U.shape).copy()
+        nuevo[:, 0] = True
+        p = np.maximum.accumulate(np.where(nuevo, j, 0), axis=1)       # posición donde partió el bloque
+        return (np.take_along_axis(S, p, axis=1) + j - p) % n_hist
+
+    def secuencias(self, anos, n_sims, n_anos, reemplazo=False, inicio=0, largo_bloque=None,
+                   estacionario=False, clases=None, n_total=None):
+        """
+        Como indices() (o indices_bloques() si se da largo_bloque, o indices_estratificados()
+        si se dan las clases hidrológicas de anos), con etiquetas ('1989/1990', ...).
+        """
+        anos = list(anos)
+        if clases is not None:
+            if largo_bloque:
+                raise ValueError("El muestreo estratificado no se combina con bootstrap por bloques")
+            idx = self.indices_estratificados(n_sims, n_anos, clases, reemplazo, inicio, n_total)
+        elif largo_bloque:
+            idx = self.indices_bloques(n_sims, n_anos, len(anos), largo_bloque, estacionario, inicio)
+        else:
+            idx = self.indices(n_sims, n_anos, len(anos), reemplazo, inicio)
+        return [[anos[j] for j in fila] for fila in idx]
+
+    def indices_estratificados(self, n_sims, n_anos, clases, reemplazo=False, inicio=0, n_total=None):
+        """
+        Órdenes de años estratificados por el número de años secos (clase 0) del escenario.
+
+        El número D de años secos en n_anos es hipergeométrico (sin reemplazo) o
+        binomial (con reemplazo). La simulación i de n_total toma u_i = (i + U_i)/n_total
+        y D = F⁻¹(u_i) (muestreo estratificado de u): cada valor de D recibe su cuota
+        proporcional, los pesos siguen siendo 1/n_total y media y percentiles se
+        estiman igual que con muestreo simple. Dado D, los años secos y los demás se
+        sortean de su clase (con o sin reemplazo) y se barajan las posiciones, que es
+        exactamente la distribución condicional del muestreo simple.
+
+        Con n_anos = n_hist sin reemplazo D es fijo y el método coincide con el simple:
+        sirve con horizontes más cortos que el registro o con reemplazo.
+
+        u_i depende de n_total, así que para regenerar un tramo (inicio > 0) hay que dar
+        el n_total de la corrida completa. Los sorteos van fila a fila con rng(i).
+        """
+        clases = np.asarray(clases, dtype=int)
+        n_hist = len(clases)
+        if n_total is None:
+            if inicio > 0:
+                raise ValueError("indices_estratificados con inicio > 0 necesita n_total (total de la corrida)")
+            n_total = n_sims
+        if not reemplazo and n_anos > n_hist:
+            raise ValueError(f"Sin reemplazo no se pueden tomar {n_anos} de {n_hist} años")
+        secos = np.flatnonzero(clases == 0)
+        otros = np.flatnonzero(clases != 0)
+        acum = np.cumsum(_prob_secos(n_anos, len(secos), n_hist, reemplazo))
+
+        salida = np.empty((n_sims, n_anos), dtype=np.int64)
+        for j in range(n_sims):
+            i = inicio + j
+            rng = self.rng(i)
+            D = min(np.searchsorted(acum, (i + rng.random()) / n_total, side='right'), len(acum) - 1)
+            fila = np.concatenate([rng.choice(secos, D, replace=reemplazo),
+                                   rng.choice(otros, n_anos - D, replace=reemplazo)])
+            salida[j] = rng.permutation(fila)
+        return salida
+
+    def hipercubo_latino(self, n, cotas):
+        """
+        Hipercubo latino de n puntos: cotas = {nombre: (min, max)} → {nombre: (n,)}.
+        Cada factor cae una vez en cada uno de los n intervalos equiprobables.
+        """
+        salida = {}
+        for d, (nombre, (lo, hi)) in enumerate(cotas.items()):
+            rng = np.random.Generator(np.random.PCG64(
+                np.random.SeedSequence(self.entropia, spawn_key=(_FLUJO_AUXILIAR, d))))
+            u = (rng.permutation(n) + rng.random(n)) / n
+            salida[nombre] = lo + u * (hi - lo)
+        return salida
+
+    def uniformes(self, n, cotas, inicio=0):
+        """Factores uniformes independientes por simulación (contraparte simple del hipercubo)."""
+        U = self._sorteo_filas(n, inicio, lambda rng, m: (rng.random((m, len(cotas))),))[0]
+        return {nombre: lo + U[:, d] * (hi - lo) for d, (nombre, (lo, hi)) in enumerate(cotas.items())}
+
+
+def clases_hidrologicas(anual, n_clases=3):
+    """Clase de cada año por cuantiles del volumen anual: 0 = seco … n_clases−1 = húmedo (terciles)."""
+    anual = np.asarray(anual, dtype=float)
+    cortes = np.quantile(anual, np.arange(1, n_clases) / n_clases)
+    return np.searchsorted(cortes, anual, side='right')
+
+
+def _prob_secos(n_anos, n_secos, n_hist, reemplazo):
+    """P(D = d), d = 0..n_anos: años secos en n_anos (binomial con reemplazo, hipergeométrica sin)."""
+    d = np.arange(n_anos + 1)
+    if reemplazo:
+        p = n_secos / n_hist
+        return np.array([math.comb(n_anos, k) * p ** k * (1 - p) ** (n_anos - k) for k in d])
+    return np.array([math.comb(n_secos, k) * math.comb(n_hist - n_secos, n_anos - k) for k in d],
+                    dtype=float) / math.comb(n_hist, n_anos)
+
+
+def claves_unicas(anos):
+    """
+    Etiquetas únicas para un escenario con años repetidos (bootstrap): la segunda
+    aparición de '1998/1999' pasa a '1998/1999#2', etc. Para modelos que indexan
+    variables por año.
+    """
+    vistos = {}
+    salida = []
+    for a in anos:
+        vistos[a] = vistos.get(a, 0) + 1
+        salida.append(a if vistos[a] == 1 else f"{a}#{vistos[a]}")
+    return salida
+
+
+def _rachas(seco):
+    """Largos de las rachas de True por fila de seco (n, Y) → (fila, largo) de cada racha."""
+    n, Y = seco.shape
+    borde = np.zeros((n, 1), dtype=bool)
+    d = np.diff(np.hstack([borde, seco, borde]).astype(np.int8), axis=1)
+    fila, ini = np.nonzero(d == 1)
+    _, fin = np.nonzero(d == -1)
+    return fila, fin - ini
+
+
+def estadisticos_rachas(seco, valores=None):
+    """Estadísticos de rachas secas de una matriz (n, Y) de años secos (y lag-1 de los valores)."""
+    fila, largo = _rachas(seco)
+    maximo = np.zeros(seco.shape[0], dtype=int)
+    np.maximum.at(maximo, fila, largo)
+    res = {
+        'frac_secos': float(seco.mean()),
+        'racha_media': float(largo.mean()) if largo.size else 0.0,
+        'racha_max_media': float(maximo.mean()),
+        'rachas_2+_decada': float(10 * (largo >= 2).sum() / seco.size),   # por cada 10 años
+        'rachas_3+_decada': float(10 * (largo >= 3).sum() / seco.size),
+    }
+    if valores is not None:
+        a = valores[:, 1:] - valores.mean(axis=1, keepdims=True)
+        b = valores[:, :-1] - valores.mean(axis=1, keepdims=True)
+        res['lag1_anual'] = float(np.mean((a * b).sum(1) / ((valores - valores.mean(1, keepdims=True)) ** 2).sum(1)))
+    return res
+
+
+def diagnostico_rachas(idx, anual, cuantil=1 / 3, verbose=True):
+    """
+    Compara rachas de años secos (caudal anual bajo el cuantil dado, por defecto el
+    tercil inferior) de las secuencias generadas idx (n, Y) contra el registro
+    histórico en orden cronológico, recortado al mismo largo Y.
+    """
+    anual = np.asarray(anual, dtype=float)
+    umbral = np.quantile(anual, cuantil)
+    seco = anual < umbral
+    Y = min(idx.shape[1], len(anual))
+    hist = estadisticos_rachas(seco[None, :Y], anual[None, :Y])
+    gen = estadisticos_rachas(seco[idx], anual[idx])
+    if verbose:
+        print(f"\n=== RACHAS SECAS (caudal anual < {umbral:.1f}, cuantil {cuantil:.2f}) ===")
+        print(f"  {'':<16}{'histórico':>10}{'generado':>10}")
+        for k in hist:
+            print(f"  {k:<16}{hist[k]:>10.3f}{gen[k]:>10.3f}")
+    return {'historico': hist, 'generado': gen, 'umbral': float(umbral)}
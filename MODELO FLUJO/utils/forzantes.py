@@ -0,0 +1,77 @@
+# utils/forzantes.py
+import numpy as np
+
+# Tablas en orden MAY..ABR (mes del modelo 1..12)
+DIAS_MES = [31, 30, 31, 31, 30, 31, 30, 31, 31, 28, 31, 30]
+SEGUNDOS_MES = np.array(DIAS_MES, dtype=float) * 24 * 3600
+
+# Derechos no consuntivos (fila Total) y caudal ecológico (m³/s)
+DERECHOS = np.array([52.00, 52.00, 52.00, 52.00, 57.70, 76.22, 69.22, 52.00, 52.00, 52.00, 52.00, 52.00])
+QECO = np.array([10.00, 10.35, 14.48, 15.23, 15.23, 15.23, 15.23, 15.23, 12.80, 15.20, 16.40, 17.60])
+QPD_BASE_HOYAS = 95.7     # QPD ajustado = 95.7 − (Hoya1 + Hoya2 + Hoya3)
+
+NUM_A = 21221
+NUM_B = 7100
+# m³/mes por acción
+DA_ACCION = np.array([0, 0, 0, 0, 0, 2444, 6516, 9580, 9503, 6516, 3452, 776], dtype=float)
+DB_ACCION = np.array([0, 0, 0, 0, 0, 864, 2305, 3388, 3361, 2305, 1221, 274], dtype=float)
+
+# Arreglos que calcula Forzantes (los que se comparten entre procesos)
+CAMPOS = ('QPD_eff', 'Qin', 'UPREF', 'Rem', 'demA', 'demB', 'SSR')
+
+
+def qpd_efectivo(Q_nuble, H, calendario='may_abr'):
+    """
+    QPD efectivo (m³/s): max(derechos, Qeco, 95.7 − H) acotado por el caudal del Ñuble.
+    Último eje = 12 meses en MAY..ABR, o ABR..MAR con calendario='abr_mar'.
+    """
+    piso = np.maximum(DERECHOS, QECO)
+    if calendario == 'abr_mar':
+        piso = np.roll(piso, 1)
+    qpd_nom = np.maximum(piso, np.maximum(0.0, QPD_BASE_HOYAS - H))
+    return np.minimum(qpd_nom, Q_nuble)
+
+
+class Forzantes:
+    """
+    Forzantes mensuales de los modelos, calculados una vez por dataset:
+
+      QPD_eff (m³/s), Qin, UPREF = QPD_eff·seg, Rem = Qin − UPREF   → (años, 12) en Hm³
+      demA, demB (acciones × m³/acción × FE), SSR = V_C_H/12         → (12,) en Hm³
+
+    Filas en el orden de hidro.anos y meses MAY..ABR. por_orden(anos) entrega las
+    mismas series reordenadas por indexación (una secuencia de Monte Carlo, el
+    horizonte de un modelo) sin recalcular nada.
+    """
+
+    def __init__(self, hidro, num_A=NUM_A, num_B=NUM_B, FEA=1.0, FEB=1.0, V_C_H=3.9):
+        self.hidro = hidro
+        self.QPD_eff = qpd_efectivo(hidro.nuble, hidro.hoyas)
+        self.Qin = hidro.nuble * SEGUNDOS_MES / 1_000_000.0
+        self.UPREF = self.QPD_eff * SEGUNDOS_MES / 1_000_000.0
+        self.Rem = self.Qin - self.UPREF
+        self.demA = DA_ACCION * num_A * FEA / 1_000_000.0
+        self.demB = DB_ACCION * num_B * FEB / 1_000_000.0
+        self.SSR = np.full(12, V_C_H / 12.0)
+
+    @classmethod
+    def desde_arreglos(cls, hidro, arreglos):
+        """Forzantes ya calculados (p.ej. vistas de shared_memory) sin recalcular ni copiar."""
+        obj = cls.__new__(cls)
+        obj.hidro = hidro
+        for k in CAMPOS:
+            setattr(obj, k, arreglos[k])
+        return obj
+
+    def indices(self, anos):
+        return np.array([self.hidro.indice[a] for a in anos], dtype=int)
+
+    def por_orden(self, anos):
+        """Series (n, 12) para la secuencia de años dada (etiquetas '1989/1990')."""
+        idx = self.indices(anos)
+        return {k: getattr(self, k)[idx] for k in ('QPD_eff', 'Qin', 'UPREF', 'Rem')}
+
+    def qpd_dict(self, anos):
+        """QPD_eff como dict {(año, mes): m³/s}, formato de los reportes de los modelos."""
+        Q = self.QPD_eff[self.indices(anos)]
+        return {(a, mes): float(Q[k, mes - 1]) for k, a in enumerate(anos) for mes in range(1, 13)}
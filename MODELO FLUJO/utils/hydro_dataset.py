@@ -0,0 +1,148 @@
+# utils/hydro_dataset.py
+from functools import cached_property
+
+import numpy as np
+
+from .cache_caudales import cargar_caudales, leer_binario, CUENCAS, MESES
+
+
+class HydroDataset:
+    """
+    Caudales históricos (m³/s) en un solo arreglo float64 (cuenca × año × mes).
+
+    Cuencas: 0=nuble, 1=hoya1, 2=hoya2, 3=hoya3. Años por etiqueta '1989/1990'
+    (self.indice) o por año inicial 1989 (self.indice_inicial). Meses sin dato = 0,
+    igual que el .get((y, mes), 0) de los modelos; self.faltantes marca cuáles eran.
+
+    Calendarios (ambos son vistas del mismo buffer, sin copia):
+      • may_abr[c, i, m]: m = 0..11 → MAY..ABR del año i (orden del Excel y de los modelos).
+      • abr_mar[c, i, m]: [ABR del año i−1, MAY..MAR del año i] como DataLoader; el ABR
+        previo al primer año es abril_primero.
+    """
+
+    def __init__(self, Q, anos, abril_primero=22.05):
+        Q = np.asarray(Q, dtype=float)
+        if Q.shape != (len(CUENCAS), len(anos), 12):
+            raise ValueError(f"Q debe ser (4, {len(anos)}, 12), no {Q.shape}")
+        # buffer contiguo [ABR previo, MAY..ABR año 0, MAY..ABR año 1, ...] por cuenca
+        buffer = np.empty((len(CUENCAS), 1 + 12 * len(anos)))
+        buffer[:, 0] = abril_primero
+        buffer[:, 1:] = np.nan_to_num(Q).reshape(len(CUENCAS), -1)
+        self._montar(buffer, anos, np.isnan(Q))
+
+    def _montar(self, buffer, anos, faltantes):
+        self.anos = list(anos)
+        self.indice = {a: i for i, a in enumerate(self.anos)}
+        self.indice_inicial = {int(a.split('/')[0]): i for i, a in enumerate(self.anos)}
+        self.faltantes = faltantes
+        Y = len(self.anos)
+        self._buffer = buffer
+        self._buffer.setflags(write=False)
+        self.may_abr = self._buffer[:, 1:].reshape(len(CUENCAS), Y, 12)
+        self.abr_mar = self._buffer[:, :12 * Y].reshape(len(CUENCAS), Y, 12)
+
+    @classmethod
+    def desde_buffer(cls, buffer, anos, faltantes=None):
+        """
+        Envuelve un buffer (4, 1 + 12·años) ya armado sin copiarlo (p.ej. una vista de
+        shared_memory en un trabajador, ver utils.memoria_compartida).
+        """
+        if buffer.shape != (len(CUENCAS), 1 + 12 * len(anos)):
+            raise ValueError(f"buffer debe ser ({len(CUENCAS)}, {1 + 12 * len(anos)}), no {buffer.shape}")
+        obj = cls.__new__(cls)
+        if faltantes is None:
+            faltantes = np.zeros((len(CUENCAS), len(anos), 12), dtype=bool)
+        obj._montar(buffer, anos, faltantes)
+        return obj
+
+    @classmethod
+    def desde_excel(cls, data_file="data/caudales.xlsx", **kwargs):
+        """Construye el dataset desde la caché binaria de caudales.xlsx."""
+        datos = cargar_caudales(data_file)
+        return cls(datos['Q'], datos['anos'], **kwargs)
+
+    @classmethod
+    def desde_binario(cls, ruta_npy, **kwargs):
+        """Construye el dataset desde un .npy + .json escrito con guardar_binario (p.ej. ingesta diaria)."""
+        datos, _ = leer_binario(ruta_npy)
+        return cls(datos['Q'], datos['anos'], **kwargs)
+
+    def __len__(self):
+        return len(self.anos)
+
+    # -------------------------
+    # Cuencas (vistas (años, 12) MAY..ABR)
+    # -------------------------
+    @property
+    def nuble(self):
+        return self.may_abr[0]
+
+    @property
+    def hoya1(self):
+        return self.may_abr[1]
+
+    @property
+    def hoya2(self):
+        return self.may_abr[2]
+
+    @property
+    def hoya3(self):
+        return self.may_abr[3]
+
+    @cached_property
+    def hoyas(self):
+        """Hoya1 + Hoya2 + Hoya3 (años, 12), para el QPD ajustado 95.7 − H."""
+        H = self.may_abr[1:].sum(axis=0)
+        H.setflags(write=False)
+        return H
+
+    def cuenca(self, nombre, calendario='may_abr'):
+        """Vista (años, 12) de 'nuble', 'hoya1', 'hoya2', 'hoya3' u 'hoyas'."""
+        if nombre == 'hoyas':
+            if calendario == 'may_abr':
+                return self.hoyas
+            return getattr(self, calendario)[1:].sum(axis=0)
+        return getattr(self, calendario)[CUENCAS.index(nombre)]
+
+    # -------------------------
+    # Años
+    # -------------------------
+    def idx(self, ano):
+        """Índice de un año dado como '1989/1990' o 1989."""
+        return self.indice[ano] if isinstance(ano, str) else self.indice_inicial[int(ano)]
+
+    def valor(self, nombre, ano, mes):
+        """Caudal (m³/s) de la cuenca en el año y mes 1=MAY..12=ABR."""
+        return float(self.cuenca(nombre)[self.idx(ano), mes - 1])
+
+    def tramo(self, desde, hasta, calendario='may_abr'):
+        """Años consecutivos [desde, hasta] como vista (4, n, 12) sin copia."""
+        return getattr(self, calendario)[:, self.idx(desde):self.idx(hasta) + 1]
+
+    def seleccionar(self, anos, calendario='may_abr'):
+        """
+        Años en el orden pedido (etiquetas '1989/1990' o posiciones 0..n−1) → (4, n, 12).
+        Si el orden es un tramo consecutivo se devuelve una vista; si no, una copia.
+        """
+        orden = np.array([self.indice[a] if isinstance(a, str) else int(a) for a in anos], dtype=int)
+        datos = getattr(self, calendario)
+        if orden.size and np.all(np.diff(orden) == 1):
+            return datos[:, orden[0]:orden[-1] + 1]
+        return datos[:, orden]
+
+    def serie(self, nombre, anos=None, calendario='may_abr'):
+        """Serie mensual encadenada (12·n,) de una cuenca para los años pedidos."""
+        datos = self.cuenca(nombre, calendario)
+        if anos is not None:
+            orden = [self.idx(a) for a in anos]
+            datos = datos[orden]
+        return datos.reshape(-1)
+
+    def resumen(self):
+        return {
+            'anos': len(self),
+            'cuencas': CUENCAS,
+            'meses': MESES,
+            'faltantes': int(self.faltantes.sum()),
+            'media_nuble': float(self.nuble.mean()),
+        }
@@ -0,0 +1,184 @@
+# utils/ingesta_diaria.py
+import argparse
+import calendar
+import os
+
+import numpy as np
+
+from .cache_caudales import guardar_binario, CUENCAS, MESES
+
+SEGUNDOS_DIA = 86400.0
+
+
+def mes_hidrologico(fechas):
+    """
+    Fechas → (año hidrológico inicial, mes 0..11 MAY..ABR).
+    Mayo 1990 → (1990, 0); abril 1991 → (1990, 11).
+    """
+    anio = fechas.dt.year.to_numpy()
+    mes = fechas.dt.month.to_numpy()
+    return np.where(mes >= 5, anio, anio - 1), (mes - 5) % 12
+
+
+def dias_mes_hidrologico(y0, m):
+    """Días reales del mes hidrológico m (0=MAY..11=ABR) del año y0/y0+1 (febrero bisiesto incluido)."""
+    anio = y0 if m < 8 else y0 + 1
+    return calendar.monthrange(anio, (m + 4) % 12 + 1)[1]
+
+
+class AcumuladorMensual:
+    """
+    Acumula volúmenes diarios (m³) y días observados por (año hidrológico, cuenca, mes).
+
+    La memoria depende sólo del número de años hidrológicos distintos (4·12·2 números
+    por año), no del número de registros diarios: cada trozo del CSV se reduce con
+    np.bincount y se descarta.
+    """
+
+    def __init__(self):
+        self._vol = {}     # y0 → (4, 12) m³
+        self._dias = {}    # y0 → (4, 12) días con dato
+
+    def agregar(self, y0, m, caudales):
+        """y0, m: (n,) de mes_hidrologico; caudales: {cuenca: (n,) m³/s diarios, NaN = sin dato}."""
+        if len(y0) == 0:
+            return
+        base = int(y0.min())
+        n_anos = int(y0.max()) - base + 1
+        clave = (y0 - base) * 12 + m
+        for nombre, q in caudales.items():
+            c = CUENCAS.index(nombre)
+            ok = ~np.isnan(q)
+            vol = np.bincount(clave[ok], weights=q[ok] * SEGUNDOS_DIA, minlength=12 * n_anos)
+            dias = np.bincount(clave[ok], minlength=12 * n_anos)
+            for k in np.unique(clave[ok] // 12):
+                y = base + int(k)
+                if y not in self._vol:
+                    self._vol[y] = np.zeros((len(CUENCAS), 12))
+                    self._dias[y] = np.zeros((len(CUENCAS), 12), dtype=np.int64)
+                self._vol[y][c] += vol[12 * k:12 * k + 12]
+                self._dias[y][c] += dias[12 * k:12 * k + 12]
+
+    def resultado(self, cobertura_min=0.8, recortar_bordes=True):
+        """
+        Caudal medio mensual (m³/s) = volumen del mes / segundos reales del mes.
+
+        Los días sin dato se completan con la media de los días observados (el volumen
+        observado se escala al mes completo); si la cobertura del mes es menor que
+        cobertura_min el mes queda NaN. Con recortar_bordes se descartan los años
+        hidrológicos inicial y final que no tengan los 12 meses en todas las cuencas
+        (series que parten o terminan a mitad de año).
+
+        Devuelve (años ['1989/1990', ...], Q (4, años, 12), cobertura (4, años, 12)).
+        """
+        if not self._vol:
+            raise ValueError("No se acumuló ningún registro diario")
+        ys = list(range(min(self._vol), max(self._vol) + 1))
+        vol = np.stack([self._vol.get(y, np.zeros((len(CUENCAS), 12))) for y in ys], axis=1)
+        dias = np.stack([self._dias.get(y, np.zeros((len(CUENCAS), 12))) for y in ys], axis=1)
+        dias_mes = np.array([[dias_mes_hidrologico(y, m) for m in range(12)] for y in ys], dtype=float)
+
+        cobertura = dias / dias_mes
+        with np.errstate(invalid='ignore', divide='ignore'):
+            Q = vol / (dias * SEGUNDOS_DIA)          # = (vol·dias_mes/dias) / (dias_mes·86400)
+        Q[cobertura < cobertura_min] = np.nan
+
+        if recortar_bordes:
+            completos = np.flatnonzero(~np.isnan(Q).any(axis=(0, 2)))
+            if completos.size == 0:
+                raise ValueError("Ningún año hidrológico (MAY–ABR) completo en las series diarias")
+            sl = slice(completos[0], completos[-1] + 1)
+            ys, Q, cobertura = ys[sl], Q[:, sl], cobertura[:, sl]
+        return [f"{y}/{y + 1}" for y in ys], Q, cobertura
+
+
+def ingerir_csv_diario(archivos, salida="data/.cache/diario.npy", columnas=None, col_fecha='fecha',
+                       formato_fecha=None, dayfirst=True, chunksize=100_000, cobertura_min=0.8,
+                       recortar_bordes=True, **kwargs_csv):
+    """
+    Ingesta en streaming de caudales medios diarios (m³/s) desde uno o más CSV largos.
+
+    archivos: ruta o lista de rutas. Cada CSV trae una columna de fecha y columnas de
+    caudal; columnas = {cuenca: nombre de columna} (por defecto los nombres de
+    CUENCAS). Una cuenca puede venir en un archivo y otra en otro; las columnas que no
+    estén en un archivo se ignoran para ese archivo.
+
+    Se lee de a chunksize filas y cada trozo se reduce a volúmenes por mes hidrológico
+    MAY..ABR, así la memoria no crece con los años de registro. El resultado se escribe
+    en el formato binario de HydroDataset (salida .npy + .json, ver guardar_binario) y
+    se carga con HydroDataset.desde_binario(salida).
+
+    Nota: el medio mensual usa los segundos reales del mes (29 días en febrero bisiesto);
+    los modelos convierten a Hm³ con DIAS_MES (febrero de 28), igual que con el Excel.
+    """
+    import pandas as pd
+
+    if isinstance(archivos, (str, os.PathLike)):
+        archivos = [archivos]
+    columnas = dict(columnas or {c: c for c in CUENCAS})
+    desconocidas = set(columnas) - set(CUENCAS)
+    if desconocidas:
+        raise KeyError(f"Cuencas desconocidas: {sorted(desconocidas)} (válidas: {CUENCAS})")
+
+    acum = AcumuladorMensual()
+    vistas = set()
+    n_filas = 0
+    for archivo in archivos:
+        encabezado = pd.read_csv(archivo, nrows=0, **kwargs_csv).columns
+        if col_fecha not in encabezado:
+            raise ValueError(f"{archivo}: falta la columna de fecha '{col_fecha}'")
+        propias = {c: col for c, col in columnas.items() if col in encabezado}
+        if not propias:
+            print(f"⚠️ {archivo}: ninguna de las columnas {list(columnas.values())}; se omite")
+            continue
+        repetidas = vistas & set(propias)
+        if repetidas:
+            raise ValueError(f"{archivo}: cuencas {sorted(repetidas)} ya leídas de otro archivo")
+        vistas |= set(propias)
+
+        lector = pd.read_csv(archivo, usecols=[col_fecha] + list(propias.values()),
+                             chunksize=chunksize, **kwargs_csv)
+        for trozo in lector:
+            fechas = pd.to_datetime(trozo[col_fecha], format=formato_fecha, dayfirst=dayfirst,
+                                    errors='coerce')
+            ok = fechas.notna().to_numpy()
+            if not ok.all():
+                trozo, fechas = trozo[ok], fechas[ok]
+            y0, m = mes_hidrologico(fechas)
+            acum.agregar(y0, m, {c: pd.to_numeric(trozo[col], errors='coerce').to_numpy(dtype=float)
+                                 for c, col in propias.items()})
+            n_filas += len(trozo)
+
+    faltan = [c for c in CUENCAS if c not in vistas]
+    if faltan:
+        print(f"⚠️ Sin series diarias para {faltan}; quedan como meses sin dato")
+
+    anos, Q, cobertura = acum.resultado(cobertura_min, recortar_bordes)
+    guardar_binario(salida, anos, Q, origen=[os.path.abspath(a) for a in archivos],
+                    registros=n_filas, cobertura_min=cobertura_min,
+                    cobertura_media=float(np.nanmean(cobertura)))
+    sin_dato = int(np.isnan(Q).sum())
+    print(f"✅ {n_filas:,} registros diarios → {len(anos)} años hidrológicos "
+          f"({anos[0]}..{anos[-1]}), {sin_dato} meses sin dato → {salida}")
+    return anos, Q
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta de caudales diarios (CSV) al formato de HydroDataset")
+    parser.add_argument('archivos', nargs='+', help="CSV con columna de fecha y caudales diarios (m³/s)")
+    parser.add_argument('--salida', default="data/.cache/diario.npy")
+    parser.add_argument('--col-fecha', default='fecha')
+    parser.add_argument('--columna', action='append', default=[], metavar='CUENCA=COLUMNA',
+                        help=f"cuenca ({', '.join(CUENCAS)}) y su columna en el CSV; repetible")
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--cobertura-min', type=float, default=0.8)
+    args = parser.parse_args()
+
+    columnas = dict(c.split('=', 1) for c in args.columna) or None
+    anos, Q = ingerir_csv_diario(args.archivos, args.salida, columnas, args.col_fecha,
+                                 chunksize=args.chunksize, cobertura_min=args.cobertura_min)
+    print("Promedios Ñuble (m³/s):", dict(zip(MESES, np.round(np.nanmean(Q[0], axis=0), 2))))
+
+
+if __name__ == "__main__":
+    main()
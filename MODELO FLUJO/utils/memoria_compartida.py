@@ -0,0 +1,104 @@
+# utils/memoria_compartida.py
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .hydro_dataset import HydroDataset
+from .forzantes import Forzantes, CAMPOS
+
+# En cada proceso trabajador: bloques abiertos (deben vivir mientras se usen las vistas),
+# vistas de sólo lectura por nombre y el dataset reconstruido sobre ellas
+_BLOQUES = {}
+_VISTAS = {}
+_DATASET = {}
+
+
+class MemoriaCompartida:
+    """
+    Arreglos NumPy publicados en bloques multiprocessing.shared_memory por el proceso
+    principal (el dueño), para que los trabajadores de un pool los lean sin copiarlos.
+
+    self.descriptor es lo único que viaja a los trabajadores (nombres de bloque,
+    formas y dtypes, unos cientos de bytes): se pasa como initargs de
+    ProcessPoolExecutor(initializer=adjuntar). La memoria no crece con el número de
+    trabajadores. Los bloques se liberan al salir del with (o con cerrar()).
+    """
+
+    def __init__(self, arreglos, meta=None):
+        self._bloques = []
+        self.descriptor = {'meta': dict(meta or {}), 'arreglos': {}}
+        try:
+            for nombre, a in arreglos.items():
+                a = np.ascontiguousarray(a)
+                shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+                self._bloques.append(shm)
+                np.ndarray(a.shape, a.dtype, buffer=shm.buf)[...] = a
+                self.descriptor['arreglos'][nombre] = (shm.name, a.shape, a.dtype.str)
+        except Exception:
+            self.cerrar()
+            raise
+
+    @classmethod
+    def desde_dataset(cls, hidro, drv=None, **extra):
+        """
+        Publica el HydroDataset (buffer y faltantes), los forzantes precalculados (si
+        drv no es None) y cualquier arreglo extra, p.ej. Rem=ensamble (n_esc, T).
+        """
+        arreglos = {'hidro_buffer': hidro._buffer, 'hidro_faltantes': hidro.faltantes}
+        if drv is not None:
+            arreglos.update({f"drv_{k}": getattr(drv, k) for k in CAMPOS})
+        arreglos.update(extra)
+        return cls(arreglos, meta={'anos': list(hidro.anos), 'forzantes': drv is not None})
+
+    @property
+    def nbytes(self):
+        return sum(shm.size for shm in self._bloques)
+
+    def cerrar(self):
+        for shm in self._bloques:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._bloques = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def adjuntar(descriptor):
+    """
+    Initializer de los trabajadores: abre los bloques del descriptor y registra vistas
+    de sólo lectura (sin copia). Devuelve el dict de vistas.
+    """
+    _VISTAS.clear()
+    _DATASET.clear()
+    for nombre, (shm_nombre, forma, dtype) in descriptor['arreglos'].items():
+        if shm_nombre not in _BLOQUES:
+            _BLOQUES[shm_nombre] = shared_memory.SharedMemory(name=shm_nombre)
+        vista = np.ndarray(forma, np.dtype(dtype), buffer=_BLOQUES[shm_nombre].buf)
+        vista.setflags(write=False)
+        _VISTAS[nombre] = vista
+    _VISTAS['_meta'] = descriptor['meta']
+    return _VISTAS
+
+
+def compartido(nombre):
+    """Vista de sólo lectura del arreglo publicado con ese nombre (tras adjuntar)."""
+    return _VISTAS[nombre]
+
+
+def dataset_compartido():
+    """(HydroDataset, Forzantes o None) armados sobre las vistas compartidas, una vez por proceso."""
+    if not _DATASET:
+        meta = _VISTAS['_meta']
+        hidro = HydroDataset.desde_buffer(_VISTAS['hidro_buffer'], meta['anos'], _VISTAS['hidro_faltantes'])
+        drv = None
+        if meta['forzantes']:
+            drv = Forzantes.desde_arreglos(hidro, {k: _VISTAS[f"drv_{k}"] for k in CAMPOS})
+        _DATASET['hidro'], _DATASET['drv'] = hidro, drv
+    return _DATASET['hidro'], _DATASET['drv']